@@ -0,0 +1,86 @@
+# coding: utf-8
+"""
+Measures the size of a cassette archive holding a crawl of series, and the rate at which it's replayed: raw lookups
+through CassetteTransport.request, and get_series calls of an ApiV2Client replaying it. The crawl is recorded straight
+into the archive from responses generated by the stub server, so no server runs.
+
+Usage: python benchmarks/bench_cassette.py [--requests 100000]
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from tvdb_client.clients import ApiV2Client
+from tvdb_client.utils.cassette import CassetteTransport, RECORD, REPLAY, build_response, cassette_key
+from tvdb_client.tests.stub_server import StubTVDBServer, VALID_USERNAME, VALID_API_KEY, VALID_ACCOUNT_IDENTIFIER
+
+__author__ = 'tsantana'
+
+BASE_URL = 'https://api.thetvdb.com'
+
+
+def record(path, count):
+    stub = StubTVDBServer(series_count=count)
+    transport = CassetteTransport(path, mode=RECORD)
+
+    login_url = BASE_URL + '/login'
+    transport.record(cassette_key('post', login_url), build_response(login_url, 200, {}, b'{"token": "replayed"}'))
+    for series_id in range(1, count + 1):
+        url = BASE_URL + '/series/%d' % series_id
+        content = json.dumps({'data': stub.series(series_id), 'errors': {}}).encode('utf-8')
+        transport.record(cassette_key('get', url), build_response(url, 200, {}, content))
+
+    transport.close()
+
+
+def replay_raw(path, ids):
+    transport = CassetteTransport(path, mode=REPLAY)
+    start = time.perf_counter()
+    for series_id in ids:
+        transport.request('get', BASE_URL + '/series/%d' % series_id)
+    elapsed = time.perf_counter() - start
+    transport.close()
+    return elapsed
+
+
+def replay_client(path, ids):
+    api = ApiV2Client(VALID_USERNAME, VALID_API_KEY, VALID_ACCOUNT_IDENTIFIER,
+                      transport=CassetteTransport(path, mode=REPLAY))
+    api.login()
+    start = time.perf_counter()
+    for series_id in ids:
+        api.get_series(series_id)
+    elapsed = time.perf_counter() - start
+    api.close()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=100000)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, 'crawl.cassette')
+    try:
+        start = time.perf_counter()
+        record(path, args.requests)
+        print('recorded %d responses in %.1f s, archive of %.1f MiB' % (args.requests, time.perf_counter() - start,
+                                                                      os.path.getsize(path) / 1048576.0))
+
+        ids = list(range(1, args.requests + 1))
+        random.Random(0).shuffle(ids)
+        for name, replay in (('raw lookups', replay_raw), ('get_series', replay_client)):
+            elapsed = replay(path, ids)
+            print('%-12s %10.0f requests/s, %8.1f us per request' % (name, len(ids) / elapsed,
+                                                                      elapsed * 1000000.0 / len(ids)))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,302 @@
+# coding: utf-8
+"""
+Measures the throughput, the p50/p99 latency of every operation and the peak memory of the client under realistic
+workloads against the local stub server: sequential, cached, bulk, concurrent (coalesced) and async reads, paginated and
+streamed lists, and a flaky or rate limited TheTVDB. The stub runs in its own process, so it neither competes with the
+client for the GIL nor shows up in its memory.
+
+Results can be saved and compared to a baseline, the command failing when a workload regressed by more than the
+tolerance, i.e. before upgrading the client (or its dependencies) in production:
+
+Usage: python benchmarks/bench_client.py [--size 500] [--workload series_cached ...] [--save results.json]
+                                         [--baseline baseline.json] [--tolerance 0.25] [--no-memory] [--list]
+
+The same workloads run under pytest-benchmark with: python -m pytest benchmarks/test_bench_client.py
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import random
+import sys
+import threading
+import time
+import tracemalloc
+
+from concurrent.futures import ThreadPoolExecutor
+from tvdb_client.clients import ApiV2Client, AsyncApiV2Client
+from tvdb_client.utils.cache import MemoryCache
+from tvdb_client.utils.requests_util import RateLimiter, RetryPolicy
+from tvdb_client.tests.stub_server import StubTVDBServer, VALID_USERNAME, VALID_API_KEY, VALID_ACCOUNT_IDENTIFIER
+
+__author__ = 'tsantana'
+
+FROM_TIME = 1500000000
+
+
+def _serve(options, connection):
+    stub = StubTVDBServer(**options).start()
+    connection.send(stub.url)
+    connection.recv()
+    stub.stop()
+
+
+class StubProcess(object):
+    """
+    Runs a StubTVDBServer in a child process. Used as a context manager, it returns the url of the stub.
+    """
+
+    def __init__(self, **options):
+        self.options = options
+        self.__connection = None
+        self.__process = None
+
+    def __enter__(self):
+        self.__connection, child_connection = multiprocessing.Pipe()
+        self.__process = multiprocessing.Process(target=_serve, args=(self.options, child_connection))
+        self.__process.daemon = True
+        self.__process.start()
+        return self.__connection.recv()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.__connection.send(None)
+        self.__process.join(5)
+        if self.__process.is_alive():
+            self.__process.terminate()
+
+
+def client(url, **options):
+    options.setdefault('retry_policy', RetryPolicy(backoff_factor=0.005, max_backoff=0.05))
+    api = ApiV2Client(VALID_USERNAME, VALID_API_KEY, VALID_ACCOUNT_IDENTIFIER, **options)
+    api.API_BASE_URL = url
+    api.login()
+    return api
+
+
+def timed(record, func, *args, **kwargs):
+    start = time.perf_counter()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        record(time.perf_counter() - start)
+
+
+def skewed_ids(size, hot=50, hot_ratio=0.9, series_count=1000, seed=0):
+    """
+    :return: size series ids, hot_ratio of them among the first hot ids, as the popular series of a library are.
+    """
+    rng = random.Random(seed)
+    return [rng.randint(1, hot) if rng.random() < hot_ratio else rng.randint(hot + 1, series_count)
+            for _ in range(size)]
+
+
+# Workloads: each takes the url of the stub, the number of operations and a function recording the duration of an
+# operation, and returns the number of items retrieved.
+
+def series_sequential(url, size, record):
+    api = client(url)
+    for n in range(size):
+        timed(record, api.get_series, n % 1000 + 1)
+    api.close()
+    return size
+
+
+def series_cached(url, size, record):
+    api = client(url, cache=MemoryCache())
+    for series_id in skewed_ids(size):
+        timed(record, api.get_series, series_id)
+    api.close()
+    return size
+
+
+def series_bulk(url, size, record, batch_size=100):
+    api = client(url, pool_size=8)
+    ids = [n % 1000 + 1 for n in range(size)]
+    for start in range(0, size, batch_size):
+        timed(record, lambda batch: list(api.get_series_many(batch, max_workers=8)), ids[start:start + batch_size])
+    api.close()
+    return size
+
+
+def series_concurrent(url, size, record, threads=16):
+    api = client(url, pool_size=threads)
+    ids = skewed_ids(size, hot=20, hot_ratio=1.0)
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(lambda series_id: timed(record, api.get_series, series_id), ids))
+    api.close()
+    return size
+
+
+def series_async(url, size, record, max_concurrency=16):
+    async def get_series(api, series_id):
+        start = time.perf_counter()
+        try:
+            return await api.get_series(series_id)
+        finally:
+            record(time.perf_counter() - start)
+
+    async def run():
+        async with AsyncApiV2Client(VALID_USERNAME, VALID_API_KEY, VALID_ACCOUNT_IDENTIFIER,
+                                    max_concurrency=max_concurrency, coalesce_requests=False) as api:
+            api.client.API_BASE_URL = url
+            await api.login()
+            await asyncio.gather(*[get_series(api, n % 1000 + 1) for n in range(size)])
+
+    asyncio.run(run())
+    return size
+
+
+def episodes_paginated(url, size, record):
+    api = client(url, pool_size=4)
+    items = 0
+    for series_id in range(1, max(1, size // 50) + 1):
+        items += timed(record, lambda: sum(1 for _ in api.iter_series_episodes(series_id, max_workers=4)))
+    api.close()
+    return items
+
+
+def updated_streamed(url, size, record):
+    api = client(url)
+    items = 0
+    for day in range(max(1, size // 100)):
+        def read():
+            with api.get_updated(FROM_TIME + day * 86400, FROM_TIME + (day + 1) * 86400, stream=True) as updates:
+                return sum(1 for _ in updates)
+        items += timed(record, read)
+    api.close()
+    return items
+
+
+def series_rate_limited(url, size, record):
+    # The client limits itself a little below the limit of the stub, the 429 answers of bursts being retried.
+    api = client(url, pool_size=8, rate_limiter=RateLimiter(450, burst=20))
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(lambda n: timed(record, api.get_series, n % 1000 + 1), range(size)))
+    api.close()
+    return size
+
+
+class Workload(object):
+
+    def __init__(self, run, description, **stub_options):
+        self.run = run
+        self.description = description
+        self.stub_options = stub_options
+
+
+WORKLOADS = {
+    'series_sequential': Workload(series_sequential, 'get_series, one call at a time', latency=0.002),
+    'series_cached': Workload(series_cached, 'get_series of a skewed library with a MemoryCache', latency=0.002),
+    'series_bulk': Workload(series_bulk, 'get_series_many in batches of 100, 8 workers', latency=0.002),
+    'series_concurrent': Workload(series_concurrent, 'get_series of 20 hot series from 16 threads (coalesced)',
+                                  latency=0.005),
+    'series_async': Workload(series_async, 'AsyncApiV2Client gather of get_series, 16 concurrent', latency=0.002),
+    'series_flaky': Workload(series_sequential, 'get_series with 5% of 5xx answers, retried', latency=0.002,
+                             error_rate=0.05),
+    'series_rate_limited': Workload(series_rate_limited, 'get_series from 8 threads against a 500 rps limit',
+                                    latency=0.002, rate_limit=500),
+    'episodes_paginated': Workload(episodes_paginated, 'iter_series_episodes, 3 pages of 100 with padded overviews',
+                                   latency=0.002, payload_padding=500),
+    'updated_streamed': Workload(updated_streamed, 'get_updated of a day of 20000 series, streamed',
+                                 latency=0.002, series_count=20000),
+}
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else None
+
+
+def measure(name, size, memory=True):
+    """
+    Runs a workload against its own stub process.
+
+    :return: a python dictionary with the items retrieved, the throughput in items per second, the p50 and p99 of the
+    duration of the operations in milliseconds and the peak memory allocated by the client in MiB (None if memory is
+    False, as measuring it takes a second, slower run).
+    """
+    workload = WORKLOADS[name]
+    latencies = list()
+
+    with StubProcess(**workload.stub_options) as url:
+        lock = threading.Lock()
+
+        def record(seconds):
+            with lock:
+                latencies.append(seconds)
+
+        start = time.perf_counter()
+        items = workload.run(url, size, record)
+        elapsed = time.perf_counter() - start
+
+        peak = None
+        if memory:
+            tracemalloc.start()
+            workload.run(url, size, lambda seconds: None)
+            peak = tracemalloc.get_traced_memory()[1] / 1048576.0
+            tracemalloc.stop()
+
+    return {'items': items, 'seconds': elapsed, 'throughput': items / elapsed,
+            'p50_ms': percentile(latencies, 0.5) * 1000.0, 'p99_ms': percentile(latencies, 0.99) * 1000.0,
+            'peak_mib': peak}
+
+
+def regressions(results, baseline, tolerance):
+    """
+    :return: a list of messages describing the workloads slower, or using more memory, than the baseline by more than
+    the tolerance (a fraction).
+    """
+    messages = list()
+    for name, result in sorted(results.items()):
+        base = baseline.get(name)
+        if not base:
+            continue
+        if result['throughput'] < base['throughput'] * (1 - tolerance):
+            messages.append('%s: throughput %.0f/s, baseline %.0f/s' % (name, result['throughput'], base['throughput']))
+        if result['p99_ms'] > base['p99_ms'] * (1 + tolerance):
+            messages.append('%s: p99 %.2f ms, baseline %.2f ms' % (name, result['p99_ms'], base['p99_ms']))
+        if result.get('peak_mib') and base.get('peak_mib') and result['peak_mib'] > base['peak_mib'] * (1 + tolerance):
+            messages.append('%s: peak memory %.1f MiB, baseline %.1f MiB' % (name, result['peak_mib'],
+                                                                             base['peak_mib']))
+    return messages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size', type=int, default=500, help='the number of operations of every workload')
+    parser.add_argument('--workload', action='append', choices=sorted(WORKLOADS), help='the workloads to run (all)')
+    parser.add_argument('--save', help='a file to write the results to, as JSON')
+    parser.add_argument('--baseline', help='a file of results (written by --save) to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='the regression tolerated, as a fraction')
+    parser.add_argument('--no-memory', dest='memory', action='store_false', help='skip the peak memory run')
+    parser.add_argument('--list', action='store_true', help='list the workloads and exit')
+    args = parser.parse_args()
+
+    if args.list:
+        for name, workload in sorted(WORKLOADS.items()):
+            print('%-20s %s' % (name, workload.description))
+        return
+
+    results = dict()
+    print('%-20s %10s %14s %10s %10s %10s' % ('workload', 'items', 'items/s', 'p50 ms', 'p99 ms', 'peak MiB'))
+    for name in args.workload or sorted(WORKLOADS):
+        result = results[name] = measure(name, args.size, args.memory)
+        print('%-20s %10d %14.1f %10.2f %10.2f %10s' % (name, result['items'], result['throughput'], result['p50_ms'],
+                                                        result['p99_ms'], '%.1f' % result['peak_mib']
+                                                        if result['peak_mib'] is not None else '-'))
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            messages = regressions(results, json.load(f), args.tolerance)
+        for message in messages:
+            print('REGRESSION %s' % message)
+        if messages:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
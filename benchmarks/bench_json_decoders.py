@@ -0,0 +1,52 @@
+# coding: utf-8
+"""
+Measures the CPU time spent decoding large episode pages and image lists with every JSON decoder installed, against the
+former path of parse_raw_response (decoding the bytes to a str with make_str_content, then json.loads).
+
+Usage: python benchmarks/bench_json_decoders.py [--repeat 200]
+"""
+import argparse
+import json
+import time
+
+from tvdb_client.utils import json_decoders
+from tvdb_client.utils.utils import make_str_content
+from tvdb_client.tests.stub_server import StubTVDBServer, PAGE_SIZE
+
+__author__ = 'tsantana'
+
+
+def decode_via_str(content):
+    return json.loads(make_str_content(content))
+
+
+def measure(decode, content, repeat):
+    start = time.process_time()
+    for _ in range(repeat):
+        decode(content)
+    return (time.process_time() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    stub = StubTVDBServer(episodes_per_series=PAGE_SIZE)
+    payloads = (('episodes', json.dumps({'data': stub.episodes(1), 'links': {'first': 1, 'last': 10}}).encode()),
+                ('images', json.dumps({'data': stub.images(1) * 20}).encode()))
+    decoders = [('str+json', decode_via_str)] + [(name, json_decoders.get_decoder(name))
+                                                 for name in json_decoders.available_decoders()]
+
+    print('%-10s %10s %-10s %12s %10s %10s' % ('payload', 'KiB', 'decoder', 'ms/decode', 'MiB/s', 'speedup'))
+    for payload, content in payloads:
+        baseline = None
+        for name, decode in decoders:
+            elapsed = measure(decode, content, args.repeat)
+            baseline = baseline or elapsed
+            print('%-10s %10.1f %-10s %12.3f %10.1f %9.2fx' % (payload, len(content) / 1024.0, name, elapsed * 1000.0,
+                                                               len(content) / elapsed / 1048576.0, baseline / elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+# coding: utf-8
+"""
+Compares the memory held by the full episode lists of many series as the python dictionaries returned by json.loads
+and as tvdb_models.Episode instances. Every episode page is decoded from its own JSON document, as it would be when
+received from TheTVDB, so no strings are shared between pages.
+
+Usage: python benchmarks/bench_models_memory.py [--series 200] [--episodes 250]
+"""
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+
+from tvdb_client.models import Episode
+from tvdb_client.tests.stub_server import StubTVDBServer
+
+__author__ = 'tsantana'
+
+
+def measure(documents, build):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+
+    episodes = [build(item) for document in documents for item in json.loads(document)['data']]
+
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return len(episodes), current, peak, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--series', type=int, default=200)
+    parser.add_argument('--episodes', type=int, default=250)
+    args = parser.parse_args()
+
+    stub = StubTVDBServer(episodes_per_series=args.episodes, series_count=args.series)
+    documents = [json.dumps({'data': stub.episodes(series_id)}) for series_id in range(1, args.series + 1)]
+
+    results = (('dict', measure(documents, lambda item: item)),
+               ('Episode', measure(documents, Episode)))
+
+    print('%-10s %10s %14s %14s %12s %10s' % ('model', 'episodes', 'retained MiB', 'peak MiB', 'bytes/item', 'seconds'))
+    for name, (count, current, peak, elapsed) in results:
+        print('%-10s %10d %14.1f %14.1f %12d %10.2f' % (name, count, current / 1048576.0, peak / 1048576.0,
+                                                       current // count, elapsed))
+
+    print('memory saved: %.1f%%' % (100.0 - 100.0 * results[1][1][1] / results[0][1][1]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+# coding: utf-8
+"""
+Measures the savings of the pooled, kept-alive SessionTransport against the one-connection-per-request behaviour of the
+module level requests functions. The stub server sleeps on every new connection to simulate a TLS handshake.
+
+Usage: python benchmarks/bench_session_pool.py [--calls 200] [--handshake-latency 0.02]
+"""
+import argparse
+import time
+
+from tvdb_client.clients import ApiV2Client
+from tvdb_client.utils import requests_util
+from tvdb_client.tests.stub_server import StubTVDBServer, VALID_USERNAME, VALID_API_KEY, VALID_ACCOUNT_IDENTIFIER
+
+__author__ = 'tsantana'
+
+
+class _UnpooledTransport(object):
+    """
+    Sends every request through the module level requests functions, as run_request did before transports existed.
+    """
+
+    def request(self, request_type, url, data=None, headers=None):
+        return requests_util.run_request(request_type, url, data=data, headers=headers)
+
+    def close(self):
+        pass
+
+
+def run(stub, transport, calls):
+    api = ApiV2Client(VALID_USERNAME, VALID_API_KEY, VALID_ACCOUNT_IDENTIFIER, transport=transport)
+    api.API_BASE_URL = stub.url
+    api.login()
+    stub.reset_counters()
+
+    start = time.perf_counter()
+    for n in range(calls):
+        api.get_series(n % stub.series_count + 1)
+    elapsed = time.perf_counter() - start
+
+    api.close()
+    return elapsed, stub.connections
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--calls', type=int, default=200)
+    parser.add_argument('--handshake-latency', type=float, default=0.02)
+    args = parser.parse_args()
+
+    with StubTVDBServer(handshake_latency=args.handshake_latency) as stub:
+        results = (('unpooled', run(stub, _UnpooledTransport(), args.calls)),
+                   ('pooled', run(stub, requests_util.SessionTransport(), args.calls)))
+
+    print('%-10s %10s %12s %14s' % ('transport', 'calls', 'connections', 'ms per call'))
+    for name, (elapsed, connections) in results:
+        print('%-10s %10d %12d %14.3f' % (name, args.calls, connections, elapsed * 1000.0 / args.calls))
+
+    saved = results[0][1][0] - results[1][1][0]
+    print('handshake savings: %.1f ms total, %.3f ms per call' % (saved * 1000.0, saved * 1000.0 / args.calls))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+# coding: utf-8
+"""
+Compares the time to the first item, the total time and the peak memory of reading a large get_updated response fully
+buffered (json.loads of the whole body, as parse_raw_response does) and streamed (json_stream.StreamedResponse, as
+returned with stream=True). The body is generated up front and handed over in chunks, as a connection would, so only
+the client side is measured.
+
+Usage: python benchmarks/bench_streaming.py [--series 20000] [--days 7] [--chunk-size 65536]
+"""
+import argparse
+import json
+import time
+import tracemalloc
+
+from tvdb_client.utils.json_stream import StreamedResponse
+from tvdb_client.tests.stub_server import StubTVDBServer
+
+__author__ = 'tsantana'
+
+FROM_TIME = 1500000000
+
+
+class _BodyResponse(object):
+
+    status_code = 200
+
+    def __init__(self, content):
+        self.content = content
+
+    def iter_content(self, chunk_size):
+        for start in range(0, len(self.content), chunk_size):
+            yield self.content[start:start + chunk_size]
+
+    def close(self):
+        pass
+
+
+def buffered(response, chunk_size):
+    content = b''.join(response.iter_content(chunk_size))
+    return json.loads(content)['data']
+
+
+def streamed(response, chunk_size):
+    return StreamedResponse(response, chunk_size=chunk_size)
+
+
+def run(read, content, chunk_size):
+    tracemalloc.start()
+    start = time.perf_counter()
+    first_item = None
+    count = 0
+
+    for _ in read(_BodyResponse(content), chunk_size):
+        if first_item is None:
+            first_item = time.perf_counter() - start
+        count += 1
+
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return count, first_item, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--series', type=int, default=20000)
+    parser.add_argument('--days', type=int, default=7)
+    parser.add_argument('--chunk-size', type=int, default=64 * 1024)
+    args = parser.parse_args()
+
+    stub = StubTVDBServer(series_count=args.series)
+    content = json.dumps({'data': stub.updated(FROM_TIME, FROM_TIME + args.days * 24 * 3600)}).encode('utf-8')
+
+    print('body: %.1f MiB' % (len(content) / 1048576.0))
+    print('%-10s %10s %16s %12s %12s' % ('mode', 'items', 'first item ms', 'total ms', 'peak MiB'))
+    for name, read in (('buffered', buffered), ('streamed', streamed)):
+        count, first_item, elapsed, peak = run(read, content, args.chunk_size)
+        print('%-10s %10d %16.2f %12.1f %12.1f' % (name, count, first_item * 1000.0, elapsed * 1000.0,
+                                                   peak / 1048576.0))
+
+
+if __name__ == '__main__':
+    main()
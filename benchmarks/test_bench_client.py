@@ -0,0 +1,32 @@
+# coding: utf-8
+"""
+The workloads of bench_client.py under pytest-benchmark, which keeps the history of the runs and compares them:
+
+    python -m pytest benchmarks/test_bench_client.py --benchmark-autosave
+    python -m pytest benchmarks/test_bench_client.py --benchmark-compare --benchmark-compare-fail=mean:25%
+
+The p50/p99 of the operations and the items retrieved are reported in the extra info of every benchmark.
+"""
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+from bench_client import WORKLOADS, StubProcess, percentile  # noqa: E402
+
+__author__ = 'tsantana'
+
+SIZE = 200
+
+
+@pytest.mark.parametrize('name', sorted(WORKLOADS))
+def test_workload(benchmark, name):
+    workload = WORKLOADS[name]
+    latencies = list()
+
+    with StubProcess(**workload.stub_options) as url:
+        items = benchmark.pedantic(workload.run, args=(url, SIZE, latencies.append), rounds=3, iterations=1,
+                                   warmup_rounds=1)
+
+    benchmark.extra_info.update({'items': items, 'p50_ms': percentile(latencies, 0.5) * 1000.0,
+                                 'p99_ms': percentile(latencies, 0.99) * 1000.0})
+    assert items > 0
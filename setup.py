@@ -48,8 +48,14 @@ if sys.argv[-1] == 'publish':
 
 packages = [
     'tvdb_client',
+    'tvdb_client.artwork',
     'tvdb_client.clients',
+    'tvdb_client.crawl',
     'tvdb_client.exceptions',
+    'tvdb_client.models',
+    'tvdb_client.search',
+    'tvdb_client.store',
+    'tvdb_client.sync',
     'tvdb_client.tests',
     'tvdb_client.utils'
 ]
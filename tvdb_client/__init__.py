@@ -1,5 +1,5 @@
 # encoding=latin-1
-from .clients import ApiV1Client, ApiV2Client
+import importlib
 
 __title__ = 'tvdb_client'
 __version__ = '0.1.2'
@@ -7,3 +7,26 @@ __build__ = 0x001020
 __author__ = 'Thiago Santana'
 __license__ = 'Apache 2.0'
 __copyright__ = 'Copyright 2020 Thiago Santana (thilux/thilux Systems)'
+
+__all__ = ['ApiV1Client', 'ApiV2Client', 'ApiV2ClientPool', 'AsyncApiV2Client']
+
+# The clients (and requests with them) are only imported when first used, so importing the package is cheap.
+_LAZY_ATTRIBUTES = {
+    'ApiV1Client': 'tvdb_client.clients',
+    'ApiV2Client': 'tvdb_client.clients',
+    'ApiV2ClientPool': 'tvdb_client.clients',
+    'AsyncApiV2Client': 'tvdb_client.clients',
+}
+
+
+def __getattr__(name):
+    module = _LAZY_ATTRIBUTES.get(name)
+    if module is None:
+        raise AttributeError('module %r has no attribute %r' % (__name__, name))
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
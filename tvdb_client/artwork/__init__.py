@@ -0,0 +1 @@
+from .artwork_downloader import ArtworkDownloader, ArtworkReport, ArtworkStore, select_images
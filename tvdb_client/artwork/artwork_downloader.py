@@ -0,0 +1,389 @@
+# coding: utf-8
+from tvdb_client.exceptions import RequestFailedException
+from tvdb_client.utils.requests_util import RetryPolicy, SessionTransport
+from concurrent.futures import ThreadPoolExecutor
+from requests.exceptions import RequestException
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+
+__author__ = 'tsantana'
+
+ARTWORK_BASE_URL = 'https://artworks.thetvdb.com/banners/'
+
+
+def select_images(images, key_type=None, resolution=None, sub_key=None, best_rated=None):
+    """
+    Filters the images of a series (the data of a get_series_images response).
+
+    :param images: The images: python dictionaries or tvdb_models.Image.
+    :param key_type: The optional type of images kept: fanart, poster, season, seasonwide or series.
+    :param resolution: The optional resolution of the images kept: i.e. 1920x1080.
+    :param sub_key: The optional sub key of the images kept: i.e. the season number of season images.
+    :param best_rated: If set, only the best_rated images with the highest average rating (then the most ratings) of
+    every type and sub key are kept, i.e. 1 for the best poster and the best poster of every season.
+    :return: a list of the selected images (python dictionaries), best rated first if best_rated is set.
+    """
+    selected = list()
+    for image in images:
+        if hasattr(image, 'to_dict'):
+            image = image.to_dict()
+        if all(value is None or str(image.get(key)) == str(value) for key, value in
+               (('keyType', key_type), ('resolution', resolution), ('subKey', sub_key))):
+            selected.append(image)
+
+    if best_rated is None:
+        return selected
+
+    def rating(image):
+        ratings = image.get('ratingsInfo') or {}
+        return -(ratings.get('average') or 0), -(ratings.get('count') or 0)
+
+    counts = dict()
+    best = list()
+    for image in sorted(selected, key=rating):
+        group = (image.get('keyType'), image.get('subKey'))
+        counts[group] = counts.get(group, 0) + 1
+        if counts[group] <= best_rated:
+            best.append(image)
+    return best
+
+
+class ArtworkStore(object):
+    """
+    A content-addressed store of artwork files on disk. Every file is kept once, under the SHA-256 of its content
+    (objects/ab/abcdef...), and an index (SQLite) maps the TheTVDB file names to the content they were downloaded with,
+    so artwork shared by several names takes the space of one file.
+
+    Downloads in progress are written under partial/, where they survive interruptions so they can be resumed.
+    """
+
+    def __init__(self, directory):
+        """
+        :param directory: The directory of the store. It's created if it doesn't exist.
+        """
+        self.directory = directory
+        for name in ('objects', 'partial'):
+            os.makedirs(os.path.join(directory, name), exist_ok=True)
+
+        self.__lock = threading.Lock()
+        self.__connection = sqlite3.connect(os.path.join(directory, 'index.db'), check_same_thread=False)
+        self.__connection.execute('PRAGMA journal_mode=WAL')
+        with self.__connection:
+            self.__connection.execute('CREATE TABLE IF NOT EXISTS artwork (file_name TEXT PRIMARY KEY, '
+                                      'digest TEXT NOT NULL, size INTEGER NOT NULL, stored_at REAL NOT NULL)')
+
+    def object_path(self, digest):
+        """
+        :return: the path of the file of the given SHA-256 (hex digest).
+        """
+        return os.path.join(self.directory, 'objects', digest[:2], digest)
+
+    def partial_path(self, file_name):
+        """
+        :return: the path the download of a file name is written to until it completes.
+        """
+        return os.path.join(self.directory, 'partial', '%s.part' % hashlib.sha1(file_name.encode('utf-8')).hexdigest())
+
+    def get(self, file_name):
+        """
+        :param file_name: The TheTVDB file name of the artwork, i.e. posters/121361-1.jpg.
+        :return: the path of the local copy of the artwork, or None if it was not stored.
+        """
+        with self.__lock:
+            row = self.__connection.execute('SELECT digest FROM artwork WHERE file_name = ?', (file_name,)).fetchone()
+        if row is None:
+            return None
+        path = self.object_path(row[0])
+        return path if os.path.exists(path) else None
+
+    def __contains__(self, file_name):
+        return self.get(file_name) is not None
+
+    def __len__(self):
+        with self.__lock:
+            return self.__connection.execute('SELECT COUNT(*) FROM artwork').fetchone()[0]
+
+    def put(self, file_name, path, digest=None):
+        """
+        Moves a downloaded file into the store.
+
+        :param file_name: The TheTVDB file name of the artwork.
+        :param path: The path of the downloaded file. It's moved (or removed, if the content is stored already).
+        :param digest: The SHA-256 (hex digest) of the file, computed if not provided.
+        :return: the path of the stored artwork.
+        """
+        if digest is None:
+            sha256 = hashlib.sha256()
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 20), b''):
+                    sha256.update(chunk)
+            digest = sha256.hexdigest()
+
+        size = os.path.getsize(path)
+        object_path = self.object_path(digest)
+        with self.__lock:
+            if os.path.exists(object_path):
+                os.remove(path)
+            else:
+                os.makedirs(os.path.dirname(object_path), exist_ok=True)
+                os.replace(path, object_path)
+            with self.__connection:
+                self.__connection.execute('INSERT OR REPLACE INTO artwork (file_name, digest, size, stored_at) '
+                                          'VALUES (?, ?, ?, ?)', (file_name, digest, size, time.time()))
+        return object_path
+
+    def stats(self):
+        """
+        :return: a python dictionary with the number of file names stored (files), of distinct contents (objects) and
+        the bytes they take on disk.
+        """
+        with self.__lock:
+            files = self.__connection.execute('SELECT COUNT(*) FROM artwork').fetchone()[0]
+            objects, size = self.__connection.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM '
+                                                      '(SELECT digest, MAX(size) AS size FROM artwork '
+                                                      'GROUP BY digest)').fetchone()
+        return {'files': files, 'objects': objects, 'bytes': size}
+
+    def close(self):
+        with self.__lock:
+            self.__connection.close()
+
+
+class ArtworkReport(object):
+    """
+    The outcome of an ArtworkDownloader run.
+    """
+
+    def __init__(self):
+        self.downloaded = 0
+        self.skipped = 0
+        self.resumed = 0
+        self.bytes = 0
+        self.seconds = 0.0
+        self.paths = dict()
+        self.failures = dict()
+
+    @property
+    def complete(self):
+        return not self.failures
+
+    @property
+    def files_per_second(self):
+        return self.downloaded / self.seconds if self.seconds else 0.0
+
+    @property
+    def bytes_per_second(self):
+        return self.bytes / self.seconds if self.seconds else 0.0
+
+    def __repr__(self):
+        return '<ArtworkReport downloaded=%d skipped=%d resumed=%d failures=%d bytes=%d files/s=%.1f MiB/s=%.2f>' % \
+               (self.downloaded, self.skipped, self.resumed, len(self.failures), self.bytes, self.files_per_second,
+                self.bytes_per_second / 1048576.0)
+
+
+class ArtworkDownloader(object):
+    """
+    Downloads the artwork files of series into an ArtworkStore.
+
+    The images of a series are listed with ApiV2Client.get_series_images, filtered (see select_images) and their files
+    fetched concurrently over a pool of keep-alive connections. Every file is streamed to disk as it arrives, so memory
+    stays flat whatever the size of the artwork, and an interrupted transfer is resumed where it stopped (with a Range
+    request) rather than restarted. Files in the store already are skipped, so re-runs only fetch what's missing.
+    """
+
+    def __init__(self, client, store, base_url=ARTWORK_BASE_URL, max_workers=8, transport=None, retry_policy=None,
+                 chunk_size=65536):
+        """
+        :param client: A logged in ApiV2Client.
+        :param store: The ArtworkStore the files are stored to.
+        :param base_url: The url the file names of TheTVDB are relative to.
+        :param max_workers: The number of files downloaded concurrently.
+        :param transport: The transport the files are downloaded through. A SessionTransport pooling max_workers
+        connections if none is provided.
+        :param retry_policy: The RetryPolicy of every file. Interrupted transfers are retried as failed requests.
+        :param chunk_size: The number of bytes read and written at once.
+        """
+        self.client = client
+        self.store = store
+        self.base_url = base_url if base_url.endswith('/') else base_url + '/'
+        self.max_workers = max_workers
+        self.transport = transport if transport is not None else SessionTransport(pool_maxsize=max_workers)
+        self.retry_policy = retry_policy if retry_policy is not None else RetryPolicy()
+        self.chunk_size = chunk_size
+        self.__lock = threading.Lock()
+
+    def series_images(self, series_id, key_type=None, resolution=None, sub_key=None, best_rated=None):
+        """
+        Lists the images of a series, see select_images for the filters.
+
+        :return: a list of the selected images (python dictionaries). A series without images has none.
+        :raise RequestFailedException: if TheTVDB fails to list the images.
+        """
+        response = self.client.get_series_images(series_id, image_type=key_type, resolution=resolution,
+                                                 sub_key=sub_key)
+        if 'data' not in response:
+            if response.get('code') == 404:
+                return []
+            raise RequestFailedException('Failed to list the images of series %d: %s' %
+                                         (series_id, response.get('message')))
+
+        return select_images(response['data'] or [], key_type, resolution, sub_key, best_rated)
+
+    def download_series(self, series_ids, key_type=None, resolution=None, sub_key=None, best_rated=None,
+                        thumbnails=False):
+        """
+        Downloads the artwork of one or more series.
+
+        :param series_ids: A TheTVDB series id, or an iterable of them.
+        :param thumbnails: Whether the thumbnails of the images are downloaded instead of the full size files.
+        :return: an ArtworkReport.
+        :raise RequestFailedException: if TheTVDB fails to list the images of a series.
+
+        See select_images for the other parameters.
+        """
+        if isinstance(series_ids, int):
+            series_ids = [series_ids]
+
+        images = list()
+        for series_id in series_ids:
+            images.extend(self.series_images(series_id, key_type, resolution, sub_key, best_rated))
+
+        return self.download(images, thumbnails)
+
+    def download(self, images, thumbnails=False):
+        """
+        Downloads the files of images.
+
+        :param images: The images (python dictionaries or tvdb_models.Image), i.e. selected with select_images.
+        :param thumbnails: Whether the thumbnails of the images are downloaded instead of the full size files.
+        :return: an ArtworkReport, with the local path of every file stored in paths and the error of every file
+        that could not be downloaded in failures, both keyed by file name.
+        """
+        report = ArtworkReport()
+        field = 'thumbnail' if thumbnails else 'fileName'
+        file_names = list()
+        for image in images:
+            if hasattr(image, 'to_dict'):
+                image = image.to_dict()
+            file_name = image.get(field)
+            if file_name and file_name not in report.paths:
+                report.paths[file_name] = None
+                file_names.append(file_name)
+
+        started_at = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for file_name, path in zip(file_names, executor.map(lambda name: self.__fetch(name, report),
+                                                                file_names)):
+                if path is None:
+                    del report.paths[file_name]
+                else:
+                    report.paths[file_name] = path
+        report.seconds = time.perf_counter() - started_at
+
+        return report
+
+    def __fetch(self, file_name, report):
+        path = self.store.get(file_name)
+        if path is not None:
+            with self.__lock:
+                report.skipped += 1
+            return path
+
+        try:
+            path = self.__download(file_name, report)
+        except (RequestFailedException, EnvironmentError) as e:
+            with self.__lock:
+                report.failures[file_name] = str(e)
+            return None
+
+        with self.__lock:
+            report.downloaded += 1
+        return path
+
+    def __download(self, file_name, report):
+        url = self.base_url + file_name.lstrip('/')
+        partial_path = self.store.partial_path(file_name)
+        response = None
+
+        for attempt in range(self.retry_policy.retries + 1):
+            offset = os.path.getsize(partial_path) if os.path.exists(partial_path) else 0
+            try:
+                response = self.transport.request('get', url, headers={'Range': 'bytes=%d-' % offset}
+                                                  if offset else None, stream=True)
+            except RequestException:
+                response = None
+
+            if response is not None:
+                # Kept apart, as response is set to None when the transfer is interrupted, to retry it.
+                streamed = response
+                try:
+                    if response.status_code in (200, 206):
+                        if response.status_code == 206:
+                            with self.__lock:
+                                report.resumed += 1
+                        digest = self.__write(response, partial_path, offset, report)
+                        if digest is not None:
+                            return self.store.put(file_name, partial_path, digest)
+                        response = None
+                    elif response.status_code == 416:
+                        # The partial file doesn't match the artwork anymore: start over.
+                        os.remove(partial_path)
+                        continue
+                except RequestException:
+                    response = None
+                finally:
+                    streamed.close()
+
+            if not self.retry_policy.is_retryable(response) or attempt == self.retry_policy.retries:
+                break
+            backoff = self.retry_policy.backoff(attempt, response)
+            if backoff is None:
+                break
+            time.sleep(backoff)
+
+        raise RequestFailedException('Failed to download %s: %s' % (url, 'HTTP %d' % response.status_code
+                                                                   if response is not None else 'connection error'))
+
+    def __write(self, response, partial_path, offset, report):
+        """
+        Streams the body of a response to the partial file, after its first offset bytes if it's a partial content.
+
+        :return: the SHA-256 of the complete file, or None if the body was shorter than announced.
+        """
+        sha256 = hashlib.sha256()
+        if response.status_code == 206:
+            content_range = re.match(r'bytes (\d+)-\d+/(\d+|\*)', response.headers.get('Content-Range') or '')
+            if content_range is None or int(content_range.group(1)) != offset:
+                raise RequestFailedException('Unexpected Content-Range %r' % response.headers.get('Content-Range'))
+            expected = int(content_range.group(2)) if content_range.group(2) != '*' else None
+            with open(partial_path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 20), b''):
+                    sha256.update(chunk)
+            mode = 'ab'
+        else:
+            length = response.headers.get('Content-Length')
+            expected = int(length) if length and length.isdigit() else None
+            mode = 'wb'
+
+        written = 0
+        try:
+            with open(partial_path, mode) as f:
+                for chunk in response.iter_content(self.chunk_size):
+                    f.write(chunk)
+                    sha256.update(chunk)
+                    written += len(chunk)
+        finally:
+            with self.__lock:
+                report.bytes += written
+        size = os.path.getsize(partial_path)
+
+        if expected is not None and size < expected:
+            return None
+        return sha256.hexdigest()
+
+    def close(self):
+        self.transport.close()
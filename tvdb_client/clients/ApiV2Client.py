@@ -1,13 +1,113 @@
 # coding: utf-8
 from .shared import BaseClient, authentication_required
 from datetime import datetime, timedelta
-from tvdb_client.utils import requests_util, utils
-from tvdb_client.exceptions import AuthenticationFailedException
+from tvdb_client.utils import json_decoders, requests_util, utils
+from tvdb_client.utils.cache import make_cache_key
+from tvdb_client.utils.json_stream import StreamedResponse
+from tvdb_client.utils.single_flight import SingleFlight
+from tvdb_client.models import tvdb_models
+from tvdb_client.exceptions import AuthenticationFailedException, RequestFailedException, BatchTimeoutException
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import itertools
 import json
+import threading
+import time
+import warnings
 
 __author__ = 'tsantana'
 
 
+def call_many(func, item_ids, max_workers, timeout=None):
+    """
+    Calls func for every distinct id of item_ids on a pool of max_workers threads, and yields a tuple
+    (item_id, result_or_error) as soon as each call completes. result_or_error is what func returned (either the
+    result or an error from TheTVDB) or the exception it raised, so a failing item doesn't abort the batch. Ids are
+    consumed from item_ids as workers become available, so it may be a generator of any length. If timeout seconds
+    pass before the batch completes, every item not completed yet is yielded with a BatchTimeoutException.
+    """
+    deadline = time.time() + timeout if timeout is not None else None
+    item_ids = utils.unique(item_ids)
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    pending = dict()
+    timed_out = False
+
+    def call(item_id):
+        try:
+            return func(item_id)
+        except Exception as e:
+            return e
+
+    try:
+        for item_id in itertools.islice(item_ids, 2 * max_workers):
+            pending[requests_util.submit_in_context(executor, call, item_id)] = item_id
+
+        while pending:
+            remaining = deadline - time.time() if deadline is not None else None
+            done, _ = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED) \
+                if remaining is None or remaining > 0 else (set(), None)
+
+            if not done:
+                timed_out = True
+                break
+
+            for future in done:
+                for item_id in itertools.islice(item_ids, 1):
+                    pending[requests_util.submit_in_context(executor, call, item_id)] = item_id
+                yield pending.pop(future), future.result()
+
+        if timed_out:
+            for future in list(pending):
+                future.cancel()
+                yield pending.pop(future), BatchTimeoutException('Batch timed out after %s seconds.' % timeout)
+            for item_id in item_ids:
+                yield item_id, BatchTimeoutException('Batch timed out after %s seconds.' % timeout)
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=not timed_out)
+
+
+def iter_pages(get_page, ordered=True, max_workers=4):
+    """
+    Yields the items (data) of every page of a paginated response. The first page is retrieved with get_page(1) to
+    find out the number of pages (links.last) and the remaining ones are then retrieved concurrently on a pool of
+    max_workers threads, no more than max_workers pages being held at any time. If ordered, items are yielded in page
+    order, otherwise as soon as their page arrives.
+    """
+    first_page = get_page(1)
+    last_page = (first_page.get('links') or {}).get('last') or 1
+    pages = iter(range(2, last_page + 1))
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    pending = deque()
+
+    try:
+        for page in itertools.islice(pages, max_workers):
+            pending.append(requests_util.submit_in_context(executor, get_page, page))
+
+        for item in first_page.get('data', []):
+            yield item
+
+        while pending:
+            if ordered:
+                done = [pending.popleft()]
+            else:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pending.remove(future)
+
+            for future in done:
+                for page in itertools.islice(pages, 1):
+                    pending.append(requests_util.submit_in_context(executor, get_page, page))
+                for item in future.result().get('data', []):
+                    yield item
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=True)
+
+
 class ApiV2Client(BaseClient):
     """
     This is the python library implementation of the TheTVDB API V2. Details of the APIs is documented in the swagger
@@ -20,23 +120,291 @@ class ApiV2Client(BaseClient):
     API_BASE_URL = 'https://api.thetvdb.com'
     TOKEN_DURATION_SECONDS = 23 * 3600  # 23 Hours
     TOKEN_MAX_DURATION = 24 * 3600  # 24 Hours
-
-    def __init__(self, username, api_key, account_identifier, language=None):
+    TOKEN_BACKGROUND_RENEWAL_SECONDS = 22 * 3600  # 22 Hours
+    TOKEN_BACKGROUND_RETRY_SECONDS = 60
+
+    DEFAULT_CACHE_TTLS = {
+        '/series/{id}': 6 * 3600,
+        '/series/{id}/actors': 24 * 3600,
+        '/series/{id}/episodes': 6 * 3600,
+        '/series/{id}/episodes/summary': 6 * 3600,
+        '/series/{id}/images': 24 * 3600,
+        '/series/{id}/images/query': 24 * 3600,
+        '/languages': 7 * 24 * 3600,
+        '/languages/{id}': 7 * 24 * 3600,
+    }
+
+    # The parts of a series retrieved by get_series_bundle, and the types of images retrieved for the images part.
+    BUNDLE_PARTS = ('series', 'actors', 'episodes_summary', 'episodes', 'images')
+    BUNDLE_IMAGE_TYPES = ('fanart', 'poster', 'season', 'seasonwide', 'series')
+
+    # The lane of the requests of every endpoint in the scheduler, the others being interactive.
+    DEFAULT_ENDPOINT_LANES = {
+        '/series/{id}/episodes': requests_util.BATCH,
+        '/series/{id}/episodes/query': requests_util.BATCH,
+        '/updated/query': requests_util.BATCH,
+    }
+
+    # The fields TheTVDB translates, left empty when a translation is missing, and the language they fall back to.
+    TRANSLATED_FIELDS = ('seriesName', 'aliases', 'overview', 'episodeName')
+    FALLBACK_LANGUAGE = 'en'
+
+    def __init__(self, username, api_key, account_identifier, language=None, transport=None, pool_size=10, cache=None,
+                 cache_ttls=None, retry_policy=None, rate_limiter=None, circuit_breaker=None, background_renewal=False,
+                 models=False, json_decoder=None, search_index=None, coalesce_requests=True, instrumentation=None,
+                 store=None, scheduler=None, endpoint_lanes=None, token_store=None):
+        """
+        :param username: The TheTVDB user name.
+        :param api_key: The TheTVDB api key.
+        :param account_identifier: The TheTVDB account identifier (user key).
+        :param language: The optional language to be sent as Accept-Language on every request.
+        :param transport: An optional requests_util.SessionTransport (or any object with the same request method)
+        through which every request of this client is sent. If none is provided, a pooled one is created.
+        :param pool_size: The maximum number of kept-alive connections of the transport created when none is provided.
+        :param cache: An optional cache.MemoryCache, cache.SQLiteCache (or any cache.BaseCache) for the responses of
+        the read endpoints.
+        :param cache_ttls: An optional python dictionary of endpoint (i.e. '/series/{id}/actors') to the number of
+        seconds its responses are cached for. It's merged over DEFAULT_CACHE_TTLS, and endpoints without a TTL (or with
+        a TTL of 0) are never cached.
+        :param retry_policy: An optional requests_util.RetryPolicy. If none is provided, requests are retried on
+        connection errors, 429 and 5xx responses with exponential backoff.
+        :param rate_limiter: An optional requests_util.RateLimiter, which may be shared with other clients using the
+        same TheTVDB account.
+        :param circuit_breaker: An optional requests_util.CircuitBreaker, which makes requests fail fast with a
+        CircuitOpenException while TheTVDB is failing.
+        :param background_renewal: If True, once logged in the token is renewed by a background thread an hour before
+        it would be renewed inline, so no request waits for a token refresh.
+        :param models: If True, the data of the responses of the series, episodes, actors, images and languages
+        endpoints is returned as tvdb_models instances (Series, Episode...) instead of python dictionaries.
+        :param json_decoder: The optional name of the JSON decoder of the responses (orjson, ujson or json), or a
+        function decoding bytes. If none is provided, the fastest decoder installed is used.
+        :param search_index: An optional search.SeriesSearchIndex. The series retrieved by get_series and
+        search_series are added to it, and search_series answers from it, only searching TheTVDB when it has no match.
+        :param coalesce_requests: If True, concurrent calls to the same read endpoint with the same parameters share a
+        single request.
+        :param instrumentation: An optional instrumentation.Instrumentation recording the timings, retries, token
+        renewals, cache hits and payload sizes of the requests of this client, and notifying its hooks.
+        :param store: An optional store.MetadataStore, to which the series, episodes, actors and images retrieved from
+        TheTVDB (streamed responses excepted) are persisted.
+        :param scheduler: An optional requests_util.RequestScheduler sharing a concurrency budget between the
+        interactive and batch requests of this client (and of the clients it's shared with), so lookups don't queue
+        behind crawls.
+        :param endpoint_lanes: An optional python dictionary of endpoint to the lane of its requests in the scheduler.
+        It's merged over DEFAULT_ENDPOINT_LANES. The lane of a requests_util.request_context takes precedence.
+        :param token_store: An optional crawl.SharedToken (or any object with the same get, set and locked methods)
+        through which the clients of the same account in other processes share their token: a client adopts the token
+        another one logged in or renewed, instead of requesting its own.
+        """
         self.username = username
         self.api_key = api_key
         self.account_identifier = account_identifier
         self.is_authenticated = False
         self.__token = None
-        self.__auth_time = 0
+        self.__auth_time = None
+        self.__token_lock = threading.RLock()
+        self.background_renewal = background_renewal
+        self.__renewal_thread = None
+        self.__renewal_stop = threading.Event()
         self.language = language
+        self.transport = transport if transport is not None else \
+            requests_util.SessionTransport(pool_maxsize=pool_size)
+        self.cache = cache
+        self.cache_ttls = dict(self.DEFAULT_CACHE_TTLS)
+        self.cache_ttls.update(cache_ttls or {})
+        self.retry_policy = retry_policy if retry_policy is not None else requests_util.RetryPolicy()
+        self.rate_limiter = rate_limiter
+        self.circuit_breaker = circuit_breaker
+        self.models = models
+        self.json_decoder = json_decoder if callable(json_decoder) else json_decoders.get_decoder(json_decoder)
+        self.search_index = search_index
+        self.single_flight = SingleFlight() if coalesce_requests else None
+        self.instrumentation = instrumentation
+        self.store = store
+        self.scheduler = scheduler
+        self.token_store = token_store
+        self.endpoint_lanes = dict(self.DEFAULT_ENDPOINT_LANES)
+        self.endpoint_lanes.update(endpoint_lanes or {})
+        self.revalidation_stats = dict()
+        self.__stats_lock = threading.Lock()
+        self.__language_codes = None
+
+    def close(self):
+        """
+        Stops the background token renewal, if any, and releases the pooled connections held by the transport of this
+        client.
+
+        :return: None
+        """
+        self.__renewal_stop.set()
+        if self.__renewal_thread is not None:
+            self.__renewal_thread.join()
+            self.__renewal_thread = None
+        self.transport.close()
+
+    def __lane(self, url):
+        if self.scheduler is None:
+            return None
+        return requests_util.current_lane() or \
+            self.endpoint_lanes.get(utils.endpoint_from_url(url), requests_util.INTERACTIVE)
+
+    def __run_request(self, request_type, url, data=None, headers=None, stream=False):
+        if self.instrumentation is None:
+            return requests_util.run_request(request_type, url, data=data, headers=headers, transport=self.transport,
+                                             retry_policy=self.retry_policy, rate_limiter=self.rate_limiter,
+                                             circuit_breaker=self.circuit_breaker, stream=stream,
+                                             scheduler=self.scheduler, lane=self.__lane(url))
+
+        context = self.instrumentation.start_request(request_type, url, headers if headers is not None else dict())
+        try:
+            response = requests_util.run_request(request_type, url, data=data, headers=context.headers,
+                                                 transport=self.transport, retry_policy=self.retry_policy,
+                                                 rate_limiter=self.rate_limiter, circuit_breaker=self.circuit_breaker,
+                                                 stream=stream, on_attempt=context.attempt_finished,
+                                                 scheduler=self.scheduler, lane=self.__lane(url))
+        except Exception as e:
+            self.instrumentation.finish_request(context, error=e)
+            raise
+
+        self.instrumentation.finish_request(context, response, stream=stream)
+        return response
+
+    def parse_raw_response(self, raw_response, model=None):
+        if self.instrumentation is None:
+            return super(ApiV2Client, self).parse_raw_response(raw_response, model)
+
+        started_at = time.perf_counter()
+        try:
+            return super(ApiV2Client, self).parse_raw_response(raw_response, model)
+        finally:
+            url = getattr(raw_response, 'url', None)
+            self.instrumentation.observe('parse_seconds', utils.endpoint_from_url(url) if url else None,
+                                         time.perf_counter() - started_at)
+
+    def __record(self, name, url):
+        if self.instrumentation is not None:
+            self.instrumentation.increment(name, utils.endpoint_from_url(url))
+
+    def __cached_get(self, url, model=None, language=None):
+        """
+        Performs a GET request on the url provided and returns its parsed response. If a cache is set and the endpoint
+        of the url has a TTL, the response is served from the cache when present and stored in it otherwise. Expired
+        entries with validators are revalidated with a conditional request: if TheTVDB answers 304 (Not Modified), the
+        cached response is kept for another TTL and the size of its body is accounted in revalidation_stats.
+
+        Concurrent calls for the same url, language and model are coalesced into a single request, unless coalescing
+        is disabled.
+
+        :param url: The full url of the request.
+        :param model: The tvdb_models.TVDBModel subclass of the data of the response, used when models are enabled.
+        The cache always holds python dictionaries, which are converted on every hit.
+        :param language: The language requested, instead of the language of the client. Cached responses are kept
+        apart by language.
+        :return: a python dictionary with either the result of the request or an error from TheTVDB.
+        """
+        model = model if self.models else None
+        language = language or self.language
+        ttl = self.cache_ttls.get(utils.endpoint_from_url(url)) if self.cache is not None else None
+        cache_key = make_cache_key('get', url, language)
+        entry = None
+
+        if ttl:
+            entry = self.cache.get_entry(cache_key)
+            if entry is not None and entry.is_fresh():
+                self.__record('cache_hits', url)
+                return self.__to_model(entry.value, model)
+            self.__record('cache_misses', url)
+
+        if self.single_flight is not None:
+            # Callers asking for models and for python dictionaries (i.e. __get_translations) aren't coalesced.
+            return self.single_flight.do((cache_key, model),
+                                         lambda: self.__get(url, model, ttl, cache_key, entry, language))
+
+        return self.__get(url, model, ttl, cache_key, entry, language)
+
+    def __get(self, url, model, ttl, cache_key, entry, language=None):
+        headers = self.__get_header_with_auth(language)
+        if entry is not None and entry.validators:
+            requests_util.add_conditional_headers(headers, entry.validators)
+
+        raw_response = self.__run_request('get', url, headers=headers)
+
+        if entry is not None and entry.validators and raw_response.status_code == 304:
+            validators = dict(entry.validators)
+            validators.update((k, v) for k, v in (requests_util.response_validators(raw_response) or {}).items()
+                              if v and k != 'size')
+            self.cache.set(cache_key, entry.value, ttl, validators)
+            self.__record_revalidation(url, validators['size'])
+            self.__record('cache_revalidations', url)
+            return self.__to_model(entry.value, model)
+
+        if not ttl:
+            response = self.parse_raw_response(raw_response, model)
+        else:
+            response = self.parse_raw_response(raw_response)
+            if raw_response.status_code == 200:
+                self.cache.set(cache_key, response, ttl, requests_util.response_validators(raw_response))
+            response = self.__to_model(response, model)
+
+        # The store keeps one version of every entity: the one in the language of the client.
+        if self.store is not None and raw_response.status_code == 200 and language == self.language:
+            self.store.store_response(url, response)
+
+        return response
+
+    def __streamed_get(self, url, model=None):
+        """
+        Performs a GET request on the url provided without reading its body, which is then parsed incrementally as the
+        returned StreamedResponse is iterated over. Streamed responses are never cached.
+
+        :param url: The full url of the request.
+        :param model: The tvdb_models.TVDBModel subclass of the items of the response, used when models are enabled.
+        :return: a json_stream.StreamedResponse.
+        :raise RequestFailedException: if TheTVDB answers with an error.
+        """
+        raw_response = self.__run_request('get', url, headers=self.__get_header_with_auth(), stream=True)
+
+        if raw_response.status_code != 200:
+            error = self.parse_raw_response(raw_response)
+            raise RequestFailedException('Failed to stream %s: %s' % (url, error.get('message')), error)
+
+        return StreamedResponse(raw_response, model if self.models else None)
+
+    @staticmethod
+    def __to_model(response, model):
+        return tvdb_models.from_response(response, model) if model is not None else response
+
+    def __record_revalidation(self, url, bytes_saved):
+        endpoint = utils.endpoint_from_url(url)
 
-    def __get_header(self):
+        with self.__stats_lock:
+            stats = self.revalidation_stats.setdefault(endpoint, {'revalidated': 0, 'bytes_saved': 0})
+            stats['revalidated'] += 1
+            stats['bytes_saved'] += bytes_saved
+
+    def invalidate_series(self, series_id):
+        """
+        Removes from the cache every response of the /series/{id} endpoints of a series, in all languages, so they're
+        retrieved again from TheTVDB. i.e. after get_updated reports the series has changed.
+
+        :param series_id: The TheTVDB id of the series.
+        :return: the number of cached responses removed.
+        """
+        if self.cache is None:
+            return 0
+
+        url = self.API_BASE_URL + '/series/%d' % series_id
+
+        return self.cache.delete_prefix(make_cache_key('get', url)) + \
+            self.cache.delete_prefix(make_cache_key('get', url + '/').rstrip())
+
+    def __get_header(self, language=None):
         header = dict()
         header['Content-Type'] = 'application/json'
         header['User-Agent'] = 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10.11; rv:47.0) Gecko/20100101 Firefox/47.0'
 
-        if self.language:
-            header['Accept-Language'] = self.language
+        language = language or self.language
+        if language:
+            header['Accept-Language'] = language
 
         return header
 
@@ -44,14 +412,17 @@ class ApiV2Client(BaseClient):
         headers = self.__get_header()
         headers['Authorization'] = 'Bearer %s' % self.__token
 
-        resp = requests_util.run_request('get', self.API_BASE_URL + '/refresh_token', headers=headers)
+        resp = self.__run_request('get', self.API_BASE_URL + '/refresh_token', headers=headers)
 
-        if resp.status_code == 200:
+        if resp is not None and resp.status_code == 200:
             token_resp = self.parse_raw_response(resp)
-            self.__token = token_resp['token']
-            self.__auth_time = datetime.now()
+            self.__token, self.__auth_time = token_resp['token'], datetime.now()
+            self.__record('token_refreshes', self.API_BASE_URL + '/refresh_token')
+            self.__share_token()
+        else:
+            self.login()
 
-    def __get_header_with_auth(self):
+    def __get_header_with_auth(self, language=None):
         """
         This private method returns the HTTP heder filled with the Authorization information with the user token.
         The token validity is monitored whenever this function is called, so according to the swagger page of TheTVDB
@@ -59,42 +430,142 @@ class ApiV2Client(BaseClient):
         23 hours already, this function will also perform a token refresh using TheTVDB refresh_token API. If over 24
         hours have passed since the token generation, a login is performed to generate a new one, instead.
 
+        This is safe to call from many threads at once: only the first thread to find the token due for renewal renews
+        it, while the others wait and then use the renewed token.
+
+        :param language: The optional Accept-Language, instead of the language of the client.
         :return: A python dictionary representing the HTTP header to be used in TheTVDB API calls.
         """
-        auth_header = self.__get_header()
+        started_at = time.perf_counter() if self.instrumentation is not None else None
+
+        if self.token_needs_renewal():
+            with self.__token_lock:
+                if self.token_needs_renewal():
+                    self.renew_token()
+
+        auth_header = self.__get_header(language)
         auth_header['Authorization'] = 'Bearer %s' % self.__token
-        token_renew_time = self.__auth_time + timedelta(seconds=self.TOKEN_DURATION_SECONDS)
 
-        if datetime.now() > token_renew_time:
-            token_max_time = self.__auth_time + timedelta(seconds=self.TOKEN_MAX_DURATION)
-            if datetime.now() < token_max_time:
+        if started_at is not None:
+            self.instrumentation.observe('auth_seconds', None, time.perf_counter() - started_at)
+
+        return auth_header
+
+    def token_needs_renewal(self, renewal_seconds=None):
+        """
+        Tells whether the current token was generated over 23 hours ago and must be refreshed (or recreated) before
+        being used again.
+
+        :param renewal_seconds: The optional age, in seconds, from which the token must be renewed. Defaults to
+        TOKEN_DURATION_SECONDS.
+        :return: True if the token must be renewed, False otherwise (also when no token was generated yet).
+        """
+        auth_time = self.__auth_time
+        if auth_time is None:
+            return False
+
+        token_renew_time = auth_time + timedelta(seconds=renewal_seconds or self.TOKEN_DURATION_SECONDS)
+
+        return datetime.now() > token_renew_time
+
+    def renew_token(self):
+        """
+        Renews the current token. If it's still within its 24 hours of validity it's refreshed with TheTVDB
+        refresh_token API, otherwise a login is performed to generate a new one.
+
+        :return: None
+        """
+        with self.__token_lock:
+            # Another process may have renewed the shared token already.
+            if self.token_store is not None and self.__adopt_shared_token():
+                return
+
+            if self.__auth_time is not None and \
+                    datetime.now() < self.__auth_time + timedelta(seconds=self.TOKEN_MAX_DURATION):
                 self.__refresh_token()
             else:
                 self.login()
 
-            auth_header['Authorization'] = 'Bearer %s' % self.__token
+    def __adopt_shared_token(self):
+        """
+        Takes the token of the token store if it's newer than the current one and doesn't need renewal yet.
 
-        return auth_header
+        :return: True if the token was adopted, False otherwise.
+        """
+        shared = self.token_store.get()
+        if shared is None:
+            return False
+
+        token, auth_time = shared[0], datetime.fromtimestamp(shared[1])
+        if self.__auth_time is not None and auth_time <= self.__auth_time or \
+                datetime.now() > auth_time + timedelta(seconds=self.TOKEN_DURATION_SECONDS):
+            return False
+
+        self.__token, self.__auth_time = token, auth_time
+        self.is_authenticated = True
+        return True
+
+    def __share_token(self):
+        if self.token_store is not None:
+            self.token_store.set(self.__token, self.__auth_time.timestamp())
+
+    def __renew_token_in_background(self):
+        while not self.__renewal_stop.is_set():
+            with self.__token_lock:
+                renewal_time = self.__auth_time + timedelta(seconds=self.TOKEN_BACKGROUND_RENEWAL_SECONDS)
+
+            wait = (renewal_time - datetime.now()).total_seconds()
+            if wait > 0:
+                self.__renewal_stop.wait(wait)
+                continue
+
+            try:
+                with self.__token_lock:
+                    if self.token_needs_renewal(self.TOKEN_BACKGROUND_RENEWAL_SECONDS):
+                        self.renew_token()
+            except Exception as e:
+                warnings.warn('Background token renewal failed, retrying in %d seconds: %s' %
+                              (self.TOKEN_BACKGROUND_RETRY_SECONDS, e))
+                self.__renewal_stop.wait(self.TOKEN_BACKGROUND_RETRY_SECONDS)
 
     def login(self):
         """
-        This method performs the login on TheTVDB given the api key, user name and account identifier.
+        This method performs the login on TheTVDB given the api key, user name and account identifier. With a token
+        store, the token another process logged in with is used instead, if it's newer than the current one.
 
         :return: None
         """
+        with self.__token_lock:
+            if self.token_store is None:
+                self.__login()
+            else:
+                # Only one process logs in at a time, so the others adopt its token instead of requesting their own.
+                with self.token_store.locked():
+                    if not self.__adopt_shared_token():
+                        self.__login()
+                        self.__share_token()
+
+            if self.background_renewal and self.__renewal_thread is None:
+                self.__renewal_stop.clear()
+                self.__renewal_thread = threading.Thread(target=self.__renew_token_in_background,
+                                                         name='tvdb-token-renewal')
+                self.__renewal_thread.daemon = True
+                self.__renewal_thread.start()
+
+    def __login(self):
         auth_data = dict()
         auth_data['apikey'] = self.api_key
         auth_data['username'] = self.username
         auth_data['userkey'] = self.account_identifier
 
-        auth_resp = requests_util.run_request('post', self.API_BASE_URL + '/login', data=json.dumps(auth_data),
-                                              headers=self.__get_header())
+        auth_resp = self.__run_request('post', self.API_BASE_URL + '/login', data=json.dumps(auth_data),
+                                       headers=self.__get_header())
 
-        if auth_resp.status_code == 200:
+        if auth_resp is not None and auth_resp.status_code == 200:
             auth_resp_data = self.parse_raw_response(auth_resp)
-            self.__token = auth_resp_data['token']
-            self.__auth_time = datetime.now()
+            self.__token, self.__auth_time = auth_resp_data['token'], datetime.now()
             self.is_authenticated = True
+            self.__record('logins', self.API_BASE_URL + '/login')
         else:
             raise AuthenticationFailedException('Authentication failed!')
 
@@ -106,32 +577,60 @@ class ApiV2Client(BaseClient):
         :param name: the name of the series to look for
         :param imdb_id: the IMDB id of the series to look for
         :param zap2it_id: the zap2it id of the series to look for.
-        :return: a python dictionary with either the result of the search or an error from TheTVDB.
+        :return: a python dictionary with either the result of the search or an error from TheTVDB. If a search index
+        is set and has matches, they're returned without searching TheTVDB.
         """
         arguments = locals()
         optional_parameters = {'name': 'name', 'imdb_id': 'imdbId', 'zap2it_id': 'zap2itId'}
 
         query_string = utils.query_param_string_from_option_args(optional_parameters, arguments)
 
-        raw_response = requests_util.run_request('get', '%s%s?%s' % (self.API_BASE_URL, '/search/series',
-                                                                     query_string),
-                                                 headers=self.__get_header_with_auth())
+        if self.search_index is not None:
+            series = self.search_index.search(name=name, imdb_id=imdb_id, zap2it_id=zap2it_id)
+            if series:
+                return self.__to_model({'data': series}, tvdb_models.Series if self.models else None)
 
-        return self.parse_raw_response(raw_response)
+        response = self.__cached_get('%s%s?%s' % (self.API_BASE_URL, '/search/series', query_string),
+                                     tvdb_models.Series)
+
+        if self.search_index is not None:
+            for series in response.get('data') or []:
+                self.search_index.add(series)
+
+        return response
 
     @authentication_required
-    def get_series(self, series_id):
+    def get_series(self, series_id, languages=None):
         """
         Retrieves the information of a series from TheTVDB given the series ID.
 
         :param series_id: the id of the series on TheTVDB.
+        :param languages: The optional codes of the languages (i.e. ['en', 'de']) the series is retrieved in, all at
+        once. See __get_translations.
         :return: a python dictionary with either the result of the search or an error from TheTVDB.
         """
 
-        raw_response = requests_util.run_request('get', self.API_BASE_URL + '/series/%d' % series_id,
-                                                 headers=self.__get_header_with_auth())
+        if languages is not None:
+            return self.__get_translations(self.API_BASE_URL + '/series/%d' % series_id, tvdb_models.Series, languages)
 
-        return self.parse_raw_response(raw_response)
+        response = self.__cached_get(self.API_BASE_URL + '/series/%d' % series_id, tvdb_models.Series)
+
+        if self.search_index is not None and 'data' in response:
+            self.search_index.add(response['data'])
+
+        return response
+
+    @authentication_required
+    def get_series_many(self, series_ids, max_workers=8, timeout=None):
+        """
+        Retrieves the information of many series concurrently. See call_many.
+
+        :param series_ids: An iterable of TheTVDB ids of series. Repeated ids are only retrieved once.
+        :param max_workers: The number of series retrieved concurrently.
+        :param timeout: The optional number of seconds the whole batch may take.
+        :return: a generator of tuples (series_id, result_or_error), in completion order.
+        """
+        return call_many(self.get_series, series_ids, max_workers, timeout)
 
     @authentication_required
     def get_series_actors(self, series_id):
@@ -142,30 +641,27 @@ class ApiV2Client(BaseClient):
         :return: a python dictionary with either the result of the search or an error from TheTVDB.
         """
 
-        raw_response = requests_util.run_request('get', self.API_BASE_URL + '/series/%d/actors' % series_id,
-                                                 headers=self.__get_header_with_auth())
-
-        return self.parse_raw_response(raw_response)
+        return self.__cached_get(self.API_BASE_URL + '/series/%d/actors' % series_id, tvdb_models.Actor)
 
     @authentication_required
-    def get_series_episodes(self, series_id, page=1):
+    def __get_series_episodes(self, series_id, page=1, stream=False):
         """
         Retrieves all episodes for a particular series given its TheTVDB id. It retrieves a maximum of 100 results per
         page.
 
         :param series_id: The TheTVDB id of the series.
         :param page: The page number. If none is provided, 1 is used by default.
+        :param stream: If True, a json_stream.StreamedResponse of the episodes is returned instead.
         :return: a python dictionary with either the result of the search or an error from TheTVDB.
         """
 
-        raw_response = requests_util.run_request('get', self.API_BASE_URL + '/series/%d/episodes?page=%d' %
-                                                 (series_id, page), headers=self.__get_header_with_auth())
+        url = self.API_BASE_URL + '/series/%d/episodes?page=%d' % (series_id, page)
 
-        return self.parse_raw_response(raw_response)
+        return self.__streamed_get(url, tvdb_models.Episode) if stream else self.__cached_get(url, tvdb_models.Episode)
 
     @authentication_required
     def get_series_episodes(self, series_id, episode_number=None, aired_season=None, aired_episode=None,
-                            dvd_season=None, dvd_episode=None, imdb_id=None, page=1):
+                            dvd_season=None, dvd_episode=None, imdb_id=None, page=1, stream=False):
 
         """
         Retrieves all episodes for a particular series given its TheTVDB and filtered by additional optional details.
@@ -178,20 +674,50 @@ class ApiV2Client(BaseClient):
         :param dvd_episode: The optional DVD episode number.
         :param imdb_id: The optional IMDB Id of the series.
         :param page: The page number. If none is provided, 1 is used by default.
+        :param stream: If True, the episodes are parsed as they're received: a json_stream.StreamedResponse is
+        returned, which yields them when iterated over and exposes the links of the page. Errors from TheTVDB are then
+        raised as RequestFailedException.
         :return: a python dictionary with either the result of the search or an error from TheTVDB.
         """
 
         arguments = locals()
         optional_parameters = {'episode_number': 'absoluteNumber', 'aired_season': 'airedSeason',
                                'aired_episode': 'airedEpisode', 'dvd_season': 'dvdSeason', 'dvd_episode': 'dvdEpisode',
-                               'imdb_id': 'imdbId', 'page': 'page'}
+                               'imdb_id': 'imdbId'}
 
         query_string = utils.query_param_string_from_option_args(optional_parameters, arguments)
 
-        raw_response = requests_util.run_request('get', self.API_BASE_URL + '/series/%d/episodes/query?%s' %
-                                                 (series_id, query_string), headers=self.__get_header_with_auth())
+        if len(query_string):
+            url = self.API_BASE_URL + '/series/%d/episodes/query?%s&page=%d' % (series_id, query_string, page)
 
-        return self.parse_raw_response(raw_response)
+            return self.__streamed_get(url, tvdb_models.Episode) if stream else \
+                self.__cached_get(url, tvdb_models.Episode)
+        else:
+            return self.__get_series_episodes(series_id, page, stream)
+
+    @authentication_required
+    def iter_series_episodes(self, series_id, ordered=True, max_workers=4):
+        """
+        Iterates over all episodes of a series given its TheTVDB id, across all pages. The first page is retrieved to
+        find out the number of pages (links.last) and the remaining ones are then retrieved concurrently. No more than
+        max_workers pages are held at any time, so memory stays bounded regardless of the number of episodes.
+
+        :param series_id: The TheTVDB id of the series.
+        :param ordered: If True, episodes are yielded in page order. Otherwise, they're yielded as soon as their page
+        arrives.
+        :param max_workers: The number of pages retrieved concurrently.
+        :return: a generator of the episodes of the series: python dictionaries, or tvdb_models.Episode instances if
+        models are enabled.
+        """
+        return iter_pages(lambda page: self.__get_episodes_page(series_id, page), ordered, max_workers)
+
+    def __get_episodes_page(self, series_id, page):
+        response = self.get_series_episodes(series_id, page=page)
+
+        if 'data' not in response and response.get('code') != 404:
+            raise RequestFailedException('Failed to retrieve page %d of the episodes of series %d: %s' %
+                                         (page, series_id, response.get('message')), response)
+        return response
 
     @authentication_required
     def get_series_episodes_summary(self, series_id):
@@ -202,10 +728,7 @@ class ApiV2Client(BaseClient):
         :return: a python dictionary with either the result of the search or an error from TheTVDB.
         """
 
-        raw_response = requests_util.run_request('get', self.API_BASE_URL + '/series/%d/episodes/summary' % series_id,
-                                                 headers=self.__get_header_with_auth())
-
-        return self.parse_raw_response(raw_response)
+        return self.__cached_get(self.API_BASE_URL + '/series/%d/episodes/summary' % series_id)
 
     @authentication_required
     def __get_series_images(self, series_id):
@@ -217,10 +740,7 @@ class ApiV2Client(BaseClient):
         :return: a python dictionary with either the result of the search or an error from TheTVDB.
         """
 
-        raw_response = requests_util.run_request('get', self.API_BASE_URL + '/series/%d/images' % series_id,
-                                                 headers=self.__get_header_with_auth())
-
-        return self.parse_raw_response(raw_response)
+        return self.__cached_get(self.API_BASE_URL + '/series/%d/images' % series_id, tvdb_models.Image)
 
     @authentication_required
     def get_series_images(self, series_id, image_type=None, resolution=None, sub_key=None):
@@ -242,20 +762,143 @@ class ApiV2Client(BaseClient):
 
         if len(query_string):
 
-            raw_response = requests_util.run_request('get', self.API_BASE_URL + '/series/%d/images/query?%s' %
-                                                     (series_id, query_string), headers=self.__get_header_with_auth())
-            return self.parse_raw_response(raw_response)
+            return self.__cached_get(self.API_BASE_URL + '/series/%d/images/query?%s' % (series_id, query_string),
+                                     tvdb_models.Image)
         else:
             return self.__get_series_images(series_id)
 
     @authentication_required
-    def get_updated(self, from_time, to_time=None):
+    def get_series_bundle(self, series_id, include=BUNDLE_PARTS, episode_details=False,
+                          image_types=BUNDLE_IMAGE_TYPES, max_workers=8, timeout=None):
+        """
+        Retrieves everything about a series at once: its information, actors, episodes summary, every page of its
+        episodes and its images of every type. All the requests are sent concurrently (the pages of episodes as soon as
+        the first one tells how many there are), so the bundle takes about as long as the slowest of them rather than
+        their sum.
+
+        Parts failing don't fail the bundle: their errors are returned alongside the parts retrieved.
+
+        :param series_id: The TheTVDB id of the series.
+        :param include: The parts to retrieve, among BUNDLE_PARTS.
+        :param episode_details: If True, the full information of every episode is retrieved with get_episode, in place
+        of the summaries listed by the pages of episodes.
+        :param image_types: The types of images retrieved for the images part.
+        :param max_workers: The number of requests sent concurrently.
+        :param timeout: The optional number of seconds the whole bundle may take. Parts not retrieved by then fail with
+        a timeout error.
+        :return: a python dictionary with the parts retrieved in data (series, actors, episodes_summary, episodes and
+        images, a python dictionary of image type to images) and the errors from TheTVDB of the parts that failed in
+        errors (the errors of episodes, images and episode details being keyed by page, image type and episode id). If
+        the series itself can't be retrieved, its error is returned instead.
+        """
+        include = set(include)
+        if include - set(self.BUNDLE_PARTS):
+            raise ValueError('Unknown bundle parts: %s' % ', '.join(sorted(include - set(self.BUNDLE_PARTS))))
+
+        deadline = time.time() + timeout if timeout is not None else None
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        pending = dict()
+        data, errors, pages, images, details = dict(), dict(), dict(), dict(), dict()
+        timed_out = False
+
+        def submit(part, key, func, *args, **kwargs):
+            pending[requests_util.submit_in_context(executor, func, *args, **kwargs)] = (part, key)
+
+        def episode_id(episode):
+            # Episodes are tvdb_models.Episode instances when models are enabled.
+            return episode['id'] if isinstance(episode, dict) else episode.id
+
+        for part, func in (('series', self.get_series), ('actors', self.get_series_actors),
+                           ('episodes_summary', self.get_series_episodes_summary)):
+            if part in include:
+                submit(part, None, func, series_id)
+        if 'episodes' in include:
+            submit('episodes', 1, self.get_series_episodes, series_id, page=1)
+        if 'images' in include:
+            for image_type in image_types:
+                submit('images', image_type, self.get_series_images, series_id, image_type=image_type)
+
+        try:
+            while pending:
+                remaining = deadline - time.time() if deadline is not None else None
+                done, _ = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED) \
+                    if remaining is None or remaining > 0 else (set(), None)
+
+                if not done:
+                    timed_out = True
+                    error = self.__error_from_exception(
+                        BatchTimeoutException('Bundle timed out after %s seconds.' % timeout))
+                    for part, key in pending.values():
+                        if key is None:
+                            errors[part] = error
+                        else:
+                            errors.setdefault(part, dict())[key] = error
+                    break
+
+                for future in done:
+                    part, key = pending.pop(future)
+                    try:
+                        response = future.result()
+                    except Exception as e:
+                        response = self.__error_from_exception(e)
+
+                    if part == 'episodes':
+                        if 'data' in response:
+                            pages[key] = response['data']
+                            if key == 1:
+                                for page in range(2, ((response.get('links') or {}).get('last') or 1) + 1):
+                                    submit('episodes', page, self.get_series_episodes, series_id, page=page)
+                            if episode_details:
+                                for episode in response['data']:
+                                    submit('episode_details', episode_id(episode), self.get_episode,
+                                           episode_id(episode))
+                        elif response.get('code') == 404 and key == 1:
+                            pages[key] = []
+                        else:
+                            errors.setdefault('episodes', dict())[key] = response
+                    elif part == 'images':
+                        if 'data' in response or response.get('code') == 404:
+                            images[key] = response.get('data') or []
+                        else:
+                            errors.setdefault('images', dict())[key] = response
+                    elif part == 'episode_details':
+                        if 'data' in response:
+                            details[key] = response['data']
+                        else:
+                            errors.setdefault('episode_details', dict())[key] = response
+                    elif 'data' in response:
+                        data[part] = response['data']
+                    else:
+                        errors[part] = response
+        finally:
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=not timed_out)
+
+        if 'series' in errors:
+            return errors['series']
+
+        if 'episodes' in include and 'episodes' not in errors:
+            episodes = [episode for page in sorted(pages) for episode in pages[page]]
+            data['episodes'] = [details.get(episode_id(episode), episode) for episode in episodes]
+        if 'images' in include:
+            data['images'] = images
+
+        return {'data': data, 'errors': errors}
+
+    def __error_from_exception(self, exception):
+        return {'client_class': self.__class__.__name__, 'code': None, 'message': str(exception)}
+
+    @authentication_required
+    def get_updated(self, from_time, to_time=None, stream=False):
         """
         Retrives a list of series that have changed on TheTVDB since a provided from time parameter and optionally to an
         specified to time.
 
         :param from_time: An epoch representation of the date from which to restrict the query to.
         :param to_time: An optional epcoh representation of the date to which to restrict the query to.
+        :param stream: If True, a json_stream.StreamedResponse of the updates is returned instead. See
+        get_series_episodes.
         :return: a python dictionary with either the result of the search or an error from TheTVDB.
         """
 
@@ -265,10 +908,9 @@ class ApiV2Client(BaseClient):
         query_string = 'fromTime=%s&%s' % (from_time,
                                            utils.query_param_string_from_option_args(optional_parameters, arguments))
 
-        raw_response = requests_util.run_request('get', self.API_BASE_URL + '/updated/query?%s' % query_string,
-                                                 headers=self.__get_header_with_auth())
+        url = self.API_BASE_URL + '/updated/query?%s' % query_string
 
-        return self.parse_raw_response(raw_response)
+        return self.__streamed_get(url) if stream else self.__cached_get(url)
 
     @authentication_required
     def get_user(self):
@@ -278,8 +920,8 @@ class ApiV2Client(BaseClient):
         :return: a python dictionary with either the result of the search or an error from TheTVDB.
         """
 
-        return self.parse_raw_response(requests_util.run_request('get', self.API_BASE_URL + '/user',
-                                                                 headers=self.__get_header_with_auth()))
+        return self.parse_raw_response(self.__run_request('get', self.API_BASE_URL + '/user',
+                                                          headers=self.__get_header_with_auth()))
 
     @authentication_required
     def get_user_favorites(self):
@@ -289,8 +931,8 @@ class ApiV2Client(BaseClient):
         :return: a python dictionary with either the result of the search or an error from TheTVDB.
         """
 
-        return self.parse_raw_response(requests_util.run_request('get', self.API_BASE_URL + '/user/favorites',
-                                                                 headers=self.__get_header_with_auth()))
+        return self.parse_raw_response(self.__run_request('get', self.API_BASE_URL + '/user/favorites',
+                                                          headers=self.__get_header_with_auth()))
 
     @authentication_required
     def delete_user_favorite(self, series_id):
@@ -301,9 +943,9 @@ class ApiV2Client(BaseClient):
         :return: a python dictionary with either the result of the search or an error from TheTVDB.
         """
 
-        return self.parse_raw_response(requests_util.run_request('delete',
-                                                                 self.API_BASE_URL + '/user/favorites/%d' % series_id,
-                                                                 headers=self.__get_header_with_auth()))
+        return self.parse_raw_response(self.__run_request('delete',
+                                                          self.API_BASE_URL + '/user/favorites/%d' % series_id,
+                                                          headers=self.__get_header_with_auth()))
 
     @authentication_required
     def add_user_favorite(self, series_id):
@@ -314,38 +956,47 @@ class ApiV2Client(BaseClient):
         :return: a python dictionary with either the result of the search or an error from TheTVDB.
         """
 
-        return self.parse_raw_response(requests_util.run_request('put',
-                                                                 self.API_BASE_URL + '/user/favorites/%d' % series_id,
-                                                                 headers=self.__get_header_with_auth()))
+        return self.parse_raw_response(self.__run_request('put',
+                                                          self.API_BASE_URL + '/user/favorites/%d' % series_id,
+                                                          headers=self.__get_header_with_auth()))
 
     @authentication_required
-    def __get_user_ratings(self):
+    def __get_user_ratings(self, stream=False):
         """
         Returns a list of the ratings provided by the current user.
 
+        :param stream: If True, a json_stream.StreamedResponse of the ratings is returned instead.
         :return: a python dictionary with either the result of the search or an error from TheTVDB.
         """
 
-        return self.parse_raw_response(requests_util.run_request('get', self.API_BASE_URL + '/user/ratings',
-                                                                 headers=self.__get_header_with_auth()))
+        if stream:
+            return self.__streamed_get(self.API_BASE_URL + '/user/ratings')
+
+        return self.parse_raw_response(self.__run_request('get', self.API_BASE_URL + '/user/ratings',
+                                                          headers=self.__get_header_with_auth()))
 
     @authentication_required
-    def get_user_ratings(self, item_type=None):
+    def get_user_ratings(self, item_type=None, stream=False):
         """
         Returns a list of the ratings for the type of item provided, for the current user.
 
         :param item_type: One of: series, episode or banner.
+        :param stream: If True, a json_stream.StreamedResponse of the ratings is returned instead. See
+        get_series_episodes.
         :return: a python dictionary with either the result of the search or an error from TheTVDB.
         """
 
         if item_type:
             query_string = 'itemType=%s' % item_type
 
+            if stream:
+                return self.__streamed_get(self.API_BASE_URL + '/user/ratings/query?%s' % query_string)
+
             return self.parse_raw_response(
-                requests_util.run_request('get', self.API_BASE_URL + '/user/ratings/query?%s' % query_string,
-                                          headers=self.__get_header_with_auth()))
+                self.__run_request('get', self.API_BASE_URL + '/user/ratings/query?%s' % query_string,
+                                   headers=self.__get_header_with_auth()))
         else:
-            return self.__get_user_ratings()
+            return self.__get_user_ratings(stream)
 
     @authentication_required
     def add_user_rating(self, item_type, item_id, item_rating):
@@ -358,10 +1009,10 @@ class ApiV2Client(BaseClient):
         :return:
         """
 
-        raw_response = requests_util.run_request('put',
-                                                 self.API_BASE_URL + '/user/ratings/%s/%d/%d' %
-                                                 (item_type, item_id, item_rating),
-                                                 headers=self.__get_header_with_auth())
+        raw_response = self.__run_request('put',
+                                          self.API_BASE_URL + '/user/ratings/%s/%d/%d' %
+                                          (item_type, item_id, item_rating),
+                                          headers=self.__get_header_with_auth())
 
         return self.parse_raw_response(raw_response)
 
@@ -375,25 +1026,87 @@ class ApiV2Client(BaseClient):
         :return: a python dictionary with either the result of the search or an error from TheTVDB.
         """
 
-        raw_response = requests_util.run_request('delete',
-                                                 self.API_BASE_URL + '/user/ratings/%s/%d' %
-                                                 (item_type, item_id), headers=self.__get_header_with_auth())
+        raw_response = self.__run_request('delete',
+                                          self.API_BASE_URL + '/user/ratings/%s/%d' %
+                                          (item_type, item_id), headers=self.__get_header_with_auth())
 
         return self.parse_raw_response(raw_response)
 
     @authentication_required
-    def get_episode(self, episode_id):
+    def get_episode(self, episode_id, languages=None):
         """
         Returns the full information of the episode belonging to the Id provided.
 
         :param episode_id: The TheTVDB id of the episode.
+        :param languages: The optional codes of the languages the episode is retrieved in, all at once. See
+        __get_translations.
         :return: a python dictionary with either the result of the search or an error from TheTVDB.
         """
 
-        raw_response = requests_util.run_request('get', self.API_BASE_URL + '/episodes/%d' % episode_id,
-                                                 headers=self.__get_header_with_auth())
+        if languages is not None:
+            return self.__get_translations(self.API_BASE_URL + '/episodes/%d' % episode_id, tvdb_models.Episode,
+                                           languages)
 
-        return self.parse_raw_response(raw_response)
+        return self.__cached_get(self.API_BASE_URL + '/episodes/%d' % episode_id, tvdb_models.Episode)
+
+    @authentication_required
+    def get_episodes_many(self, episode_ids, max_workers=8, timeout=None):
+        """
+        Retrieves the full information of many episodes concurrently. See call_many.
+
+        :param episode_ids: An iterable of TheTVDB ids of episodes. Repeated ids are only retrieved once.
+        :param max_workers: The number of episodes retrieved concurrently.
+        :param timeout: The optional number of seconds the whole batch may take.
+        :return: a generator of tuples (episode_id, result_or_error), in completion order.
+        """
+        return call_many(self.get_episode, episode_ids, max_workers, timeout)
+
+    def __get_translations(self, url, model, languages):
+        """
+        Retrieves an entity in several languages concurrently, each language being a request (and a cache entry) of
+        its own. The translated fields (TRANSLATED_FIELDS) left empty by TheTVDB in a language are filled from the next
+        languages requested, then from FALLBACK_LANGUAGE, which is retrieved as well when it's not requested.
+
+        :param url: The full url of the entity.
+        :param model: The tvdb_models.TVDBModel subclass of the entity, used when models are enabled.
+        :param languages: The codes of the languages, in order of preference.
+        :return: a python dictionary with the entity in every language in data, the errors from TheTVDB of the
+        languages that failed in errors (both keyed by language code) and, in fallbacks, the language every field
+        filled from another language was taken from. If no language can be retrieved, the error of the first language
+        is returned instead.
+        :raise ValueError: if a language is not a language of TheTVDB.
+        """
+        languages = self.validate_languages(languages)
+        fetched = list(utils.unique(languages + [self.FALLBACK_LANGUAGE]))
+
+        with ThreadPoolExecutor(max_workers=len(fetched)) as executor:
+            futures = [requests_util.submit_in_context(executor, self.__cached_get, url, None, language)
+                       for language in fetched]
+            responses = dict(zip(fetched, [future.result() for future in futures]))
+
+        data, errors, fallbacks = dict(), dict(), dict()
+        for language in languages:
+            response = responses[language]
+            if 'data' not in response:
+                errors[language] = response
+                continue
+
+            item = dict(response['data'])
+            for field in self.TRANSLATED_FIELDS:
+                if field not in item or item[field] not in (None, '', []):
+                    continue
+                for other in fetched:
+                    value = (responses[other].get('data') or {}).get(field)
+                    if other != language and value not in (None, '', []):
+                        item[field] = value
+                        fallbacks.setdefault(language, dict())[field] = other
+                        break
+            data[language] = model(item) if self.models else item
+
+        if not data:
+            return errors[languages[0]]
+
+        return {'data': data, 'errors': errors, 'fallbacks': fallbacks}
 
     @authentication_required
     def get_languages(self):
@@ -403,10 +1116,42 @@ class ApiV2Client(BaseClient):
         :return: a python dictionary with either the result of the search or an error from TheTVDB.
         """
 
-        raw_response = requests_util.run_request('get', self.API_BASE_URL + '/languages',
-                                                 headers=self.__get_header_with_auth())
+        return self.__cached_get(self.API_BASE_URL + '/languages', tvdb_models.Language)
 
-        return self.parse_raw_response(raw_response)
+    @authentication_required
+    def language_codes(self):
+        """
+        Returns the codes of the languages of TheTVDB. They're only retrieved the first time, then kept in memory for
+        the lifetime of the client, so languages are validated without any request.
+
+        :return: a frozenset of the codes (abbreviations) of the languages of TheTVDB, i.e. en or de.
+        :raise RequestFailedException: if the languages can't be retrieved.
+        """
+        if self.__language_codes is None:
+            response = self.__cached_get(self.API_BASE_URL + '/languages')
+            if 'data' not in response:
+                raise RequestFailedException('Failed to retrieve the languages: %s' % response.get('message'), response)
+            self.__language_codes = frozenset(language['abbreviation'] for language in response['data'])
+
+        return self.__language_codes
+
+    def validate_languages(self, languages):
+        """
+        Checks language codes against the languages of TheTVDB, which are only retrieved the first time.
+
+        :param languages: A language code, or an iterable of them.
+        :return: a list of the distinct language codes, in their order.
+        :raise ValueError: if a language is not a language of TheTVDB.
+        """
+        languages = [languages] if isinstance(languages, str) else list(utils.unique(languages))
+        if not languages:
+            raise ValueError('No language requested.')
+
+        unknown = [language for language in languages if language not in self.language_codes()]
+        if unknown:
+            raise ValueError('Unknown languages: %s' % ', '.join(unknown))
+
+        return languages
 
     @authentication_required
     def get_language(self, language_id):
@@ -417,7 +1162,4 @@ class ApiV2Client(BaseClient):
         :return: a python dictionary with either the result of the search or an error from TheTVDB.
         """
 
-        raw_response = requests_util.run_request('get', self.API_BASE_URL + '/languages/%d' % language_id,
-                                                 headers=self.__get_header_with_auth())
-
-        return self.parse_raw_response(raw_response)
+        return self.__cached_get(self.API_BASE_URL + '/languages/%d' % language_id, tvdb_models.Language)
@@ -0,0 +1,337 @@
+# coding: utf-8
+from .ApiV2Client import ApiV2Client, call_many, iter_pages
+from tvdb_client.exceptions import AuthenticationFailedException, NoAvailableKeyException, RequestFailedException
+from tvdb_client.utils.requests_util import RetryPolicy
+from tvdb_client.utils.single_flight import SingleFlight
+import threading
+import time
+
+__author__ = 'tsantana'
+
+LEAST_LOADED = 'least_loaded'
+ROUND_ROBIN = 'round_robin'
+
+
+def _freeze(value):
+    """
+    :return: a hashable version of the arguments of a call (i.e. a list of languages), to coalesce identical calls.
+    """
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+class _PoolKey(object):
+    """
+    A credential set of an ApiV2ClientPool: its client and usage counters.
+    """
+
+    def __init__(self, name, client):
+        self.name = name
+        self.client = client
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.requests = 0
+        self.logins = 0
+        self.throttled = 0
+        self.unauthorized = 0
+        self.benched_until = 0.0
+
+    def stats(self, now):
+        return {'requests': self.requests, 'in_flight': self.in_flight, 'logins': self.logins,
+                'throttled': self.throttled, 'unauthorized': self.unauthorized,
+                'available': self.benched_until <= now, 'benched_for': max(0.0, self.benched_until - now)}
+
+
+class ApiV2ClientPool(object):
+    """
+    Spreads the requests of a crawl over several TheTVDB accounts, so their rate limits add up. It holds one ApiV2Client
+    per credential set, each with its own token (and token renewals), logged in the first time it's used.
+
+    Every call is routed to one of the keys in rotation: the one with the fewest requests in flight (LEAST_LOADED) or
+    the next one (ROUND_ROBIN). A key answered 429 (Too Many Requests) is taken out of rotation for throttle_cooldown
+    seconds, and one answered 401 (or failing to log in) for unauthorized_cooldown seconds, the call being retried on
+    another key. User endpoints (favorites, ratings) are not routed, as they belong to an account: use the client of
+    that account in clients.
+    """
+
+    def __init__(self, credentials, strategy=LEAST_LOADED, throttle_cooldown=10.0, unauthorized_cooldown=3600.0,
+                 **client_options):
+        """
+        :param credentials: The credential sets: tuples (username, api_key, account_identifier) or python dictionaries
+        with these keys and an optional name, identifying the key in stats (the username by default).
+        :param strategy: LEAST_LOADED or ROUND_ROBIN.
+        :param throttle_cooldown: The number of seconds a key answered 429 is out of rotation.
+        :param unauthorized_cooldown: The number of seconds a key answered 401, or failing to log in, is out of
+        rotation. It logs in again when it's back.
+        :param client_options: The options of every ApiV2Client (i.e. cache, which they may share). Unless a
+        retry_policy is provided, 429 answers aren't retried by the clients, as the pool moves to another key instead.
+        """
+        if strategy not in (LEAST_LOADED, ROUND_ROBIN):
+            raise ValueError('Unknown strategy %r: use least_loaded or round_robin.' % strategy)
+
+        client_options.setdefault('retry_policy', RetryPolicy(retry_statuses=(500, 502, 503, 504)))
+        coalesce_requests = client_options.pop('coalesce_requests', True)
+        self.single_flight = SingleFlight() if coalesce_requests else None
+
+        self.strategy = strategy
+        self.throttle_cooldown = throttle_cooldown
+        self.unauthorized_cooldown = unauthorized_cooldown
+        self.__keys = list()
+        self.__next = 0
+        self.__lock = threading.Lock()
+
+        for credential in credentials:
+            if not isinstance(credential, dict):
+                credential = dict(zip(('username', 'api_key', 'account_identifier'), credential))
+            name = credential.get('name') or credential['username']
+            if name in [key.name for key in self.__keys]:
+                raise ValueError('Duplicate key name %r: name the credential sets.' % name)
+
+            # Identical calls are coalesced by the pool, before they're routed, across all keys.
+            client = ApiV2Client(credential['username'], credential['api_key'], credential['account_identifier'],
+                                 coalesce_requests=False, **client_options)
+            self.__keys.append(_PoolKey(name, client))
+
+        if not self.__keys:
+            raise ValueError('No credentials provided.')
+
+    @property
+    def clients(self):
+        """
+        :return: a python dictionary of key name to its ApiV2Client.
+        """
+        return dict((key.name, key.client) for key in self.__keys)
+
+    def login(self):
+        """
+        Logs every key in at once, instead of on first use.
+
+        :return: None
+        :raise AuthenticationFailedException: if no key can log in.
+        """
+        if not [key for key in self.__keys if self.__ensure_login(key)]:
+            raise AuthenticationFailedException('Authentication failed for every key!')
+
+    def close(self):
+        for key in self.__keys:
+            key.client.close()
+
+    def stats(self):
+        """
+        :return: a python dictionary of key name to its usage: the calls routed to it (requests), in flight, its
+        logins, the 429 (throttled) and 401 (unauthorized) answers it got, whether it's in rotation (available) and
+        for how many more seconds it's out of it (benched_for).
+        """
+        now = time.time()
+        with self.__lock:
+            return dict((key.name, key.stats(now)) for key in self.__keys)
+
+    def __acquire(self, excluded):
+        now = time.time()
+        with self.__lock:
+            available = [(i, key) for i, key in enumerate(self.__keys)
+                         if key.benched_until <= now and key not in excluded]
+            if not available:
+                return None
+
+            if self.strategy == ROUND_ROBIN:
+                index, key = min(available, key=lambda item: (item[0] - self.__next) % len(self.__keys))
+                self.__next = index + 1
+            else:
+                index, key = min(available, key=lambda item: (item[1].in_flight, item[1].requests, item[0]))
+
+            key.in_flight += 1
+            key.requests += 1
+            return key
+
+    def __release(self, key):
+        with self.__lock:
+            key.in_flight -= 1
+
+    def __bench(self, key, seconds, counter):
+        with self.__lock:
+            setattr(key, counter, getattr(key, counter) + 1)
+            key.benched_until = max(key.benched_until, time.time() + seconds)
+            # It logs in again when it's back in rotation.
+            if counter == 'unauthorized':
+                key.client.is_authenticated = False
+
+    def __ensure_login(self, key):
+        with key.lock:
+            if key.client.is_authenticated:
+                return True
+            try:
+                key.client.login()
+            except AuthenticationFailedException:
+                self.__bench(key, self.unauthorized_cooldown, 'unauthorized')
+                return False
+
+        with self.__lock:
+            key.logins += 1
+        return True
+
+    @staticmethod
+    def __error_code(result):
+        if isinstance(result, RequestFailedException):
+            return (result.error or {}).get('code')
+        if isinstance(result, dict) and 'data' not in result:
+            return result.get('code')
+        return None
+
+    def __call(self, method, *args, **kwargs):
+        """
+        Routes a call, unless an identical one is in flight, whose outcome is shared instead. Coalescing happens before
+        a key is chosen, so only the key that sent the request may be taken out of rotation because of its answer.
+        Streamed responses can only be read once, so they're never shared.
+        """
+        if self.single_flight is None or kwargs.get('stream'):
+            return self.__route(method, *args, **kwargs)
+
+        key = (method, _freeze(args), _freeze(kwargs))
+        return self.single_flight.do(key, lambda: self.__route(method, *args, **kwargs))
+
+    def __route(self, method, *args, **kwargs):
+        """
+        Calls a method of the client of a key in rotation, moving on to the next key while they're answered 401 or
+        429.
+
+        :return: what the method returned. If every key was tried and failed, the last error from TheTVDB.
+        :raise NoAvailableKeyException: if every key is out of rotation.
+        """
+        tried = set()
+        error = None
+
+        while True:
+            key = self.__acquire(tried)
+            if key is None:
+                break
+            tried.add(key)
+
+            try:
+                if not self.__ensure_login(key):
+                    continue
+                result = getattr(key.client, method)(*args, **kwargs)
+            except RequestFailedException as e:
+                result = e
+            finally:
+                self.__release(key)
+
+            code = self.__error_code(result)
+            if code == 429:
+                self.__bench(key, self.throttle_cooldown, 'throttled')
+            elif code == 401:
+                self.__bench(key, self.unauthorized_cooldown, 'unauthorized')
+            elif isinstance(result, Exception):
+                raise result
+            else:
+                return result
+            error = result
+
+        if isinstance(error, Exception):
+            raise error
+        if error is not None:
+            return error
+
+        with self.__lock:
+            retry_after = min(key.benched_until for key in self.__keys) - time.time()
+        raise NoAvailableKeyException('Every key is out of rotation.', max(0.0, retry_after))
+
+    def search_series(self, name=None, imdb_id=None, zap2it_id=None):
+        """
+        Routed version of ApiV2Client.search_series.
+        """
+        return self.__call('search_series', name=name, imdb_id=imdb_id, zap2it_id=zap2it_id)
+
+    def get_series(self, series_id, languages=None):
+        """
+        Routed version of ApiV2Client.get_series.
+        """
+        return self.__call('get_series', series_id, languages=languages)
+
+    def get_series_many(self, series_ids, max_workers=8, timeout=None):
+        """
+        Version of ApiV2Client.get_series_many routing every series on its own, so the batch is spread over the keys.
+        """
+        return call_many(self.get_series, series_ids, max_workers, timeout)
+
+    def get_series_actors(self, series_id):
+        """
+        Routed version of ApiV2Client.get_series_actors.
+        """
+        return self.__call('get_series_actors', series_id)
+
+    def get_series_episodes(self, series_id, episode_number=None, aired_season=None, aired_episode=None,
+                            dvd_season=None, dvd_episode=None, imdb_id=None, page=1, stream=False):
+        """
+        Routed version of ApiV2Client.get_series_episodes.
+        """
+        return self.__call('get_series_episodes', series_id, episode_number=episode_number,
+                            aired_season=aired_season, aired_episode=aired_episode, dvd_season=dvd_season,
+                            dvd_episode=dvd_episode, imdb_id=imdb_id, page=page, stream=stream)
+
+    def iter_series_episodes(self, series_id, ordered=True, max_workers=4):
+        """
+        Version of ApiV2Client.iter_series_episodes routing every page on its own, so the pages are spread over the
+        keys.
+        """
+        return iter_pages(lambda page: self.__get_episodes_page(series_id, page), ordered, max_workers)
+
+    def __get_episodes_page(self, series_id, page):
+        response = self.get_series_episodes(series_id, page=page)
+
+        if 'data' not in response and response.get('code') != 404:
+            raise RequestFailedException('Failed to retrieve page %d of the episodes of series %d: %s' %
+                                         (page, series_id, response.get('message')), response)
+        return response
+
+    def get_series_episodes_summary(self, series_id):
+        """
+        Routed version of ApiV2Client.get_series_episodes_summary.
+        """
+        return self.__call('get_series_episodes_summary', series_id)
+
+    def get_series_images(self, series_id, image_type=None, resolution=None, sub_key=None):
+        """
+        Routed version of ApiV2Client.get_series_images.
+        """
+        return self.__call('get_series_images', series_id, image_type=image_type, resolution=resolution,
+                            sub_key=sub_key)
+
+    def get_series_bundle(self, series_id, **kwargs):
+        """
+        Routed version of ApiV2Client.get_series_bundle. All the parts are retrieved with the same key.
+        """
+        return self.__call('get_series_bundle', series_id, **kwargs)
+
+    def get_updated(self, from_time, to_time=None, stream=False):
+        """
+        Routed version of ApiV2Client.get_updated.
+        """
+        return self.__call('get_updated', from_time, to_time=to_time, stream=stream)
+
+    def get_episode(self, episode_id, languages=None):
+        """
+        Routed version of ApiV2Client.get_episode.
+        """
+        return self.__call('get_episode', episode_id, languages=languages)
+
+    def get_episodes_many(self, episode_ids, max_workers=8, timeout=None):
+        """
+        Version of ApiV2Client.get_episodes_many routing every episode on its own, so the batch is spread over the keys.
+        """
+        return call_many(self.get_episode, episode_ids, max_workers, timeout)
+
+    def get_languages(self):
+        """
+        Routed version of ApiV2Client.get_languages.
+        """
+        return self.__call('get_languages')
+
+    def get_language(self, language_id):
+        """
+        Routed version of ApiV2Client.get_language.
+        """
+        return self.__call('get_language', language_id)
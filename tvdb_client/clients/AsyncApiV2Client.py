@@ -0,0 +1,338 @@
+# coding: utf-8
+from .shared import BaseClient
+from .ApiV2Client import ApiV2Client
+from tvdb_client.exceptions import RequestFailedException, BatchTimeoutException
+from tvdb_client.utils import utils
+from tvdb_client.utils.single_flight import AsyncSingleFlight
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import contextvars
+import functools
+import itertools
+import time
+
+__author__ = 'tsantana'
+
+
+class AsyncApiV2Client(BaseClient):
+    """
+    The asyncio counterpart of ApiV2Client. It exposes the same methods as coroutines, so many calls can be awaited
+    together (i.e. with asyncio.gather) instead of being issued one after the other.
+
+    All requests go through a single pooled transport and at most max_concurrency of them are in flight at any time.
+    Token renewal happens once for all the concurrent callers: the first one to notice the token is over 23 hours old
+    renews it while the others wait for it. Likewise, concurrent calls of a read method with the same arguments share a
+    single call, unless coalesce_requests is False.
+    """
+
+    def __init__(self, username, api_key, account_identifier, language=None, max_concurrency=10, **kwargs):
+        """
+        :param username: The TheTVDB user name.
+        :param api_key: The TheTVDB api key.
+        :param account_identifier: The TheTVDB account identifier (user key).
+        :param language: The optional language to be sent as Accept-Language on every request.
+        :param max_concurrency: The maximum number of requests in flight at the same time. It's also the size of the
+        connection pool of the transport created when none is provided.
+        :param kwargs: Any other option of ApiV2Client (transport, cache, rate_limiter...), which is used underneath.
+        """
+        kwargs.setdefault('pool_size', max_concurrency)
+        self.client = ApiV2Client(username, api_key, account_identifier, language=language, **kwargs)
+        self.max_concurrency = max_concurrency
+        self.__executor = ThreadPoolExecutor(max_workers=max_concurrency)
+        self.__semaphore = None
+        self.__token_lock = None
+        self.single_flight = AsyncSingleFlight() if kwargs.get('coalesce_requests', True) else None
+
+    @property
+    def is_authenticated(self):
+        return self.client.is_authenticated
+
+    @property
+    def language(self):
+        return self.client.language
+
+    def close(self):
+        """
+        Releases the worker threads and the pooled connections of this client.
+
+        :return: None
+        """
+        self.__executor.shutdown(wait=True)
+        self.client.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __get_semaphore(self):
+        # Created lazily so they're bound to the running event loop rather than to the one current at construction.
+        if self.__semaphore is None:
+            self.__semaphore = asyncio.Semaphore(self.max_concurrency)
+            self.__token_lock = asyncio.Lock()
+        return self.__semaphore
+
+    async def __run_in_executor(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        # Run within the context of the task, so its requests_util.request_context applies.
+        return await loop.run_in_executor(self.__executor,
+                                          functools.partial(contextvars.copy_context().run, func, *args, **kwargs))
+
+    async def __renew_token_if_needed(self):
+        if self.client.is_authenticated and self.client.token_needs_renewal():
+            async with self.__token_lock:
+                if self.client.token_needs_renewal():
+                    await self.__run_in_executor(self.client.renew_token)
+
+    async def __call(self, func, *args, **kwargs):
+        semaphore = self.__get_semaphore()
+        await self.__renew_token_if_needed()
+
+        async with semaphore:
+            return await self.__run_in_executor(func, *args, **kwargs)
+
+    def __coalesced_call(self, func, *args, **kwargs):
+        if self.single_flight is None:
+            return self.__call(func, *args, **kwargs)
+
+        key = (func.__name__, args, tuple(sorted(kwargs.items())), self.client.language)
+        return self.single_flight.do(key, lambda: self.__call(func, *args, **kwargs))
+
+    async def login(self):
+        """
+        Coroutine version of ApiV2Client.login.
+        """
+        self.__get_semaphore()
+
+        async with self.__token_lock:
+            await self.__run_in_executor(self.client.login)
+
+    async def search_series(self, name=None, imdb_id=None, zap2it_id=None):
+        """
+        Coroutine version of ApiV2Client.search_series.
+        """
+        return await self.__coalesced_call(self.client.search_series, name=name, imdb_id=imdb_id, zap2it_id=zap2it_id)
+
+    async def get_series(self, series_id, languages=None):
+        """
+        Coroutine version of ApiV2Client.get_series.
+        """
+        if languages is not None:
+            return await self.__coalesced_call(self.client.get_series, series_id, languages=self.__languages(languages))
+        return await self.__coalesced_call(self.client.get_series, series_id)
+
+    async def get_series_many(self, series_ids, timeout=None):
+        """
+        Async generator version of ApiV2Client.get_series_many. Series are retrieved concurrently, no more than
+        max_concurrency at a time.
+        """
+        async for item in self.__get_many(self.get_series, series_ids, timeout):
+            yield item
+
+    async def get_series_actors(self, series_id):
+        """
+        Coroutine version of ApiV2Client.get_series_actors.
+        """
+        return await self.__coalesced_call(self.client.get_series_actors, series_id)
+
+    async def get_series_episodes(self, series_id, episode_number=None, aired_season=None, aired_episode=None,
+                                  dvd_season=None, dvd_episode=None, imdb_id=None, page=1):
+        """
+        Coroutine version of ApiV2Client.get_series_episodes.
+        """
+        return await self.__coalesced_call(self.client.get_series_episodes, series_id, episode_number=episode_number,
+                                           aired_season=aired_season, aired_episode=aired_episode,
+                                           dvd_season=dvd_season, dvd_episode=dvd_episode, imdb_id=imdb_id, page=page)
+
+    async def iter_series_episodes(self, series_id, ordered=True):
+        """
+        Async generator version of ApiV2Client.iter_series_episodes. The pages after the first one are retrieved
+        concurrently, no more than max_concurrency at a time.
+
+        :param series_id: The TheTVDB id of the series.
+        :param ordered: If True, episodes are yielded in page order. Otherwise, they're yielded as soon as their page
+        arrives.
+        :return: an async generator of the episodes of the series: python dictionaries, or tvdb_models.Episode
+        instances if models are enabled.
+        """
+
+        first_page = await self.__get_episodes_page(series_id, 1)
+        last_page = (first_page.get('links') or {}).get('last') or 1
+        pages = iter(range(2, last_page + 1))
+
+        pending = deque(asyncio.ensure_future(self.__get_episodes_page(series_id, page))
+                        for page in itertools.islice(pages, self.max_concurrency))
+
+        try:
+            for episode in first_page.get('data', []):
+                yield episode
+
+            while pending:
+                if ordered:
+                    done = [pending.popleft()]
+                else:
+                    done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        pending.remove(task)
+
+                for task in done:
+                    for page in itertools.islice(pages, 1):
+                        pending.append(asyncio.ensure_future(self.__get_episodes_page(series_id, page)))
+                    for episode in (await task).get('data', []):
+                        yield episode
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def __get_episodes_page(self, series_id, page):
+        response = await self.get_series_episodes(series_id, page=page)
+
+        if 'data' not in response and response.get('code') != 404:
+            raise RequestFailedException('Failed to retrieve page %d of the episodes of series %d: %s' %
+                                         (page, series_id, response.get('message')), response)
+        return response
+
+    async def get_series_episodes_summary(self, series_id):
+        """
+        Coroutine version of ApiV2Client.get_series_episodes_summary.
+        """
+        return await self.__coalesced_call(self.client.get_series_episodes_summary, series_id)
+
+    async def get_series_images(self, series_id, image_type=None, resolution=None, sub_key=None):
+        """
+        Coroutine version of ApiV2Client.get_series_images.
+        """
+        return await self.__coalesced_call(self.client.get_series_images, series_id, image_type=image_type,
+                                           resolution=resolution, sub_key=sub_key)
+
+    async def get_series_bundle(self, series_id, **kwargs):
+        """
+        Coroutine version of ApiV2Client.get_series_bundle. The bundle takes one of the max_concurrency slots, its
+        requests being sent concurrently by a pool of its own (see its max_workers).
+        """
+        return await self.__call(self.client.get_series_bundle, series_id, **kwargs)
+
+    async def get_updated(self, from_time, to_time=None):
+        """
+        Coroutine version of ApiV2Client.get_updated.
+        """
+        return await self.__coalesced_call(self.client.get_updated, from_time, to_time=to_time)
+
+    async def get_user(self):
+        """
+        Coroutine version of ApiV2Client.get_user.
+        """
+        return await self.__call(self.client.get_user)
+
+    async def get_user_favorites(self):
+        """
+        Coroutine version of ApiV2Client.get_user_favorites.
+        """
+        return await self.__call(self.client.get_user_favorites)
+
+    async def delete_user_favorite(self, series_id):
+        """
+        Coroutine version of ApiV2Client.delete_user_favorite.
+        """
+        return await self.__call(self.client.delete_user_favorite, series_id)
+
+    async def add_user_favorite(self, series_id):
+        """
+        Coroutine version of ApiV2Client.add_user_favorite.
+        """
+        return await self.__call(self.client.add_user_favorite, series_id)
+
+    async def get_user_ratings(self, item_type=None):
+        """
+        Coroutine version of ApiV2Client.get_user_ratings.
+        """
+        return await self.__call(self.client.get_user_ratings, item_type=item_type)
+
+    async def add_user_rating(self, item_type, item_id, item_rating):
+        """
+        Coroutine version of ApiV2Client.add_user_rating.
+        """
+        return await self.__call(self.client.add_user_rating, item_type, item_id, item_rating)
+
+    async def delete_user_rating(self, item_type, item_id):
+        """
+        Coroutine version of ApiV2Client.delete_user_rating.
+        """
+        return await self.__call(self.client.delete_user_rating, item_type, item_id)
+
+    async def get_episode(self, episode_id, languages=None):
+        """
+        Coroutine version of ApiV2Client.get_episode.
+        """
+        if languages is not None:
+            return await self.__coalesced_call(self.client.get_episode, episode_id,
+                                               languages=self.__languages(languages))
+        return await self.__coalesced_call(self.client.get_episode, episode_id)
+
+    async def get_episodes_many(self, episode_ids, timeout=None):
+        """
+        Async generator version of ApiV2Client.get_episodes_many. Episodes are retrieved concurrently, no more than
+        max_concurrency at a time.
+        """
+        async for item in self.__get_many(self.get_episode, episode_ids, timeout):
+            yield item
+
+    async def __get_many(self, func, item_ids, timeout):
+        deadline = time.time() + timeout if timeout is not None else None
+        item_ids = utils.unique(item_ids)
+        pending = dict()
+
+        async def call(item_id):
+            try:
+                return await func(item_id)
+            except Exception as e:
+                return e
+
+        try:
+            for item_id in itertools.islice(item_ids, 2 * self.max_concurrency):
+                pending[asyncio.ensure_future(call(item_id))] = item_id
+
+            while pending:
+                remaining = deadline - time.time() if deadline is not None else None
+                if remaining is not None and remaining <= 0:
+                    break
+
+                done, _ = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    for item_id in itertools.islice(item_ids, 1):
+                        pending[asyncio.ensure_future(call(item_id))] = item_id
+                    yield pending.pop(task), task.result()
+
+            for task in list(pending):
+                task.cancel()
+                yield pending.pop(task), BatchTimeoutException('Batch timed out after %s seconds.' % timeout)
+            for item_id in item_ids:
+                yield item_id, BatchTimeoutException('Batch timed out after %s seconds.' % timeout)
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def get_languages(self):
+        """
+        Coroutine version of ApiV2Client.get_languages.
+        """
+        return await self.__coalesced_call(self.client.get_languages)
+
+    async def language_codes(self):
+        """
+        Coroutine version of ApiV2Client.language_codes.
+        """
+        return await self.__call(self.client.language_codes)
+
+    @staticmethod
+    def __languages(languages):
+        # The languages are part of the key of coalesced calls, so they must be hashable.
+        return (languages,) if isinstance(languages, str) else tuple(languages)
+
+    async def get_language(self, language_id):
+        """
+        Coroutine version of ApiV2Client.get_language.
+        """
+        return await self.__coalesced_call(self.client.get_language, language_id)
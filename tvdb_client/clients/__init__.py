@@ -1,3 +1,35 @@
-from .ApiV1Client import ApiV1Client
-from .ApiV2Client import ApiV2Client
+import importlib
+import sys
+import types
 
+__author__ = 'tsantana'
+
+__all__ = ['ApiV1Client', 'ApiV2Client', 'ApiV2ClientPool', 'AsyncApiV2Client']
+
+# Every client lives in the module of the same name, imported on first access (see tvdb_client.__getattr__).
+
+
+class _ClientsModule(types.ModuleType):
+
+    def __setattr__(self, name, value):
+        # Importing a client module (even from a sibling, or as tvdb_client.clients.ApiV2Client) binds it to the
+        # package under the name of its client, which would then hide the client from __getattr__.
+        if name in __all__ and isinstance(value, types.ModuleType):
+            value = getattr(value, name)
+        super(_ClientsModule, self).__setattr__(name, value)
+
+
+sys.modules[__name__].__class__ = _ClientsModule
+
+
+def __getattr__(name):
+    if name not in __all__:
+        raise AttributeError('module %r has no attribute %r' % (__name__, name))
+    importlib.import_module('.%s' % name, __name__)
+    value = getattr(sys.modules['%s.%s' % (__name__, name)], name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
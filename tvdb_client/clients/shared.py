@@ -1,8 +1,8 @@
 # coding: utf-8
 from tvdb_client.exceptions import UserNotLoggedInException
 import abc
-import json
-from tvdb_client.utils.utils import make_str_content
+from tvdb_client.models import tvdb_models
+from tvdb_client.utils import json_decoders
 
 
 __author__ = 'tsantana'
@@ -19,6 +19,9 @@ def authentication_required(func):
 
 class BaseClient(object):
 
+    # The function decoding the bytes of the response bodies. See json_decoders.
+    json_decoder = staticmethod(json_decoders.get_decoder())
+
     @abc.abstractmethod
     def login(self):
         pass
@@ -38,19 +41,11 @@ class BaseClient(object):
     def get_series(self, series_id):
         pass
 
-    @abc.abstractmethod
-    def get_series_episodes(self, series_id, page=1):
-        pass
-
     @abc.abstractmethod
     def get_series_episodes(self, series_id, episode_number=None, aired_season=None, aired_episode=None,
                             dvd_season=None, dvd_episode=None, imdb_id=None, page=1):
         pass
 
-    @abc.abstractmethod
-    def get_series_images(self, series_id):
-        pass
-
     @abc.abstractmethod
     def get_series_images(self, series_id, image_type=None, resolution=None, sub_key=None):
         pass
@@ -118,13 +113,22 @@ class BaseClient(object):
         error = dict()
         error['client_class'] = self.__class__.__name__
         error['code'] = status_code
-        error['message'] = json.loads(raw_response.content)['Error']
+        error['message'] = self.json_decoder(raw_response.content)['Error']
 
         return error
 
-    def parse_raw_response(self, raw_response):
+    def parse_raw_response(self, raw_response, model=None):
+        """
+        Parses the response of a request.
+
+        :param raw_response: The requests.Response of the request.
+        :param model: An optional tvdb_models.TVDBModel subclass. If provided, the data of a successful response is
+        converted into instances of it instead of being left as python dictionaries.
+        :return: a python dictionary with either the result of the request or an error from TheTVDB.
+        """
 
         if raw_response.status_code == 200:
-            return json.loads(make_str_content(raw_response.content))
+            response = self.json_decoder(raw_response.content)
+            return tvdb_models.from_response(response, model) if model is not None else response
         else:
             return self.__handle_error(raw_response)
@@ -0,0 +1,2 @@
+from .crawl_backends import CrawlBackend, CrawlTask, RedisBackend, SQLiteBackend
+from .crawl_coordinator import CrawlCoordinator, CrawlReport, CrawlWorker, SharedRateLimiter, SharedToken, shard_of
@@ -0,0 +1,542 @@
+# coding: utf-8
+"""
+The shared state of a distributed crawl: the work units (tasks) and their leases, the progress within every task, a
+key-value space for locks and values such as the shared token, token buckets and a response cache. SQLiteBackend keeps
+it in a database file, for the processes of one host, and RedisBackend in Redis, for the processes of many hosts.
+"""
+from collections import namedtuple
+from tvdb_client.utils.cache import RedisCache, SQLiteCache
+import json
+import os
+import sqlite3
+import threading
+import time
+
+__author__ = 'tsantana'
+
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+STATES = (PENDING, RUNNING, DONE, FAILED)
+
+
+class CrawlTask(namedtuple('CrawlTask', ('name', 'payload', 'attempts'))):
+    """
+    A task claimed from a backend: its unique name, its payload (a python dictionary) and the number of times it
+    failed before.
+    """
+
+    __slots__ = ()
+
+
+class CrawlBackend(object):
+    """
+    The interface of the crawl backends.
+
+    Tasks are pending until a worker claims them, which gives it a lease on the task for a number of seconds. The worker
+    renews the lease while it works on the task, and completes or releases it when it's done. A task whose lease
+    expired (its worker crashed or hung) can be claimed by another worker. Times are taken from the clock of the
+    workers, which must be kept in sync.
+    """
+
+    def add_tasks(self, tasks):
+        """
+        Adds tasks, ignoring the ones with the name of an existing task, so every worker may add the same plan.
+
+        :param tasks: An iterable of tuples (name, payload), payload being a JSON serializable python dictionary.
+        :return: the number of tasks added.
+        """
+        raise NotImplementedError()
+
+    def claim(self, owner, lease_seconds):
+        """
+        Claims a pending task, or a running one whose lease expired.
+
+        :param owner: The identifier of the worker.
+        :param lease_seconds: The duration of the lease.
+        :return: a CrawlTask, or None if there's no task to claim.
+        """
+        raise NotImplementedError()
+
+    def renew(self, name, owner, lease_seconds):
+        """
+        :return: True if the lease was extended, False if the task was claimed by another worker in the meantime.
+        """
+        raise NotImplementedError()
+
+    def complete(self, name, owner):
+        """
+        Marks a task as done and forgets about its progress.
+
+        :return: True if the task was completed, False if it was claimed by another worker in the meantime.
+        """
+        raise NotImplementedError()
+
+    def release(self, name, owner, error=None, max_attempts=3):
+        """
+        Gives up a task, so it's claimed again. If an error is provided it counts as a failed attempt, and the task
+        fails for good after max_attempts.
+
+        :return: True if the task was released, False if it was claimed by another worker in the meantime.
+        """
+        raise NotImplementedError()
+
+    def mark_done(self, name, item):
+        """
+        Records that an item (an integer, i.e. a series id) of a task was processed.
+        """
+        raise NotImplementedError()
+
+    def done_items(self, name):
+        """
+        :return: the set of the items of the task processed so far.
+        """
+        raise NotImplementedError()
+
+    def progress(self):
+        """
+        :return: a python dictionary of task state (pending, running, done and failed) to the number of tasks.
+        """
+        raise NotImplementedError()
+
+    def failures(self):
+        """
+        :return: a python dictionary of the name of every failed task to its last error.
+        """
+        raise NotImplementedError()
+
+    def get_value(self, key):
+        """
+        :return: the str stored at the key, or None.
+        """
+        raise NotImplementedError()
+
+    def set_value(self, key, value, ttl=None):
+        """
+        Stores a str at the key, for ttl seconds or forever.
+        """
+        raise NotImplementedError()
+
+    def acquire_lock(self, key, owner, ttl):
+        """
+        Takes a lock held for at most ttl seconds, without waiting.
+
+        :return: True if the lock was taken, False if another owner holds it.
+        """
+        raise NotImplementedError()
+
+    def release_lock(self, key, owner):
+        raise NotImplementedError()
+
+    def take_token(self, name, rate, burst):
+        """
+        Takes a token from a shared token bucket, as requests_util.RateLimiter does.
+
+        :param name: The name of the bucket.
+        :param rate: The number of tokens added per second.
+        :param burst: The maximum number of tokens in the bucket.
+        :return: 0 if a token was taken, otherwise the number of seconds to wait before trying again.
+        """
+        raise NotImplementedError()
+
+    def pause_bucket(self, name, seconds):
+        """
+        Holds every token of a bucket for the given number of seconds.
+        """
+        raise NotImplementedError()
+
+    def cache(self):
+        """
+        :return: a cache.BaseCache shared by all the workers, for the ApiV2Client of every worker.
+        """
+        raise NotImplementedError()
+
+    def close(self):
+        pass
+
+
+class SQLiteBackend(CrawlBackend):
+    """
+    A crawl backend in a SQLite database file, shared by the processes of one host. Every process opens its own
+    connection, so the backend may be created before the worker processes are forked.
+    """
+
+    def __init__(self, path, timeout=30.0):
+        """
+        :param path: The path of the SQLite database file. It's created if it doesn't exist.
+        :param timeout: The number of seconds to wait for a write lock held by another process.
+        """
+        self.path = path
+        self.timeout = timeout
+        self.__lock = threading.Lock()
+        self.__connection = None
+        self.__pid = None
+
+        with self.__lock:
+            connection = self.__connect()
+            connection.execute('CREATE TABLE IF NOT EXISTS crawl_task (name TEXT PRIMARY KEY, payload TEXT NOT NULL, '
+                               'state TEXT NOT NULL, owner TEXT, lease_until REAL NOT NULL, '
+                               'attempts INTEGER NOT NULL, error TEXT)')
+            connection.execute('CREATE INDEX IF NOT EXISTS crawl_task_claim ON crawl_task (state, lease_until)')
+            connection.execute('CREATE TABLE IF NOT EXISTS crawl_done (task TEXT NOT NULL, item INTEGER NOT NULL, '
+                               'PRIMARY KEY (task, item)) WITHOUT ROWID')
+            connection.execute('CREATE TABLE IF NOT EXISTS crawl_value (key TEXT PRIMARY KEY, value TEXT NOT NULL, '
+                               'expires_at REAL)')
+            connection.execute('CREATE TABLE IF NOT EXISTS crawl_bucket (name TEXT PRIMARY KEY, tokens REAL NOT NULL, '
+                               'updated_at REAL NOT NULL, paused_until REAL NOT NULL)')
+
+    def __connect(self):
+        # Connections can't be shared with forked processes.
+        if self.__pid != os.getpid():
+            self.__connection = sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False,
+                                                isolation_level=None)
+            self.__connection.execute('PRAGMA journal_mode=WAL')
+            self.__pid = os.getpid()
+        return self.__connection
+
+    def __execute(self, sql, parameters=()):
+        with self.__lock:
+            return self.__connect().execute(sql, parameters).rowcount
+
+    def __query(self, sql, parameters=()):
+        with self.__lock:
+            return self.__connect().execute(sql, parameters).fetchall()
+
+    def __transaction(self, func, *args):
+        # BEGIN IMMEDIATE takes the write lock at once, so the reads of the transaction can't be stale.
+        with self.__lock:
+            connection = self.__connect()
+            connection.execute('BEGIN IMMEDIATE')
+            try:
+                result = func(connection, *args)
+            except Exception:
+                connection.execute('ROLLBACK')
+                raise
+            connection.execute('COMMIT')
+            return result
+
+    def add_tasks(self, tasks):
+        def add(connection):
+            return sum(connection.execute('INSERT OR IGNORE INTO crawl_task (name, payload, state, lease_until, '
+                                          'attempts) VALUES (?, ?, ?, 0, 0)',
+                                          (name, json.dumps(payload), PENDING)).rowcount for name, payload in tasks)
+
+        return self.__transaction(add)
+
+    def claim(self, owner, lease_seconds):
+        def claim(connection):
+            now = time.time()
+            row = connection.execute('SELECT name, payload, attempts FROM crawl_task WHERE state IN (?, ?) AND '
+                                     'lease_until <= ? ORDER BY lease_until LIMIT 1',
+                                     (PENDING, RUNNING, now)).fetchone()
+            if row is None:
+                return None
+
+            connection.execute('UPDATE crawl_task SET state = ?, owner = ?, lease_until = ? WHERE name = ?',
+                               (RUNNING, owner, now + lease_seconds, row[0]))
+            return CrawlTask(row[0], json.loads(row[1]), row[2])
+
+        return self.__transaction(claim)
+
+    def renew(self, name, owner, lease_seconds):
+        return self.__execute('UPDATE crawl_task SET lease_until = ? WHERE name = ? AND owner = ? AND state = ?',
+                              (time.time() + lease_seconds, name, owner, RUNNING)) == 1
+
+    def complete(self, name, owner):
+        def complete(connection):
+            if connection.execute('UPDATE crawl_task SET state = ?, owner = NULL, lease_until = 0 WHERE name = ? AND '
+                                  'owner = ? AND state = ?', (DONE, name, owner, RUNNING)).rowcount != 1:
+                return False
+            connection.execute('DELETE FROM crawl_done WHERE task = ?', (name,))
+            return True
+
+        return self.__transaction(complete)
+
+    def release(self, name, owner, error=None, max_attempts=3):
+        def release(connection):
+            row = connection.execute('SELECT attempts FROM crawl_task WHERE name = ? AND owner = ? AND state = ?',
+                                     (name, owner, RUNNING)).fetchone()
+            if row is None:
+                return False
+
+            attempts = row[0] + (1 if error is not None else 0)
+            state = FAILED if error is not None and attempts >= max_attempts else PENDING
+            connection.execute('UPDATE crawl_task SET state = ?, owner = NULL, lease_until = 0, attempts = ?, '
+                               'error = COALESCE(?, error) WHERE name = ?', (state, attempts, error, name))
+            return True
+
+        return self.__transaction(release)
+
+    def mark_done(self, name, item):
+        self.__execute('INSERT OR IGNORE INTO crawl_done (task, item) VALUES (?, ?)', (name, item))
+
+    def done_items(self, name):
+        return set(row[0] for row in self.__query('SELECT item FROM crawl_done WHERE task = ?', (name,)))
+
+    def progress(self):
+        progress = dict.fromkeys(STATES, 0)
+        progress.update(self.__query('SELECT state, COUNT(*) FROM crawl_task GROUP BY state'))
+        return progress
+
+    def failures(self):
+        return dict(self.__query('SELECT name, error FROM crawl_task WHERE state = ?', (FAILED,)))
+
+    def get_value(self, key):
+        rows = self.__query('SELECT value FROM crawl_value WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)',
+                            (key, time.time()))
+        return rows[0][0] if rows else None
+
+    def set_value(self, key, value, ttl=None):
+        self.__execute('INSERT OR REPLACE INTO crawl_value (key, value, expires_at) VALUES (?, ?, ?)',
+                       (key, value, time.time() + ttl if ttl is not None else None))
+
+    def acquire_lock(self, key, owner, ttl):
+        now = time.time()
+        return self.__execute('INSERT INTO crawl_value (key, value, expires_at) VALUES (?, ?, ?) '
+                              'ON CONFLICT (key) DO UPDATE SET value = excluded.value, '
+                              'expires_at = excluded.expires_at WHERE crawl_value.expires_at <= ?',
+                              (key, owner, now + ttl, now)) == 1
+
+    def release_lock(self, key, owner):
+        self.__execute('DELETE FROM crawl_value WHERE key = ? AND value = ?', (key, owner))
+
+    def take_token(self, name, rate, burst):
+        def take(connection):
+            now = time.time()
+            row = connection.execute('SELECT tokens, updated_at, paused_until FROM crawl_bucket WHERE name = ?',
+                                     (name,)).fetchone()
+            tokens, updated_at, paused_until = row if row is not None else (burst, now, 0.0)
+            tokens = min(burst, tokens + max(0.0, now - updated_at) * rate)
+
+            wait = 0.0
+            if now < paused_until:
+                wait = paused_until - now
+            elif tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / rate
+
+            connection.execute('INSERT OR REPLACE INTO crawl_bucket (name, tokens, updated_at, paused_until) '
+                               'VALUES (?, ?, ?, ?)', (name, tokens, now, paused_until))
+            return wait
+
+        return self.__transaction(take)
+
+    def pause_bucket(self, name, seconds):
+        def pause(connection):
+            now = time.time()
+            connection.execute('INSERT OR IGNORE INTO crawl_bucket (name, tokens, updated_at, paused_until) '
+                               'VALUES (?, 0, ?, 0)', (name, now))
+            connection.execute('UPDATE crawl_bucket SET paused_until = MAX(paused_until, ?) WHERE name = ?',
+                               (now + seconds, name))
+
+        self.__transaction(pause)
+
+    def cache(self):
+        return SQLiteCache(self.path)
+
+    def close(self):
+        with self.__lock:
+            if self.__connection is not None and self.__pid == os.getpid():
+                self.__connection.close()
+            self.__connection = None
+            self.__pid = None
+
+
+_CLAIM_SCRIPT = """
+local names = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, 1)
+if #names == 0 then
+    return nil
+end
+local name = names[1]
+redis.call('ZADD', KEYS[1], ARGV[2], name)
+redis.call('HSET', KEYS[2], name, 'running')
+redis.call('HSET', KEYS[3], name, ARGV[3])
+return {name, redis.call('HGET', KEYS[4], name), redis.call('HGET', KEYS[5], name) or '0'}
+"""
+
+_ADD_SCRIPT = """
+if redis.call('HSETNX', KEYS[1], ARGV[1], 'pending') == 0 then
+    return 0
+end
+redis.call('HSET', KEYS[2], ARGV[1], ARGV[2])
+redis.call('ZADD', KEYS[3], 0, ARGV[1])
+return 1
+"""
+
+_RENEW_SCRIPT = """
+if redis.call('HGET', KEYS[1], ARGV[1]) ~= ARGV[2] then
+    return 0
+end
+redis.call('ZADD', KEYS[2], ARGV[3], ARGV[1])
+return 1
+"""
+
+_COMPLETE_SCRIPT = """
+if redis.call('HGET', KEYS[1], ARGV[1]) ~= ARGV[2] then
+    return 0
+end
+redis.call('HDEL', KEYS[1], ARGV[1])
+redis.call('ZREM', KEYS[2], ARGV[1])
+redis.call('HSET', KEYS[3], ARGV[1], 'done')
+redis.call('DEL', KEYS[4])
+return 1
+"""
+
+_RELEASE_SCRIPT = """
+if redis.call('HGET', KEYS[1], ARGV[1]) ~= ARGV[2] then
+    return 0
+end
+redis.call('HDEL', KEYS[1], ARGV[1])
+local attempts = tonumber(redis.call('HGET', KEYS[4], ARGV[1]) or '0')
+if ARGV[3] ~= '' then
+    attempts = redis.call('HINCRBY', KEYS[4], ARGV[1], 1)
+    redis.call('HSET', KEYS[5], ARGV[1], ARGV[3])
+end
+if ARGV[3] ~= '' and attempts >= tonumber(ARGV[4]) then
+    redis.call('ZREM', KEYS[2], ARGV[1])
+    redis.call('HSET', KEYS[3], ARGV[1], 'failed')
+else
+    redis.call('ZADD', KEYS[2], 0, ARGV[1])
+    redis.call('HSET', KEYS[3], ARGV[1], 'pending')
+end
+return 1
+"""
+
+_RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+_TAKE_TOKEN_SCRIPT = """
+local now, rate, burst = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at', 'paused_until')
+local tokens = tonumber(bucket[1]) or burst
+local paused_until = tonumber(bucket[3]) or 0
+tokens = math.min(burst, tokens + math.max(0, now - (tonumber(bucket[2]) or now)) * rate)
+local wait = 0
+if now < paused_until then
+    wait = paused_until - now
+elseif tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated_at', ARGV[1], 'paused_until', tostring(paused_until))
+return tostring(wait)
+"""
+
+_PAUSE_BUCKET_SCRIPT = """
+local paused_until = tonumber(redis.call('HGET', KEYS[1], 'paused_until') or '0')
+redis.call('HSET', KEYS[1], 'paused_until', tostring(math.max(paused_until, tonumber(ARGV[1]))))
+return 1
+"""
+
+
+class RedisBackend(CrawlBackend):
+    """
+    A crawl backend in Redis (or any server speaking its protocol and running Lua scripts), shared by the processes of
+    many hosts. Every change of the state of a task is made by a script, so it's atomic.
+    """
+
+    def __init__(self, client, prefix='tvdb_client:crawl:'):
+        """
+        :param client: A redis.Redis client, or the URL of the server (i.e. redis://localhost:6379/0), in which case
+        the redis package is required.
+        :param prefix: The prefix of the keys of the backend, so several crawls may share a server.
+        """
+        if isinstance(client, str):
+            try:
+                import redis
+            except ImportError:
+                raise ImportError('RedisBackend requires redis: pip install redis')
+            client = redis.Redis.from_url(client)
+
+        self.client = client
+        self.prefix = prefix
+        self.__keys = dict((name, prefix + name) for name in ('queue', 'state', 'owner', 'payload', 'attempts',
+                                                              'error'))
+
+    def __key(self, kind, name):
+        return '%s%s:%s' % (self.prefix, kind, name)
+
+    def __script(self, script, keys, *args):
+        return self.client.eval(script, len(keys), *(list(keys) + list(args)))
+
+    @staticmethod
+    def __str(value):
+        return value.decode('utf-8') if isinstance(value, bytes) else value
+
+    def add_tasks(self, tasks):
+        keys = self.__keys
+        return sum(self.__script(_ADD_SCRIPT, (keys['state'], keys['payload'], keys['queue']), name,
+                                 json.dumps(payload)) for name, payload in tasks)
+
+    def claim(self, owner, lease_seconds):
+        keys = self.__keys
+        now = time.time()
+        claimed = self.__script(_CLAIM_SCRIPT, (keys['queue'], keys['state'], keys['owner'], keys['payload'],
+                                                keys['attempts']), repr(now), repr(now + lease_seconds), owner)
+        if claimed is None:
+            return None
+
+        name, payload, attempts = [self.__str(value) for value in claimed]
+        return CrawlTask(name, json.loads(payload), int(attempts))
+
+    def renew(self, name, owner, lease_seconds):
+        return self.__script(_RENEW_SCRIPT, (self.__keys['owner'], self.__keys['queue']), name, owner,
+                             repr(time.time() + lease_seconds)) == 1
+
+    def complete(self, name, owner):
+        keys = self.__keys
+        return self.__script(_COMPLETE_SCRIPT, (keys['owner'], keys['queue'], keys['state'], self.__key('done', name)),
+                             name, owner) == 1
+
+    def release(self, name, owner, error=None, max_attempts=3):
+        keys = self.__keys
+        return self.__script(_RELEASE_SCRIPT, (keys['owner'], keys['queue'], keys['state'], keys['attempts'],
+                                               keys['error']), name, owner, error or '', max_attempts) == 1
+
+    def mark_done(self, name, item):
+        self.client.sadd(self.__key('done', name), item)
+
+    def done_items(self, name):
+        return set(int(item) for item in self.client.smembers(self.__key('done', name)))
+
+    def progress(self):
+        progress = dict.fromkeys(STATES, 0)
+        for state in self.client.hvals(self.__keys['state']):
+            progress[self.__str(state)] += 1
+        return progress
+
+    def failures(self):
+        failed = [self.__str(name) for name, state in self.client.hgetall(self.__keys['state']).items()
+                  if self.__str(state) == FAILED]
+        errors = self.client.hmget(self.__keys['error'], failed) if failed else []
+        return dict((name, self.__str(error)) for name, error in zip(failed, errors))
+
+    def get_value(self, key):
+        return self.__str(self.client.get(self.__key('value', key)))
+
+    def set_value(self, key, value, ttl=None):
+        self.client.set(self.__key('value', key), value, px=int(ttl * 1000) if ttl is not None else None)
+
+    def acquire_lock(self, key, owner, ttl):
+        return bool(self.client.set(self.__key('value', key), owner, nx=True, px=max(1, int(ttl * 1000))))
+
+    def release_lock(self, key, owner):
+        self.__script(_RELEASE_LOCK_SCRIPT, (self.__key('value', key),), owner)
+
+    def take_token(self, name, rate, burst):
+        return float(self.__str(self.__script(_TAKE_TOKEN_SCRIPT, (self.__key('bucket', name),), repr(time.time()),
+                                              repr(float(rate)), repr(float(burst)))))
+
+    def pause_bucket(self, name, seconds):
+        self.__script(_PAUSE_BUCKET_SCRIPT, (self.__key('bucket', name),), repr(time.time() + seconds))
+
+    def cache(self):
+        return RedisCache(self.client, self.prefix + 'cache:')
@@ -0,0 +1,305 @@
+# coding: utf-8
+from .crawl_backends import PENDING, RUNNING
+from tvdb_client.sync.sync_engine import SyncEngine, iter_updated_series, sync_series
+from concurrent.futures import ThreadPoolExecutor
+import contextlib
+import json
+import os
+import socket
+import time
+import uuid
+import zlib
+
+__author__ = 'tsantana'
+
+
+def shard_of(series_id, shards):
+    """
+    :return: the shard (0 to shards - 1) a series belongs to. It's stable across processes and hosts, unlike hash.
+    """
+    return zlib.crc32(str(series_id).encode('ascii')) % shards
+
+
+class CrawlCoordinator(object):
+    """
+    Splits a crawl into tasks, which the CrawlWorkers of any number of processes and hosts sharing the backend claim
+    and process: either a list of series partitioned by hash, or a period of time partitioned into the get_updated
+    windows of the SyncEngine. Planning is idempotent, as tasks are named after their shard or window, so every worker
+    may plan the crawl before starting.
+    """
+
+    def __init__(self, backend):
+        """
+        :param backend: The crawl_backends.CrawlBackend shared by the workers.
+        """
+        self.backend = backend
+
+    def add_series(self, series_ids, shards=16, name='series'):
+        """
+        Plans the refresh of a list of series, in shards tasks.
+
+        :param series_ids: The TheTVDB ids of the series.
+        :param shards: The number of tasks the series are spread over.
+        :param name: The name of the crawl, prefixing the names of the tasks.
+        :return: the number of tasks added.
+        """
+        partitions = dict()
+        for series_id in set(series_ids):
+            partitions.setdefault(shard_of(series_id, shards), list()).append(series_id)
+
+        return self.backend.add_tasks(('%s-%d-of-%d' % (name, shard, shards), {'series_ids': sorted(ids)})
+                                      for shard, ids in sorted(partitions.items()))
+
+    def add_updates(self, from_time, to_time, window_seconds=SyncEngine.MAX_WINDOW_SECONDS, name='updates'):
+        """
+        Plans the refresh of the series updated in a period of time, in one task per window.
+
+        :param from_time: The epoch time the period starts at.
+        :param to_time: The epoch time the period ends at.
+        :param window_seconds: The duration of every window, of at most one week.
+        :param name: The name of the crawl, prefixing the names of the tasks.
+        :return: the number of tasks added.
+        """
+        if not 0 < window_seconds <= SyncEngine.MAX_WINDOW_SECONDS:
+            raise ValueError('The windows must last between 1 second and one week.')
+
+        windows = list()
+        from_time, to_time = int(from_time), int(to_time)
+        while from_time < to_time:
+            windows.append((from_time, min(from_time + window_seconds, to_time)))
+            from_time = windows[-1][1]
+
+        return self.backend.add_tasks(('%s-%d-%d' % (name, start, end), {'from_time': start, 'to_time': end})
+                                      for start, end in windows)
+
+    def progress(self):
+        """
+        :return: a python dictionary of task state (pending, running, done and failed) to the number of tasks.
+        """
+        return self.backend.progress()
+
+    def is_complete(self):
+        progress = self.backend.progress()
+        return not progress[PENDING] and not progress[RUNNING]
+
+
+class CrawlReport(object):
+    """
+    The outcome of a CrawlWorker run. failures maps the id of every series that failed to be refreshed (or the name of
+    a task whose updates couldn't be retrieved) to the exception raised.
+    """
+
+    def __init__(self):
+        self.claimed = 0
+        self.completed = 0
+        self.released = 0
+        self.lost_leases = 0
+        self.series_synced = 0
+        self.series_skipped = 0
+        self.series_deleted = 0
+        self.series_failed = 0
+        self.failures = dict()
+
+    def __repr__(self):
+        return '<CrawlReport claimed=%d completed=%d released=%d lost=%d synced=%d skipped=%d deleted=%d failed=%d>' % \
+               (self.claimed, self.completed, self.released, self.lost_leases, self.series_synced,
+                self.series_skipped, self.series_deleted, self.series_failed)
+
+
+class CrawlWorker(object):
+    """
+    Claims the tasks of a crawl one after the other and refreshes their series (with get_series and, optionally, all
+    their episodes, bypassing the cache of the client) on a pool of threads, handing them to the handler, as the
+    SyncEngine does.
+
+    Every series handled is recorded in the backend, and the lease on the task is renewed every third of its duration
+    while the series are refreshed: a task released after a failure, or claimed by another worker once the lease of a
+    crashed worker expired, resumes with the series not handled yet. Series deleted from TheTVDB are handed to the
+    deleted_handler, if any, and count as handled.
+    """
+
+    def __init__(self, client, backend, handler, worker_id=None, lease_seconds=60.0, max_workers=8,
+                 include_episodes=False, max_attempts=3, deleted_handler=None):
+        """
+        :param client: A logged in ApiV2Client. In a crawl spread over processes, the clients should share the token
+        (SharedToken), the rate limit (SharedRateLimiter) and the cache (backend.cache()) of the backend.
+        :param backend: The crawl_backends.CrawlBackend shared by the workers.
+        :param handler: A callable receiving (series_id, series, episodes) for every series, as the handler of the
+        SyncEngine. It's called from the worker threads, so it must be thread-safe.
+        :param worker_id: The identifier of the worker in the backend. Defaults to the host name, the process id and
+        a random suffix.
+        :param lease_seconds: The duration of the lease on a task.
+        :param max_workers: The number of series refreshed concurrently.
+        :param include_episodes: Whether the episodes of the series are refreshed as well.
+        :param max_attempts: The number of times a task may fail before it's given up.
+        :param deleted_handler: An optional callable receiving the id of every series deleted from TheTVDB, from the
+        worker threads as well.
+        """
+        self.client = client
+        self.backend = backend
+        self.handler = handler
+        self.worker_id = worker_id or '%s:%d:%s' % (socket.gethostname(), os.getpid(), uuid.uuid4().hex[:8])
+        self.lease_seconds = lease_seconds
+        self.max_workers = max_workers
+        self.include_episodes = include_episodes
+        self.max_attempts = max_attempts
+        self.deleted_handler = deleted_handler
+
+    def run(self, max_tasks=None, poll_interval=None):
+        """
+        Processes tasks until there's none left to claim.
+
+        :param max_tasks: The optional maximum number of tasks to claim.
+        :param poll_interval: If provided, instead of returning when no task can be claimed, the worker checks every
+        poll_interval seconds for tasks released by other workers or whose lease expired, until every task is done or
+        failed.
+        :return: a CrawlReport.
+        """
+        report = CrawlReport()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while max_tasks is None or report.claimed < max_tasks:
+                task = self.backend.claim(self.worker_id, self.lease_seconds)
+
+                if task is None:
+                    progress = self.backend.progress()
+                    if poll_interval is None or not progress[PENDING] and not progress[RUNNING]:
+                        break
+                    time.sleep(poll_interval)
+                    continue
+
+                report.claimed += 1
+                self.__run_task(executor, task, report)
+
+        return report
+
+    def __series_of(self, task):
+        if 'series_ids' in task.payload:
+            return set(task.payload['series_ids'])
+
+        return set(update['id'] for update in iter_updated_series(self.client, task.payload['from_time'],
+                                                                  task.payload['to_time']))
+
+    def __run_task(self, executor, task, report):
+        try:
+            series_ids = self.__series_of(task)
+        except Exception as e:
+            report.failures[task.name] = e
+            self.__release(task, report, repr(e))
+            return
+
+        failures, interrupted = sync_series(
+            executor, self.client, series_ids, self.backend.done_items(task.name),
+            lambda series_id: self.backend.mark_done(task.name, series_id), report, self.handler,
+            self.deleted_handler, self.include_episodes,
+            heartbeat=lambda: self.backend.renew(task.name, self.worker_id, self.lease_seconds),
+            heartbeat_seconds=self.lease_seconds / 3.0)
+        report.series_failed += len(failures)
+        report.failures.update(failures)
+
+        if interrupted:
+            # Another worker took the task over: it carries on from the series recorded as done.
+            report.lost_leases += 1
+            return
+
+        if failures:
+            self.__release(task, report, repr(list(failures.values())[-1]))
+        elif self.backend.complete(task.name, self.worker_id):
+            report.completed += 1
+        else:
+            report.lost_leases += 1
+
+    def __release(self, task, report, error):
+        if self.backend.release(task.name, self.worker_id, error, self.max_attempts):
+            report.released += 1
+        else:
+            report.lost_leases += 1
+
+
+class SharedToken(object):
+    """
+    The token of a TheTVDB account, shared through a crawl backend by the ApiV2Clients of all the workers (see the
+    token_store of ApiV2Client), so the account logs in once rather than once per process.
+    """
+
+    def __init__(self, backend, key='token', lock_seconds=30.0):
+        """
+        :param backend: The crawl_backends.CrawlBackend shared by the workers.
+        :param key: The key of the token in the backend. Accounts sharing a backend need distinct keys.
+        :param lock_seconds: The maximum number of seconds a login holds the lock, in case its process dies.
+        """
+        self.backend = backend
+        self.key = key
+        self.lock_seconds = lock_seconds
+
+    def get(self):
+        """
+        :return: a tuple (token, issued_at) of the shared token and the epoch time it was issued at, or None.
+        """
+        value = self.backend.get_value(self.key)
+        if value is None:
+            return None
+
+        value = json.loads(value)
+        return value['token'], value['issued_at']
+
+    def set(self, token, issued_at):
+        self.backend.set_value(self.key, json.dumps({'token': token, 'issued_at': issued_at}))
+
+    @contextlib.contextmanager
+    def locked(self):
+        """
+        Holds the login lock of the token, waiting for it if another worker holds it.
+
+        :return: a context manager.
+        """
+        owner = uuid.uuid4().hex
+        lock = self.key + ':lock'
+        while not self.backend.acquire_lock(lock, owner, self.lock_seconds):
+            time.sleep(0.05)
+        try:
+            yield
+        finally:
+            self.backend.release_lock(lock, owner)
+
+
+class SharedRateLimiter(object):
+    """
+    A token bucket shared through a crawl backend, which keeps all the workers together under the rate limit of a
+    TheTVDB account. It has the same methods as requests_util.RateLimiter, to be the rate_limiter of ApiV2Client.
+    """
+
+    def __init__(self, backend, rate, burst=None, name='rate'):
+        """
+        :param backend: The crawl_backends.CrawlBackend shared by the workers.
+        :param rate: The number of requests allowed per second, all workers together.
+        :param burst: The number of requests that may be sent at once after an idle period. Defaults to the rate.
+        :param name: The name of the bucket in the backend.
+        """
+        self.backend = backend
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else max(1, rate))
+        self.name = name
+
+    def acquire(self):
+        """
+        Takes one token from the bucket, waiting for it if needed.
+
+        :return: the number of seconds waited.
+        """
+        waited = 0.0
+
+        while True:
+            wait = self.backend.take_token(self.name, self.rate, self.burst)
+            if wait <= 0:
+                return waited
+
+            time.sleep(wait)
+            waited += wait
+
+    def pause(self, seconds):
+        """
+        Holds every request of every worker for the given number of seconds, i.e. when TheTVDB answers 429 with a
+        Retry-After.
+        """
+        self.backend.pause_bucket(self.name, seconds)
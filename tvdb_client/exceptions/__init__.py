@@ -1,2 +1,4 @@
 
-from .tvdb_exceptions import UserNotLoggedInException, AuthenticationFailedException
+from .tvdb_exceptions import UserNotLoggedInException, AuthenticationFailedException, RequestFailedException, \
+    CircuitOpenException, BatchTimeoutException, CassetteMissException, NoAvailableKeyException, \
+    DeadlineExceededException
@@ -11,3 +11,42 @@ class AuthenticationFailedException(Exception):
 
     def __init__(self, message):
         super(AuthenticationFailedException, self).__init__(message)
+
+
+class RequestFailedException(Exception):
+
+    def __init__(self, message, error=None):
+        super(RequestFailedException, self).__init__(message)
+        self.error = error
+
+
+class CircuitOpenException(Exception):
+
+    def __init__(self, message):
+        super(CircuitOpenException, self).__init__(message)
+
+
+class BatchTimeoutException(Exception):
+
+    def __init__(self, message):
+        super(BatchTimeoutException, self).__init__(message)
+
+
+class CassetteMissException(Exception):
+
+    def __init__(self, message, key=None):
+        super(CassetteMissException, self).__init__(message)
+        self.key = key
+
+
+class NoAvailableKeyException(Exception):
+
+    def __init__(self, message, retry_after=None):
+        super(NoAvailableKeyException, self).__init__(message)
+        self.retry_after = retry_after
+
+
+class DeadlineExceededException(Exception):
+
+    def __init__(self, message):
+        super(DeadlineExceededException, self).__init__(message)
@@ -0,0 +1,2 @@
+
+from .tvdb_models import TVDBModel, Series, Episode, Actor, Image, Language
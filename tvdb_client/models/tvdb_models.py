@@ -0,0 +1,145 @@
+# coding: utf-8
+"""
+Compact models of the TheTVDB entities, an opt-in alternative to the python dictionaries returned by json.loads.
+
+Models are built on __slots__, so they have no per-instance __dict__ and no repeated key strings. Only the fields most
+consumers read (FIELDS) are kept as attributes. The remaining keys of the response are kept serialized in a single
+compact JSON string and only decoded the first time one of them (LAZY_FIELDS, or to_dict) is accessed.
+"""
+import json
+
+__author__ = 'tsantana'
+
+
+class TVDBModel(object):
+
+    __slots__ = ('_extra',)
+
+    FIELDS = ()
+    LAZY_FIELDS = ()
+
+    def __init__(self, data):
+        """
+        :param data: The python dictionary of the entity, as returned by TheTVDB.
+        """
+        cls = type(self)
+        for attribute, key in cls.FIELDS:
+            setattr(self, attribute, data.get(key))
+
+        extra = dict((key, value) for key, value in data.items() if key not in cls._eager_keys)
+        self._extra = json.dumps(extra, separators=(',', ':')) if extra else None
+
+    def __extra(self):
+        if self._extra is None:
+            return {}
+        if not isinstance(self._extra, dict):
+            self._extra = json.loads(self._extra)
+        return self._extra
+
+    def __getattr__(self, name):
+        key = type(self)._lazy_keys.get(name)
+        if key is None:
+            raise AttributeError("'%s' object has no attribute '%s'" % (type(self).__name__, name))
+
+        return self.__extra().get(key)
+
+    def to_dict(self):
+        """
+        :return: the python dictionary of the entity, as returned by TheTVDB.
+        """
+        data = dict(self.__extra())
+        data.update((key, getattr(self, attribute)) for attribute, key in self.FIELDS)
+        return data
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self.to_dict() == other.to_dict()
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return '<%s id=%s>' % (type(self).__name__, getattr(self, 'id', None))
+
+
+def _model(cls):
+    cls._eager_keys = frozenset(key for attribute, key in cls.FIELDS)
+    cls._lazy_keys = dict(cls.LAZY_FIELDS)
+    return cls
+
+
+@_model
+class Series(TVDBModel):
+
+    FIELDS = (('id', 'id'), ('series_name', 'seriesName'), ('status', 'status'), ('first_aired', 'firstAired'),
+              ('network', 'network'), ('runtime', 'runtime'), ('genre', 'genre'), ('last_updated', 'lastUpdated'),
+              ('imdb_id', 'imdbId'), ('site_rating', 'siteRating'))
+    LAZY_FIELDS = (('aliases', 'aliases'), ('banner', 'banner'), ('overview', 'overview'),
+                   ('airs_day_of_week', 'airsDayOfWeek'), ('airs_time', 'airsTime'), ('rating', 'rating'),
+                   ('zap2it_id', 'zap2itId'), ('network_id', 'networkId'), ('added', 'added'),
+                   ('added_by', 'addedBy'), ('site_rating_count', 'siteRatingCount'), ('slug', 'slug'))
+
+    __slots__ = tuple(attribute for attribute, key in FIELDS)
+
+
+@_model
+class Episode(TVDBModel):
+
+    FIELDS = (('id', 'id'), ('series_id', 'seriesId'), ('aired_season', 'airedSeason'),
+              ('aired_episode_number', 'airedEpisodeNumber'), ('absolute_number', 'absoluteNumber'),
+              ('episode_name', 'episodeName'), ('first_aired', 'firstAired'), ('last_updated', 'lastUpdated'))
+    LAZY_FIELDS = (('overview', 'overview'), ('aired_season_id', 'airedSeasonID'), ('guest_stars', 'guestStars'),
+                   ('director', 'director'), ('directors', 'directors'), ('writers', 'writers'),
+                   ('language', 'language'), ('production_code', 'productionCode'),
+                   ('dvd_season', 'dvdSeason'), ('dvd_episode_number', 'dvdEpisodeNumber'),
+                   ('airs_after_season', 'airsAfterSeason'), ('airs_before_season', 'airsBeforeSeason'),
+                   ('airs_before_episode', 'airsBeforeEpisode'), ('filename', 'filename'), ('imdb_id', 'imdbId'),
+                   ('site_rating', 'siteRating'), ('site_rating_count', 'siteRatingCount'))
+
+    __slots__ = tuple(attribute for attribute, key in FIELDS)
+
+
+@_model
+class Actor(TVDBModel):
+
+    FIELDS = (('id', 'id'), ('series_id', 'seriesId'), ('name', 'name'), ('role', 'role'),
+              ('sort_order', 'sortOrder'), ('image', 'image'))
+    LAZY_FIELDS = (('image_author', 'imageAuthor'), ('image_added', 'imageAdded'), ('last_updated', 'lastUpdated'))
+
+    __slots__ = tuple(attribute for attribute, key in FIELDS)
+
+
+@_model
+class Image(TVDBModel):
+
+    FIELDS = (('id', 'id'), ('key_type', 'keyType'), ('sub_key', 'subKey'), ('file_name', 'fileName'),
+              ('resolution', 'resolution'), ('thumbnail', 'thumbnail'))
+    LAZY_FIELDS = (('ratings_info', 'ratingsInfo'), ('language_id', 'languageId'))
+
+    __slots__ = tuple(attribute for attribute, key in FIELDS)
+
+
+@_model
+class Language(TVDBModel):
+
+    FIELDS = (('id', 'id'), ('abbreviation', 'abbreviation'), ('name', 'name'), ('english_name', 'englishName'))
+
+    __slots__ = tuple(attribute for attribute, key in FIELDS)
+
+
+def from_response(response, model):
+    """
+    Converts the data of a parsed response into models.
+
+    :param response: The python dictionary of a successful response, with the entity or the list of entities in data.
+    :param model: The TVDBModel subclass of the entities.
+    :return: a copy of the response with the models in data, or the response itself if it has no data (i.e. an error).
+    """
+    data = response.get('data')
+    if data is None:
+        return response
+
+    response = dict(response)
+    response['data'] = [model(item) for item in data] if isinstance(data, list) else model(data)
+    return response
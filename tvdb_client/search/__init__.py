@@ -0,0 +1,2 @@
+
+from .search_index import SeriesSearchIndex, normalize
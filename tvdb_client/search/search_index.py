@@ -0,0 +1,301 @@
+# coding: utf-8
+from tvdb_client.exceptions import RequestFailedException
+from tvdb_client.sync.sync_engine import iter_updated_series
+from collections import Counter
+from difflib import SequenceMatcher
+from functools import lru_cache
+import json
+import re
+import threading
+import time
+import unicodedata
+
+__author__ = 'tsantana'
+
+# The fields of a series returned by /search/series, plus the ids it can be searched by.
+SUMMARY_FIELDS = ('aliases', 'banner', 'firstAired', 'id', 'imdbId', 'network', 'overview', 'seriesName', 'slug',
+                  'status', 'zap2itId')
+
+
+def normalize(name):
+    """
+    Normalizes a series name for matching: accents, case, apostrophes and punctuation are dropped, so
+    'Grey's Anatomy', 'greys.anatomy' and 'GREYS ANATOMY' are all 'greys anatomy'.
+
+    :param name: A series name, or a name extracted from a file name.
+    :return: the normalized name.
+    """
+    if isinstance(name, bytes):
+        name = name.decode('utf-8')
+
+    name = unicodedata.normalize('NFKD', name)
+    name = u''.join(c for c in name if not unicodedata.combining(c)).lower()
+    name = re.sub(u"['’]", u'', name.replace(u'&', u' and '))
+
+    return u' '.join(re.findall(r'[^\W_]+', name, re.UNICODE))
+
+
+def trigrams(normalized_name):
+    padded = u' %s ' % normalized_name
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+@lru_cache(maxsize=1 << 16)
+def token_similarity(a, b):
+    # Series names share most of their words, so the same pairs of words are compared over and over.
+    if a == b:
+        return 1.0
+    if a.isdigit() or b.isdigit():
+        return 0.0
+    return SequenceMatcher(None, a, b).ratio()
+
+
+def similarity(query, name):
+    """
+    Scores how well a normalized name matches a normalized query, from 0 to 1. Every word of each is paired with the
+    most similar word of the other (numbers only pair with the same number), so typos and reordered words cost little
+    while missing or extra words lower the score: 'game of thornes' scores 0.95 against 'game of thrones', 'house'
+    0.62 against 'house of cards' and 'series 1' 0.5 against 'series 2'.
+    """
+    if query == name:
+        return 1.0
+
+    query_tokens, name_tokens = query.split(), name.split()
+    if not query_tokens or not name_tokens:
+        return 0.0
+
+    total = sum(max(token_similarity(q, n) for n in name_tokens) for q in query_tokens) + \
+        sum(max(token_similarity(n, q) for q in query_tokens) for n in name_tokens)
+    return total / (len(query_tokens) + len(name_tokens))
+
+
+class SeriesSearchIndex(object):
+    """
+    A local index of series, answering search_series lookups without a request to TheTVDB. Series are indexed by
+    their name and aliases (normalized, and by trigram for fuzzy matching) and by their IMDb and zap2it ids.
+
+    It's filled with the series an ApiV2Client created with search_index retrieves (get_series and search_series
+    results), or explicitly with add, and kept fresh with refresh (or by adding the series a SyncEngine handles).
+    """
+
+    # The maximum number of candidates (the series sharing the most trigrams with the name) scored by match_name.
+    MAX_CANDIDATES = 200
+    # The number of series ids of the trigram postings match_name counts at most, which bounds its cost.
+    POSTINGS_BUDGET = 20000
+
+    def __init__(self, min_score=0.75):
+        """
+        :param min_score: The minimum similarity (see similarity) of a name for its series to be a match.
+        """
+        self.min_score = min_score
+        self.hits = 0
+        self.misses = 0
+        self.__series = dict()
+        self.__names = dict()
+        self.__by_name = dict()
+        self.__by_trigram = dict()
+        self.__by_external_id = dict()
+        self.__lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.__series)
+
+    def __contains__(self, series_id):
+        return series_id in self.__series
+
+    @staticmethod
+    def __post(postings, key, series_id):
+        postings.setdefault(key, set()).add(series_id)
+
+    @staticmethod
+    def __unpost(postings, key, series_id):
+        ids = postings.get(key)
+        if ids is not None:
+            ids.discard(series_id)
+            if not ids:
+                del postings[key]
+
+    def __index(self, series_id, method):
+        for name in self.__names[series_id]:
+            method(self.__by_name, name, series_id)
+            for trigram in trigrams(name):
+                method(self.__by_trigram, trigram, series_id)
+
+        summary = self.__series[series_id]
+        for field in ('imdbId', 'zap2itId'):
+            if summary.get(field):
+                method(self.__by_external_id, (field, summary[field]), series_id)
+
+    def add(self, series):
+        """
+        Adds a series to the index, or updates it if it's indexed already.
+
+        :param series: The data of a get_series or search_series response: a python dictionary or a tvdb_models.Series.
+        :return: None
+        """
+        if hasattr(series, 'to_dict'):
+            series = series.to_dict()
+
+        with self.__lock:
+            series_id = series['id']
+            summary = dict(self.__series.get(series_id) or {})
+            summary.update((field, series[field]) for field in SUMMARY_FIELDS if series.get(field) is not None)
+
+            self.remove(series_id)
+            self.__series[series_id] = summary
+            names = [summary.get('seriesName')] + list(summary.get('aliases') or [])
+            self.__names[series_id] = set(normalize(name) for name in names if name) - {u''}
+            self.__index(series_id, self.__post)
+
+    def remove(self, series_id):
+        """
+        Removes a series from the index, if it's indexed.
+
+        :param series_id: The TheTVDB id of the series.
+        :return: None
+        """
+        with self.__lock:
+            if series_id in self.__series:
+                self.__index(series_id, self.__unpost)
+                del self.__series[series_id]
+                del self.__names[series_id]
+
+    def match_name(self, name, limit=10):
+        """
+        Finds the series whose name or aliases best match the name provided.
+
+        :param name: The name to look for.
+        :param limit: The maximum number of matches.
+        :return: a list of tuples (score, series_id) of the matches, best first. If some names or aliases are equal to
+        the name once normalized, only their series are returned.
+        """
+        query = normalize(name)
+        if not query:
+            return []
+
+        query_trigrams = trigrams(query)
+
+        with self.__lock:
+            exact = self.__by_name.get(query)
+            if exact:
+                return [(1.0, series_id) for series_id in sorted(exact)][:limit]
+
+            # Misspelled words still share some trigrams with the right ones, so the series sharing at least a third of
+            # the trigrams of the name are scored. The rarest trigrams are the most selective, so they're counted
+            # first, and the most common ones are skipped once POSTINGS_BUDGET series ids have been counted.
+            postings = sorted((self.__by_trigram[trigram] for trigram in query_trigrams
+                               if trigram in self.__by_trigram), key=len)
+            shared = Counter()
+            counted, considered = 0, 0
+            for series_ids in postings:
+                if counted and counted + len(series_ids) > self.POSTINGS_BUDGET:
+                    break
+                shared.update(series_ids)
+                counted += len(series_ids)
+                considered += 1
+
+            candidates = [series_id for series_id, count in shared.most_common(self.MAX_CANDIDATES)
+                          if 3 * count >= considered]
+
+            matches = list()
+            for series_id in candidates:
+                score = max(similarity(query, candidate) for candidate in self.__names[series_id])
+                if score >= self.min_score:
+                    matches.append((score, series_id))
+
+        matches.sort(key=lambda match: (-match[0], match[1]))
+        return matches[:limit]
+
+    def search(self, name=None, imdb_id=None, zap2it_id=None, limit=10):
+        """
+        Searches the index as TheTVDB searches series: by name, imdb_id or zap2it_id.
+
+        :param name: The name of the series to look for. It's matched fuzzily.
+        :param imdb_id: The IMDb id of the series to look for.
+        :param zap2it_id: The zap2it id of the series to look for.
+        :param limit: The maximum number of series matching the name.
+        :return: a list of the matching series (python dictionaries with the fields of a /search/series result), best
+        first. They're shared with the index, so they must not be modified.
+        """
+        with self.__lock:
+            series_ids = list()
+            for field, value in (('imdbId', imdb_id), ('zap2itId', zap2it_id)):
+                if value:
+                    series_ids.extend(sorted(self.__by_external_id.get((field, value), ())))
+            if name:
+                series_ids.extend(series_id for score, series_id in self.match_name(name, limit))
+
+            results = [self.__series[series_id] for series_id in sorted(set(series_ids), key=series_ids.index)]
+
+            if results:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+            return results
+
+    def refresh(self, client, from_time, to_time=None, max_workers=8):
+        """
+        Retrieves again the indexed series that changed on TheTVDB between from_time and to_time.
+
+        :param client: A logged in ApiV2Client.
+        :param from_time: The epoch time to look for changes from, i.e. the time of the previous refresh.
+        :param to_time: The epoch time to look for changes up to. Now, if none is provided.
+        :param max_workers: The number of series retrieved concurrently.
+        :return: the number of series refreshed.
+        :raise RequestFailedException: if the updates or a series can't be retrieved.
+        """
+        to_time = int(to_time if to_time is not None else time.time())
+        series_ids = set(update['id'] for update in iter_updated_series(client, from_time, to_time)
+                         if update['id'] in self)
+
+        for series_id in series_ids:
+            client.invalidate_series(series_id)
+
+        for series_id, response in client.get_series_many(series_ids, max_workers=max_workers):
+            if isinstance(response, Exception):
+                raise RequestFailedException('Failed to refresh series %d: %s' % (series_id, response), None)
+            if 'data' in response:
+                self.add(response['data'])
+            elif response.get('code') == 404:
+                self.remove(series_id)
+            else:
+                raise RequestFailedException('Failed to refresh series %d: %s' % (series_id, response.get('message')),
+                                             response)
+
+        return len(series_ids)
+
+    def stats(self):
+        """
+        :return: a python dictionary with the hit and miss counters of search and the number of series indexed.
+        """
+        with self.__lock:
+            return {'hits': self.hits, 'misses': self.misses, 'series': len(self.__series)}
+
+    def save(self, path):
+        """
+        Writes the indexed series to a file, so the index can be loaded again by another process.
+
+        :param path: The path of the file.
+        :return: None
+        """
+        with self.__lock:
+            series = list(self.__series.values())
+
+        with open(path, 'w') as f:
+            json.dump(series, f)
+
+    @classmethod
+    def load(cls, path, min_score=0.75):
+        """
+        Creates an index with the series saved to a file by save.
+
+        :param path: The path of the file.
+        :param min_score: See __init__.
+        :return: a SeriesSearchIndex.
+        """
+        index = cls(min_score)
+        with open(path) as f:
+            for series in json.load(f):
+                index.add(series)
+        return index
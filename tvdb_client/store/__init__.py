@@ -0,0 +1 @@
+from .metadata_store import MetadataStore
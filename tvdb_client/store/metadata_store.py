@@ -0,0 +1,341 @@
+# coding: utf-8
+from tvdb_client.utils import utils
+import json
+import re
+import sqlite3
+import threading
+
+__author__ = 'tsantana'
+
+# The columns of every table: (column, SQLite type, Arrow type, key of the TheTVDB item). The key may be a tuple, the
+# path to a nested value, or None for values not found in the item (the series id of images). Every table also has a
+# data column holding the whole item as JSON.
+TABLES = {
+    'series': (
+        ('id', 'INTEGER', 'int64', 'id'),
+        ('series_name', 'TEXT', 'string', 'seriesName'),
+        ('status', 'TEXT', 'string', 'status'),
+        ('network', 'TEXT', 'string', 'network'),
+        ('first_aired', 'TEXT', 'string', 'firstAired'),
+        ('imdb_id', 'TEXT', 'string', 'imdbId'),
+        ('site_rating', 'REAL', 'float64', 'siteRating'),
+        ('last_updated', 'INTEGER', 'int64', 'lastUpdated'),
+    ),
+    'episodes': (
+        ('id', 'INTEGER', 'int64', 'id'),
+        ('series_id', 'INTEGER', 'int64', 'seriesId'),
+        ('aired_season', 'INTEGER', 'int64', 'airedSeason'),
+        ('aired_episode_number', 'INTEGER', 'int64', 'airedEpisodeNumber'),
+        ('absolute_number', 'INTEGER', 'int64', 'absoluteNumber'),
+        ('episode_name', 'TEXT', 'string', 'episodeName'),
+        ('first_aired', 'TEXT', 'string', 'firstAired'),
+        ('imdb_id', 'TEXT', 'string', 'imdbId'),
+        ('site_rating', 'REAL', 'float64', 'siteRating'),
+        ('last_updated', 'INTEGER', 'int64', 'lastUpdated'),
+    ),
+    'actors': (
+        ('id', 'INTEGER', 'int64', 'id'),
+        ('series_id', 'INTEGER', 'int64', 'seriesId'),
+        ('name', 'TEXT', 'string', 'name'),
+        ('role', 'TEXT', 'string', 'role'),
+        ('sort_order', 'INTEGER', 'int64', 'sortOrder'),
+        ('last_updated', 'TEXT', 'string', 'lastUpdated'),
+    ),
+    'images': (
+        ('id', 'INTEGER', 'int64', 'id'),
+        ('series_id', 'INTEGER', 'int64', None),
+        ('key_type', 'TEXT', 'string', 'keyType'),
+        ('sub_key', 'TEXT', 'string', 'subKey'),
+        ('resolution', 'TEXT', 'string', 'resolution'),
+        ('file_name', 'TEXT', 'string', 'fileName'),
+        ('rating_average', 'REAL', 'float64', ('ratingsInfo', 'average')),
+        ('rating_count', 'INTEGER', 'int64', ('ratingsInfo', 'count')),
+    ),
+}
+
+INDEXES = (
+    ('series', ('imdb_id',)),
+    ('episodes', ('series_id', 'aired_season', 'aired_episode_number')),
+    ('episodes', ('aired_season',)),
+    ('episodes', ('first_aired',)),
+    ('episodes', ('imdb_id',)),
+    ('actors', ('series_id',)),
+    ('images', ('series_id', 'key_type')),
+)
+
+# The endpoints whose responses store_response persists, and the table their data goes to.
+ENDPOINT_TABLES = {
+    '/series/{id}': 'series',
+    '/series/{id}/episodes': 'episodes',
+    '/series/{id}/episodes/query': 'episodes',
+    '/episodes/{id}': 'episodes',
+    '/series/{id}/actors': 'actors',
+    '/series/{id}/images': 'images',
+    '/series/{id}/images/query': 'images',
+}
+
+
+def _value(item, key):
+    if isinstance(key, tuple):
+        for part in key:
+            item = item.get(part) if isinstance(item, dict) else None
+        return item
+    return item.get(key)
+
+
+def _pyarrow():
+    # pyarrow takes long to import, so it's only imported by the exports.
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError('Exporting to Arrow or Parquet requires the pyarrow package.')
+    return pyarrow
+
+
+class MetadataStore(object):
+    """
+    A local SQLite database of the series, episodes, actors and images retrieved from TheTVDB, i.e. by an ApiV2Client
+    created with store=..., which persists the responses of the matching endpoints, or by a SyncEngine using
+    sync_handler.
+
+    Every item is stored whole (as JSON) along with indexed columns (see TABLES) to query it by. Items are upserted
+    by id and only replaced by versions at least as recent (lastUpdated), so responses arriving out of order never
+    overwrite newer data. Tables can be exported to Arrow or Parquet (with pyarrow installed) for analytics.
+    """
+
+    def __init__(self, path=':memory:'):
+        """
+        :param path: The path of the SQLite database file. It's created if it doesn't exist.
+        """
+        self.path = path
+        self.__lock = threading.RLock()
+        self.__connection = sqlite3.connect(path, check_same_thread=False)
+        self.__connection.execute('PRAGMA journal_mode=WAL')
+        self.__connection.execute('PRAGMA synchronous=NORMAL')
+
+        with self.__connection:
+            for table, columns in TABLES.items():
+                self.__connection.execute('CREATE TABLE IF NOT EXISTS %s (%s, data TEXT NOT NULL)' %
+                                          (table, ', '.join('%s %s%s' % (name, sql_type, ' PRIMARY KEY'
+                                                                         if name == 'id' else '')
+                                                            for name, sql_type, _, _ in columns)))
+            for table, columns in INDEXES:
+                self.__connection.execute('CREATE INDEX IF NOT EXISTS %s_%s ON %s (%s)' %
+                                          (table, '_'.join(columns), table, ', '.join(columns)))
+
+        self.__upserts = dict((table, self.__upsert_statement(table, columns)) for table, columns in TABLES.items())
+
+    @staticmethod
+    def __upsert_statement(table, columns):
+        names = [name for name, _, _, _ in columns] + ['data']
+        updates = ', '.join('%s = excluded.%s' % (name, name) for name in names if name != 'id')
+        condition = 'excluded.last_updated > %s.last_updated OR %s.last_updated IS NULL' % (table, table) \
+            if 'last_updated' in names else '1'
+        # Listings carry fewer fields than the endpoint of the item itself, so the larger of two items of the same
+        # version is kept.
+        if 'last_updated' in names:
+            condition += ' OR (excluded.last_updated IS %s.last_updated AND length(excluded.data) >= length(%s.data))' \
+                         % (table, table)
+
+        return 'INSERT INTO %s (%s) VALUES (%s) ON CONFLICT(id) DO UPDATE SET %s WHERE %s' % \
+               (table, ', '.join(names), ', '.join('?' * len(names)), updates, condition)
+
+    def __upsert(self, table, items, series_id=None):
+        rows = list()
+        for item in items:
+            if hasattr(item, 'to_dict'):
+                item = item.to_dict()
+            row = [_value(item, key) if key is not None else None for _, _, _, key in TABLES[table]]
+            for i, (name, _, _, key) in enumerate(TABLES[table]):
+                if name == 'series_id' and row[i] is None:
+                    row[i] = series_id
+            row.append(json.dumps(item, separators=(',', ':')))
+            rows.append(row)
+
+        with self.__lock, self.__connection:
+            return self.__connection.executemany(self.__upserts[table], rows).rowcount
+
+    def store_series(self, series):
+        """
+        :param series: The series (the data of a get_series response): python dictionaries or tvdb_models.Series.
+        :return: the number of series inserted or updated.
+        """
+        return self.__upsert('series', series)
+
+    def store_episodes(self, episodes, series_id=None):
+        """
+        :param episodes: The episodes (i.e. the data of a get_series_episodes response): python dictionaries or
+        tvdb_models.Episode.
+        :param series_id: The TheTVDB id of the series of the episodes lacking a seriesId.
+        :return: the number of episodes inserted or updated.
+        """
+        return self.__upsert('episodes', episodes, series_id)
+
+    def store_actors(self, actors, series_id=None):
+        """
+        :param actors: The actors (the data of a get_series_actors response).
+        :param series_id: The TheTVDB id of the series of the actors lacking a seriesId.
+        :return: the number of actors inserted or updated.
+        """
+        return self.__upsert('actors', actors, series_id)
+
+    def store_images(self, images, series_id):
+        """
+        :param images: The images (the data of a get_series_images response).
+        :param series_id: The TheTVDB id of the series of the images.
+        :return: the number of images inserted or updated.
+        """
+        return self.__upsert('images', images, series_id)
+
+    def store_response(self, url, response):
+        """
+        Persists the data of a successful response of one of ENDPOINT_TABLES. Responses of other endpoints are ignored.
+
+        :param url: The full url of the request.
+        :param response: The parsed response.
+        :return: the number of items inserted or updated.
+        """
+        table = ENDPOINT_TABLES.get(utils.endpoint_from_url(url))
+        data = response.get('data') if table is not None else None
+        if not data:
+            return 0
+
+        series_id = re.search(r'/series/(\d+)', url)
+        series_id = int(series_id.group(1)) if series_id else None
+
+        return self.__upsert(table, data if isinstance(data, list) else [data], series_id)
+
+    def sync_handler(self, series_id, series, episodes):
+        """
+        A SyncEngine handler persisting the series (and episodes) it refreshes.
+        """
+        if series and series.get('data'):
+            self.store_series([series['data']])
+        if episodes:
+            self.store_episodes(episodes, series_id)
+
+    def __select(self, table, where, params, order_by='id'):
+        sql = 'SELECT data FROM %s' % table
+        if where:
+            sql += ' WHERE %s' % ' AND '.join(where)
+        sql += ' ORDER BY %s' % order_by
+
+        with self.__lock:
+            return [json.loads(row[0]) for row in self.__connection.execute(sql, params)]
+
+    def get_series(self, series_id):
+        """
+        :return: the stored series (a python dictionary) of the given id, or None.
+        """
+        series = self.__select('series', ['id = ?'], (series_id,))
+        return series[0] if series else None
+
+    def get_episodes(self, series_id=None, aired_season=None, aired_episode=None, first_aired_from=None,
+                     first_aired_to=None):
+        """
+        Queries the stored episodes. i.e. get_episodes(aired_season=1) returns the first season of every series.
+
+        :param series_id: The optional TheTVDB id of their series.
+        :param aired_season: The optional aired season number.
+        :param aired_episode: The optional aired episode number.
+        :param first_aired_from: The optional first date (YYYY-MM-DD) they aired from.
+        :param first_aired_to: The optional last date (YYYY-MM-DD) they aired up to.
+        :return: a list of the matching episodes (python dictionaries), by series, season and episode.
+        """
+        where, params = list(), list()
+        for condition, value in (('series_id = ?', series_id), ('aired_season = ?', aired_season),
+                                 ('aired_episode_number = ?', aired_episode), ('first_aired >= ?', first_aired_from),
+                                 ('first_aired <= ?', first_aired_to)):
+            if value is not None:
+                where.append(condition)
+                params.append(value)
+
+        return self.__select('episodes', where, params, 'series_id, aired_season, aired_episode_number, id')
+
+    def get_actors(self, series_id):
+        """
+        :return: a list of the stored actors of a series (python dictionaries), by sort order.
+        """
+        return self.__select('actors', ['series_id = ?'], (series_id,), 'sort_order, id')
+
+    def get_images(self, series_id, key_type=None):
+        """
+        :return: a list of the stored images of a series (python dictionaries), optionally of a key type only.
+        """
+        where, params = ['series_id = ?'], [series_id]
+        if key_type is not None:
+            where.append('key_type = ?')
+            params.append(key_type)
+        return self.__select('images', where, params)
+
+    def count(self, table):
+        """
+        :return: the number of items stored in a table (series, episodes, actors or images).
+        """
+        if table not in TABLES:
+            raise ValueError('Unknown table %r' % table)
+        with self.__lock:
+            return self.__connection.execute('SELECT COUNT(*) FROM %s' % table).fetchone()[0]
+
+    def __batches(self, table, include_data, where, params, batch_size):
+        if table not in TABLES:
+            raise ValueError('Unknown table %r' % table)
+        pyarrow = _pyarrow()
+
+        columns = [(name, arrow_type) for name, _, arrow_type, _ in TABLES[table]]
+        if include_data:
+            columns.append(('data', 'string'))
+        schema = pyarrow.schema([(name, getattr(pyarrow, arrow_type)()) for name, arrow_type in columns])
+
+        sql = 'SELECT %s FROM %s%s ORDER BY id' % (', '.join(name for name, _ in columns), table,
+                                                   ' WHERE %s' % where if where else '')
+
+        def batches():
+            with self.__lock:
+                cursor = self.__connection.execute(sql, params)
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    yield pyarrow.RecordBatch.from_arrays([pyarrow.array(values, type=field.type) for values, field
+                                                           in zip(zip(*rows), schema)], schema=schema)
+
+        return schema, batches()
+
+    def to_arrow(self, table, include_data=False, where=None, params=(), batch_size=65536):
+        """
+        Exports a table to an Arrow table, its rows being read in batches straight into Arrow arrays.
+
+        :param table: The name of the table: series, episodes, actors or images.
+        :param include_data: Whether the whole items are exported as well, as JSON, in a data column.
+        :param where: An optional SQL condition on the columns of the table, i.e. 'aired_season = ?'.
+        :param params: The parameters of the condition.
+        :param batch_size: The number of rows read at once.
+        :return: a pyarrow.Table.
+        :raise ImportError: if pyarrow is not installed.
+        """
+        schema, batches = self.__batches(table, include_data, where, params, batch_size)
+        return _pyarrow().Table.from_batches(list(batches), schema=schema)
+
+    def export_parquet(self, table, path, include_data=False, where=None, params=(), batch_size=65536):
+        """
+        Writes a table to a Parquet file, one row group per batch, so tables of any size are exported in bounded memory.
+
+        :param path: The path of the Parquet file.
+        :return: the number of rows written.
+        :raise ImportError: if pyarrow is not installed.
+
+        See to_arrow for the other parameters.
+        """
+        schema, batches = self.__batches(table, include_data, where, params, batch_size)
+        rows = 0
+        with _pyarrow().parquet.ParquetWriter(path, schema) as writer:
+            for batch in batches:
+                writer.write_batch(batch)
+                rows += batch.num_rows
+        return rows
+
+    def close(self):
+        with self.__lock:
+            self.__connection.close()
@@ -0,0 +1 @@
+from .sync_engine import SyncCheckpoint, SyncEngine, SyncResult, iter_updated_series, refresh_series, sync_series
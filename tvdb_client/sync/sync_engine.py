@@ -0,0 +1,301 @@
+# coding: utf-8
+from tvdb_client.exceptions import RequestFailedException
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import sqlite3
+import threading
+import time
+
+__author__ = 'tsantana'
+
+
+def iter_updated_series(client, from_time, to_time):
+    """
+    Yields the updates listed by get_updated between from_time and to_time, retrieved in windows of at most
+    SyncEngine.MAX_WINDOW_SECONDS, the longest period TheTVDB accepts.
+
+    :param client: A logged in ApiV2Client.
+    :param from_time: The epoch time to look for updates from.
+    :param to_time: The epoch time to look for updates up to.
+    :return: a generator of the updates: python dictionaries with the id and the lastUpdated time of a series. A series
+    updated several times is listed as many times.
+    :raise RequestFailedException: if the updates of a window can't be retrieved.
+    """
+    from_time, to_time = int(from_time), int(to_time)
+
+    while from_time < to_time:
+        window_end = min(from_time + SyncEngine.MAX_WINDOW_SECONDS, to_time)
+        updated = client.get_updated(from_time, window_end)
+
+        if 'data' not in updated and updated.get('code') != 404:
+            raise RequestFailedException('Failed to retrieve the updates from %d to %d: %s' %
+                                         (from_time, window_end, updated.get('message')), updated)
+
+        for update in updated.get('data') or []:
+            yield update
+        from_time = window_end
+
+
+def refresh_series(client, series_id, include_episodes=True):
+    """
+    Retrieves a series (and, optionally, all its episodes) from TheTVDB, bypassing the cache of the client.
+
+    :param client: A logged in ApiV2Client.
+    :param series_id: The TheTVDB id of the series.
+    :param include_episodes: Whether the episodes of the series are retrieved as well.
+    :return: a tuple (series, episodes): the response of get_series and the list of all episodes of the series (or
+    None if include_episodes is False). Both are None if the series was deleted from TheTVDB, which still lists it
+    among the updated series.
+    :raise RequestFailedException: if the series can't be retrieved.
+    """
+    client.invalidate_series(series_id)
+    series = client.get_series(series_id)
+
+    if 'data' not in series and series.get('code') == 404:
+        return None, None
+    if 'data' not in series:
+        raise RequestFailedException('Failed to retrieve series %d: %s' % (series_id, series.get('message')), series)
+
+    episodes = list(client.iter_series_episodes(series_id)) if include_episodes else None
+
+    return series, episodes
+
+
+def sync_series(executor, client, series_ids, done, mark_done, result, handler, deleted_handler=None,
+                include_episodes=True, heartbeat=None, heartbeat_seconds=None):
+    """
+    Refreshes a set of series with refresh_series on the threads of an executor and hands every one to the handler, or
+    its id to the deleted_handler if it was deleted from TheTVDB. Series already done are skipped, and every series
+    handled (deleted ones included) is passed to mark_done as soon as it is.
+
+    :param executor: The concurrent.futures.Executor the series are refreshed on.
+    :param client: A logged in ApiV2Client.
+    :param series_ids: The set of the TheTVDB ids of the series.
+    :param done: The set of the ids of the series handled before.
+    :param mark_done: A callable receiving the id of every series handled.
+    :param result: A SyncResult or a CrawlReport, whose series_synced, series_skipped and series_deleted are counted.
+    :param handler: A callable receiving (series_id, series, episodes), from the threads of the executor.
+    :param deleted_handler: An optional callable receiving the id of every deleted series, from the threads as well.
+    :param include_episodes: Whether the episodes of the series are refreshed as well.
+    :param heartbeat: An optional callable called every heartbeat_seconds while series are being refreshed, however
+    long any of them takes. If it returns False, the series not started yet are cancelled and the call returns.
+    :param heartbeat_seconds: The interval of the heartbeat.
+    :return: a tuple (failures, interrupted): a python dictionary of the id of every series that failed to the
+    exception raised, and whether the heartbeat interrupted the refresh.
+    """
+    result.series_skipped += len(series_ids & done)
+    pending = dict((executor.submit(_sync_one, client, series_id, handler, deleted_handler, include_episodes),
+                    series_id) for series_id in sorted(series_ids - done))
+    beat_at = time.time()
+    failures = dict()
+
+    while pending:
+        timeout = max(0.0, beat_at + heartbeat_seconds - time.time()) if heartbeat is not None else None
+        finished, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+
+        for future in finished:
+            series_id = pending.pop(future)
+            try:
+                synced = future.result()
+            except Exception as e:
+                failures[series_id] = e
+                continue
+
+            mark_done(series_id)
+            if synced:
+                result.series_synced += 1
+            else:
+                result.series_deleted += 1
+
+        if heartbeat is not None and time.time() - beat_at >= heartbeat_seconds:
+            beat_at = time.time()
+            if not heartbeat():
+                for future in pending:
+                    future.cancel()
+                return failures, True
+
+    return failures, False
+
+
+def _sync_one(client, series_id, handler, deleted_handler, include_episodes):
+    """
+    :return: False if the series was deleted from TheTVDB, True otherwise.
+    """
+    series, episodes = refresh_series(client, series_id, include_episodes)
+
+    if series is None:
+        if deleted_handler is not None:
+            deleted_handler(series_id)
+        return False
+
+    handler(series_id, series, episodes)
+    return True
+
+
+class SyncCheckpoint(object):
+    """
+    The persistent state of a SyncEngine: the high-water mark (the time up to which every update has been processed)
+    and the progress of the window being processed, so a crashed run resumes where it stopped. It's kept in a SQLite
+    database file.
+    """
+
+    def __init__(self, path=':memory:'):
+        """
+        :param path: The path of the SQLite database file. It's created if it doesn't exist.
+        """
+        self.path = path
+        self.__lock = threading.Lock()
+        self.__connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.__connection.execute('CREATE TABLE IF NOT EXISTS sync_state (name TEXT PRIMARY KEY, value INTEGER)')
+        self.__connection.execute('CREATE TABLE IF NOT EXISTS sync_window_done (series_id INTEGER PRIMARY KEY)')
+
+    def __get(self, name):
+        row = self.__connection.execute('SELECT value FROM sync_state WHERE name = ?', (name,)).fetchone()
+        return row[0] if row else None
+
+    def __set(self, name, value):
+        self.__connection.execute('INSERT OR REPLACE INTO sync_state (name, value) VALUES (?, ?)', (name, value))
+
+    @property
+    def high_water_mark(self):
+        with self.__lock:
+            return self.__get('high_water_mark')
+
+    @property
+    def window(self):
+        """
+        :return: a tuple (from_time, to_time) of the window in progress, or None if there's none.
+        """
+        with self.__lock:
+            from_time, to_time = self.__get('window_from'), self.__get('window_to')
+            return (from_time, to_time) if from_time is not None else None
+
+    def begin_window(self, from_time, to_time):
+        with self.__lock:
+            self.__set('window_from', from_time)
+            self.__set('window_to', to_time)
+
+    def done_series(self):
+        with self.__lock:
+            return set(row[0] for row in self.__connection.execute('SELECT series_id FROM sync_window_done'))
+
+    def mark_done(self, series_id):
+        with self.__lock:
+            self.__connection.execute('INSERT OR IGNORE INTO sync_window_done (series_id) VALUES (?)', (series_id,))
+
+    def complete_window(self, to_time):
+        """
+        Moves the high-water mark to the end of the window in progress and forgets about its progress.
+        """
+        with self.__lock:
+            self.__connection.execute('BEGIN')
+            self.__set('high_water_mark', to_time)
+            self.__connection.execute("DELETE FROM sync_state WHERE name IN ('window_from', 'window_to')")
+            self.__connection.execute('DELETE FROM sync_window_done')
+            self.__connection.execute('COMMIT')
+
+    def close(self):
+        self.__connection.close()
+
+
+class SyncResult(object):
+    """
+    The outcome of a SyncEngine run.
+    """
+
+    def __init__(self):
+        self.windows = 0
+        self.updates = 0
+        self.series_synced = 0
+        self.series_skipped = 0
+        self.series_deleted = 0
+        self.failures = dict()
+        self.high_water_mark = None
+
+    @property
+    def complete(self):
+        return not self.failures
+
+    def __repr__(self):
+        return '<SyncResult windows=%d updates=%d synced=%d skipped=%d deleted=%d failures=%d high_water_mark=%s>' % \
+               (self.windows, self.updates, self.series_synced, self.series_skipped, self.series_deleted,
+                len(self.failures), self.high_water_mark)
+
+
+class SyncEngine(object):
+    """
+    Incrementally mirrors TheTVDB by only refreshing the series that changed since the last run.
+
+    Updates are read with ApiV2Client.get_updated in windows of at most one week, starting at the high-water mark of
+    the checkpoint. The series ids of a window are deduplicated and every changed series is refreshed (get_series and,
+    optionally, all its episodes) on a pool of worker threads, bypassing the cache of the client, and handed to the
+    handler. The checkpoint records each series as soon as it's handled and moves the high-water mark once the whole
+    window is, so a crashed or failed run resumes with the series it did not handle yet. Series deleted from TheTVDB
+    (answered 404) are handed to the deleted_handler instead, and count as handled.
+    """
+
+    MAX_WINDOW_SECONDS = 7 * 24 * 3600
+
+    def __init__(self, client, handler, checkpoint=None, max_workers=8, include_episodes=True, deleted_handler=None):
+        """
+        :param client: A logged in ApiV2Client.
+        :param handler: A callable receiving (series_id, series, episodes) for every changed series: series is the
+        response of get_series and episodes the list of all episodes of the series (or None if include_episodes is
+        False). It's called from the worker threads, so it must be thread-safe.
+        :param checkpoint: The SyncCheckpoint of the mirror. If none is provided, an in-memory one is used.
+        :param max_workers: The number of series refreshed concurrently.
+        :param include_episodes: Whether the episodes of the changed series are refreshed as well.
+        :param deleted_handler: An optional callable receiving the id of every series deleted from TheTVDB, from the
+        worker threads as well.
+        """
+        self.client = client
+        self.handler = handler
+        self.checkpoint = checkpoint if checkpoint is not None else SyncCheckpoint()
+        self.max_workers = max_workers
+        self.include_episodes = include_episodes
+        self.deleted_handler = deleted_handler
+
+    def run(self, start_time=None, end_time=None):
+        """
+        Processes every update from the high-water mark (or start_time, on the first run) up to end_time.
+
+        :param start_time: The epoch time to start from when the checkpoint has no high-water mark yet.
+        :param end_time: The epoch time to sync up to. Now, if none is provided.
+        :return: a SyncResult. If some series failed to be refreshed, the run stops at the window they belong to and
+        the high-water mark is not moved past it.
+        """
+        result = SyncResult()
+        end_time = int(end_time if end_time is not None else time.time())
+
+        window = self.checkpoint.window
+        from_time = window[0] if window else self.checkpoint.high_water_mark
+        if from_time is None:
+            if start_time is None:
+                raise ValueError('A start_time is required on the first run of a SyncEngine.')
+            from_time = int(start_time)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while from_time < end_time:
+                to_time = window[1] if window else min(from_time + self.MAX_WINDOW_SECONDS, end_time)
+                window = None
+
+                self.checkpoint.begin_window(from_time, to_time)
+                self.__sync_window(executor, from_time, to_time, result)
+                result.windows += 1
+
+                if result.failures:
+                    break
+
+                self.checkpoint.complete_window(to_time)
+                from_time = to_time
+
+        result.high_water_mark = self.checkpoint.high_water_mark
+        return result
+
+    def __sync_window(self, executor, from_time, to_time, result):
+        updates = list(iter_updated_series(self.client, from_time, to_time))
+        result.updates += len(updates)
+
+        failures, _ = sync_series(executor, self.client, set(update['id'] for update in updates),
+                                  self.checkpoint.done_series(), self.checkpoint.mark_done, result, self.handler,
+                                  self.deleted_handler, self.include_episodes)
+        result.failures.update(failures)
@@ -1,2 +1 @@
-from client import LoginTestCase, SearchTestCase
-__author__ = 'tsantana'
+from .client import LoginTestCase, SearchTestCase
@@ -0,0 +1,699 @@
+# coding: utf-8
+"""
+A local stand-in for the TheTVDB V2 API, used by the test cases and benchmarks so they can run without network access
+or real credentials. It serves deterministic, generated data for the endpoints wrapped by ApiV2Client.
+"""
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+__author__ = 'tsantana'
+
+VALID_API_KEY = 'STUB_API_KEY'
+VALID_USERNAME = 'stub_user'
+VALID_ACCOUNT_IDENTIFIER = 'STUB_ACCOUNT'
+
+PAGE_SIZE = 100
+
+PADDING = 'Lorem ipsum dolor sit amet. '
+
+
+class StubTVDBServer(object):
+    """
+    A threaded HTTP/1.1 server imitating TheTVDB V2 API.
+
+    Usage::
+
+        with StubTVDBServer() as stub:
+            api = ApiV2Client(VALID_USERNAME, VALID_API_KEY, VALID_ACCOUNT_IDENTIFIER)
+            api.API_BASE_URL = stub.url
+    """
+
+    LAST_MODIFIED = 'Sat, 01 Jan 2022 00:00:00 GMT'
+
+    def __init__(self, episodes_per_series=250, series_count=1000, handshake_latency=0.0, latency=0.0,
+                 validators=True, payload_padding=0, error_rate=0.0, error_statuses=(500, 503), rate_limit=None,
+                 seed=0, artwork_size=4096, missing_translations=(), credentials=(), key_rate_limit=None):
+        """
+        :param episodes_per_series: The number of episodes every generated series has.
+        :param series_count: The number of series ids (1..series_count) that exist on the stub.
+        :param handshake_latency: Seconds spent on every new connection, simulating the cost of a TLS handshake.
+        :param latency: Seconds spent on every request, simulating server processing time.
+        :param validators: Whether GET responses carry an ETag and a Last-Modified header and conditional requests are
+        answered with 304 (Not Modified).
+        :param payload_padding: The number of characters added to the overview of every series and episode, to make
+        the payloads as large as needed.
+        :param error_rate: The fraction of the requests (login excepted) failing with one of error_statuses.
+        :param error_statuses: The statuses of the failures injected by error_rate.
+        :param rate_limit: The number of requests per second (login excepted) allowed before answering 429 with a
+        Retry-After header, as TheTVDB does. Unlimited if None.
+        :param seed: The seed of the random failures, so runs are reproducible.
+        :param artwork_size: The number of bytes of every artwork file served under /banners/.
+        :param missing_translations: The languages series and episodes are not translated to: their names and
+        overviews are null in them, as TheTVDB answers for missing translations.
+        :param credentials: Additional (username, api_key, account_identifier) accepted by /login, besides the VALID_
+        ones.
+        :param key_rate_limit: The number of requests per second allowed to the tokens of every api key before
+        answering 429, as TheTVDB limits every account. Unlimited if None.
+        """
+        self.episodes_per_series = episodes_per_series
+        self.series_count = series_count
+        self.handshake_latency = handshake_latency
+        self.latency = latency
+        self.validators = validators
+        self.payload_padding = payload_padding
+        self.error_rate = error_rate
+        self.error_statuses = error_statuses
+        self.rate_limit = rate_limit
+        self.artwork_size = artwork_size
+        self.missing_translations = missing_translations
+        self.credentials = set([(VALID_USERNAME, VALID_API_KEY, VALID_ACCOUNT_IDENTIFIER)] + list(credentials))
+        self.key_rate_limit = key_rate_limit
+        self.key_requests = dict()
+        self.key_throttled = dict()
+        self.artwork_bytes = 0
+        self.truncated_artworks = 0
+        self.injected_errors = 0
+        self.throttled = 0
+        self.connections = 0
+        self.not_modified = 0
+        self.requests = 0
+        self.request_log = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.forced_failures = []
+        self.deleted_series = set()
+        self.favorites = set()
+        self.ratings = dict()
+        self.__tokens = dict()
+        self.__key_rate_tokens = dict()
+        self.__token_counter = 0
+        self.__random = random.Random(seed)
+        self.__rate_tokens = float(rate_limit or 0)
+        self.__rate_updated_at = time.time()
+        self.__lock = threading.Lock()
+        self.__server = None
+        self.__thread = None
+
+    @property
+    def url(self):
+        host, port = self.__server.server_address[:2]
+        return 'http://%s:%d' % (host, port)
+
+    def start(self):
+        self.__server = ThreadingHTTPServer(('127.0.0.1', 0), _StubRequestHandler)
+        self.__server.daemon_threads = True
+        self.__server.stub = self
+        self.__thread = threading.Thread(target=self.__server.serve_forever, kwargs={'poll_interval': 0.05})
+        self.__thread.daemon = True
+        self.__thread.start()
+        return self
+
+    def stop(self):
+        self.__server.shutdown()
+        self.__server.server_close()
+        self.__thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def record_connection(self):
+        with self.__lock:
+            self.connections += 1
+
+    def record_request(self, method, path, headers):
+        with self.__lock:
+            self.requests += 1
+            self.request_log.append((method, path, dict(headers)))
+
+    def enter_request(self):
+        with self.__lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    def leave_request(self):
+        with self.__lock:
+            self.in_flight -= 1
+
+    def fail_next(self, status, count=1, retry_after=None):
+        """
+        Makes the next count requests fail with the given status, and optionally a Retry-After header.
+        """
+        with self.__lock:
+            self.forced_failures.extend([(status, retry_after)] * count)
+
+    def truncate_next_artwork(self, count=1):
+        """
+        Makes the next count artwork downloads stop halfway, the connection being closed, as an interrupted transfer.
+        """
+        with self.__lock:
+            self.truncated_artworks += count
+
+    def pop_truncation(self):
+        with self.__lock:
+            if not self.truncated_artworks:
+                return False
+            self.truncated_artworks -= 1
+            return True
+
+    def record_artwork_bytes(self, count):
+        with self.__lock:
+            self.artwork_bytes += count
+
+    def pop_forced_failure(self):
+        with self.__lock:
+            return self.forced_failures.pop(0) if self.forced_failures else None
+
+    def injected_failure(self, path):
+        """
+        Applies the rate limit and the error rate to a request.
+
+        :return: a tuple (status, retry_after) if the request must fail, None otherwise.
+        """
+        if path == '/login':
+            return None
+
+        with self.__lock:
+            if self.rate_limit:
+                now = time.time()
+                self.__rate_tokens = min(float(self.rate_limit),
+                                         self.__rate_tokens + (now - self.__rate_updated_at) * self.rate_limit)
+                self.__rate_updated_at = now
+                if self.__rate_tokens < 1:
+                    self.throttled += 1
+                    return 429, int(math.ceil((1 - self.__rate_tokens) / self.rate_limit))
+                self.__rate_tokens -= 1
+
+            if self.error_rate and self.__random.random() < self.error_rate:
+                self.injected_errors += 1
+                return self.__random.choice(self.error_statuses), None
+
+        return None
+
+    def reset_counters(self):
+        with self.__lock:
+            self.connections = 0
+            self.requests = 0
+            self.request_log = []
+            self.max_in_flight = 0
+            self.injected_errors = 0
+            self.throttled = 0
+
+    def issue_token(self, api_key=VALID_API_KEY):
+        with self.__lock:
+            self.__token_counter += 1
+            token = 'stub-token-%d' % self.__token_counter
+            self.__tokens[token] = api_key
+            return token
+
+    def is_valid_token(self, token):
+        return token in self.__tokens
+
+    def api_key_of(self, token):
+        return self.__tokens.get(token)
+
+    def revoke_key(self, api_key):
+        """
+        Invalidates the tokens of an api key and refuses its logins from now on.
+        """
+        with self.__lock:
+            self.credentials = set(c for c in self.credentials if c[1] != api_key)
+            for token in [token for token, key in self.__tokens.items() if key == api_key]:
+                del self.__tokens[token]
+
+    def key_limited(self, api_key):
+        """
+        Counts a request of an api key and applies key_rate_limit to it.
+
+        :return: the Retry-After of the 429 answer if the request must be throttled, None otherwise.
+        """
+        with self.__lock:
+            self.key_requests[api_key] = self.key_requests.get(api_key, 0) + 1
+            if not self.key_rate_limit:
+                return None
+
+            now = time.time()
+            tokens, updated_at = self.__key_rate_tokens.get(api_key, (float(self.key_rate_limit), now))
+            tokens = min(float(self.key_rate_limit), tokens + (now - updated_at) * self.key_rate_limit)
+            if tokens < 1:
+                self.__key_rate_tokens[api_key] = (tokens, now)
+                self.key_throttled[api_key] = self.key_throttled.get(api_key, 0) + 1
+                return int(math.ceil((1 - tokens) / self.key_rate_limit))
+            self.__key_rate_tokens[api_key] = (tokens - 1, now)
+            return None
+
+    # Generated data
+
+    def series_exists(self, series_id):
+        return 0 < series_id <= self.series_count and series_id not in self.deleted_series
+
+    def delete_series(self, series_id):
+        """
+        Makes a series answer 404, as TheTVDB does once a series is deleted, while it's still listed by /updated.
+        """
+        self.deleted_series.add(series_id)
+
+    def series_name(self, series_id, language=None):
+        name = 'Series %d' % series_id
+        if language and language != 'en':
+            name = '%s (%s)' % (name, language)
+        return name
+
+    def series(self, series_id, language=None):
+        return self.__translated(language, {
+            'id': series_id,
+            'seriesName': self.series_name(series_id, language),
+            'aliases': ['Show %d' % series_id],
+            'banner': 'graphical/%d-g.jpg' % series_id,
+            'seriesId': str(series_id),
+            'status': 'Continuing' if series_id % 2 else 'Ended',
+            'firstAired': '2001-01-%02d' % (series_id % 28 + 1),
+            'network': 'Network %d' % (series_id % 7),
+            'networkId': str(series_id % 7),
+            'runtime': '45',
+            'genre': ['Drama', 'Comedy'][:series_id % 2 + 1],
+            'overview': 'Overview of series %d. ' % series_id * 5,
+            'lastUpdated': 1500000000 + series_id,
+            'airsDayOfWeek': 'Monday',
+            'airsTime': '9:00 PM',
+            'rating': 'TV-14',
+            'imdbId': 'tt%07d' % series_id,
+            'zap2itId': 'EP%06d' % series_id,
+            'added': '2008-01-01 00:00:00',
+            'addedBy': 1,
+            'siteRating': 7.5,
+            'siteRatingCount': 100 + series_id,
+            'slug': 'series-%d' % series_id,
+        })
+
+    def episode(self, series_id, number, language=None):
+        season = (number - 1) // 20 + 1
+        return self.__translated(language, {
+            'id': series_id * 100000 + number,
+            'airedSeason': season,
+            'airedSeasonID': series_id * 1000 + season,
+            'airedEpisodeNumber': (number - 1) % 20 + 1,
+            'episodeName': 'Episode %d' % number if not language or language == 'en' else
+            'Episode %d (%s)' % (number, language),
+            'firstAired': '20%02d-%02d-%02d' % (season % 100, (number % 12) + 1, (number % 28) + 1),
+            'guestStars': [],
+            'director': 'Director %d' % (number % 5),
+            'directors': ['Director %d' % (number % 5)],
+            'writers': ['Writer %d' % (number % 3)],
+            'overview': 'Overview of episode %d of series %d.' % (number, series_id),
+            'language': {'episodeName': language or 'en', 'overview': language or 'en'},
+            'productionCode': '',
+            'showUrl': '',
+            'lastUpdated': 1500000000 + number,
+            'dvdDiscid': '',
+            'dvdSeason': season,
+            'dvdEpisodeNumber': (number - 1) % 20 + 1,
+            'dvdChapter': None,
+            'absoluteNumber': number,
+            'filename': 'episodes/%d/%d.jpg' % (series_id, series_id * 100000 + number),
+            'seriesId': series_id,
+            'lastUpdatedBy': 1,
+            'airsAfterSeason': None,
+            'airsBeforeSeason': None,
+            'airsBeforeEpisode': None,
+            'thumbAuthor': 1,
+            'thumbAdded': '',
+            'thumbWidth': '400',
+            'thumbHeight': '225',
+            'imdbId': 'tt%07d' % (series_id * 1000 + number),
+            'siteRating': 7.0,
+            'siteRatingCount': 10,
+        })
+
+    def __translated(self, language, item):
+        item = self.__padded(item)
+        if language in self.missing_translations:
+            item.update((key, [] if key == 'aliases' else None) for key in ('seriesName', 'aliases', 'overview',
+                                                                           'episodeName') if key in item)
+        return item
+
+    def __padded(self, item):
+        if self.payload_padding:
+            item['overview'] += (PADDING * (self.payload_padding // len(PADDING) + 1))[:self.payload_padding]
+        return item
+
+    def episodes(self, series_id, language=None):
+        return [self.episode(series_id, n, language) for n in range(1, self.episodes_per_series + 1)]
+
+    def actors(self, series_id):
+        return [{'id': series_id * 100 + n, 'seriesId': series_id, 'name': 'Actor %d' % n, 'role': 'Role %d' % n,
+                 'sortOrder': n, 'image': 'actors/%d.jpg' % (series_id * 100 + n), 'imageAuthor': 1,
+                 'imageAdded': '2010-01-01 00:00:00', 'lastUpdated': '2010-01-01 00:00:00'} for n in range(1, 11)]
+
+    def images(self, series_id):
+        images = list()
+        for key_type, resolutions, count in (('fanart', ('1920x1080', '1280x720'), 6),
+                                             ('poster', ('680x1000',), 4),
+                                             ('season', ('400x578',), 3),
+                                             ('series', ('758x140',), 2)):
+            for n in range(count):
+                image_id = series_id * 1000 + len(images)
+                images.append({'id': image_id, 'keyType': key_type, 'subKey': 'graphical' if key_type == 'series'
+                               else (str(n + 1) if key_type == 'season' else ''),
+                               'fileName': '%s/original/%d-%d.jpg' % (key_type, series_id, n),
+                               'resolution': resolutions[n % len(resolutions)],
+                               'ratingsInfo': {'average': (n * 7 % 10) + 0.5, 'count': n + 1},
+                               'thumbnail': '_cache/%s/original/%d-%d.jpg' % (key_type, series_id, n)})
+        return images
+
+    def artwork(self, file_name):
+        """
+        :return: the generated content of an artwork file: artwork_size bytes derived from its name.
+        """
+        seed = hashlib.sha256(file_name.encode('utf-8')).digest()
+        return (seed * (self.artwork_size // len(seed) + 1))[:self.artwork_size]
+
+    def updated(self, from_time, to_time):
+        """
+        Every series is considered updated once per day, at an offset derived from its id.
+        """
+        updates = list()
+        day = 24 * 3600
+        for series_id in range(1, self.series_count + 1):
+            offset = (series_id * 7919) % day
+            first = from_time - (from_time - offset) % day
+            if first < from_time:
+                first += day
+            stamp = first
+            while stamp <= to_time:
+                updates.append({'id': series_id, 'lastUpdated': stamp})
+                stamp += day
+        return updates
+
+
+class _StubRequestHandler(BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    ROUTES = (
+        ('POST', r'/login$', 'login'),
+        ('GET', r'/refresh_token$', 'refresh_token'),
+        ('GET', r'/search/series$', 'search_series'),
+        ('GET', r'/series/(\d+)$', 'series'),
+        ('GET', r'/series/(\d+)/actors$', 'series_actors'),
+        ('GET', r'/series/(\d+)/episodes$', 'series_episodes'),
+        ('GET', r'/series/(\d+)/episodes/query$', 'series_episodes'),
+        ('GET', r'/series/(\d+)/episodes/summary$', 'series_episodes_summary'),
+        ('GET', r'/series/(\d+)/images$', 'series_images'),
+        ('GET', r'/series/(\d+)/images/query$', 'series_images'),
+        ('GET', r'/episodes/(\d+)$', 'episode'),
+        ('GET', r'/languages$', 'languages'),
+        ('GET', r'/languages/(\d+)$', 'language'),
+        ('GET', r'/updated/query$', 'updated'),
+        ('GET', r'/user$', 'user'),
+        ('GET', r'/user/favorites$', 'user_favorites'),
+        ('PUT', r'/user/favorites/(\d+)$', 'add_user_favorite'),
+        ('DELETE', r'/user/favorites/(\d+)$', 'delete_user_favorite'),
+        ('GET', r'/user/ratings$', 'user_ratings'),
+        ('GET', r'/user/ratings/query$', 'user_ratings'),
+        ('PUT', r'/user/ratings/(\w+)/(\d+)/(\d+)$', 'add_user_rating'),
+        ('DELETE', r'/user/ratings/(\w+)/(\d+)$', 'delete_user_rating'),
+        ('GET', r'/banners/(.+)$', 'artwork'),
+    )
+
+    # The routes answered without a token: TheTVDB serves artwork files from a public host.
+    PUBLIC_ROUTES = ('login', 'artwork')
+
+    LANGUAGES = [{'id': 7, 'abbreviation': 'en', 'name': 'English', 'englishName': 'English'},
+                 {'id': 14, 'abbreviation': 'de', 'name': 'Deutsch', 'englishName': 'German'},
+                 {'id': 17, 'abbreviation': 'fr', 'name': 'Français', 'englishName': 'French'},
+                 {'id': 8, 'abbreviation': 'es', 'name': 'Español', 'englishName': 'Spanish'},
+                 {'id': 27, 'abbreviation': 'zh', 'name': '中文', 'englishName': 'Chinese'}]
+
+    @property
+    def stub(self):
+        return self.server.stub
+
+    def setup(self):
+        BaseHTTPRequestHandler.setup(self)
+        self.stub.record_connection()
+        if self.stub.handshake_latency:
+            time.sleep(self.stub.handshake_latency)
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.__dispatch('GET')
+
+    def do_POST(self):
+        self.__dispatch('POST')
+
+    def do_PUT(self):
+        self.__dispatch('PUT')
+
+    def do_DELETE(self):
+        self.__dispatch('DELETE')
+
+    def __dispatch(self, method):
+        split_url = urlsplit(self.path)
+        self.query = dict((k, v[-1]) for k, v in parse_qs(split_url.query).items())
+        length = int(self.headers.get('Content-Length') or 0)
+        self.body = self.rfile.read(length) if length else b''
+        self.language = self.headers.get('Accept-Language')
+
+        self.stub.record_request(method, self.path, self.headers)
+        self.stub.enter_request()
+        try:
+            self.__route(method, split_url.path)
+        finally:
+            self.stub.leave_request()
+
+    def __route(self, method, path):
+        if self.stub.latency:
+            time.sleep(self.stub.latency)
+
+        forced_failure = self.stub.pop_forced_failure() or self.stub.injected_failure(path)
+        if forced_failure:
+            status, retry_after = forced_failure
+            return self.send_json(status, {'Error': 'Forced failure'},
+                                  {'Retry-After': retry_after} if retry_after is not None else None)
+
+        for route_method, pattern, name in self.ROUTES:
+            match = re.match(pattern, path)
+            if route_method == method and match:
+                if name not in self.PUBLIC_ROUTES:
+                    if not self.__authorized():
+                        return self.send_json(401, {'Error': 'Not authorized'})
+                    retry_after = self.stub.key_limited(self.stub.api_key_of(self.__token()))
+                    if retry_after is not None:
+                        return self.send_json(429, {'Error': 'Too many requests'}, {'Retry-After': retry_after})
+                args = [int(a) if a.isdigit() else a for a in match.groups()]
+                return getattr(self, 'handle_%s' % name)(*args)
+
+        self.send_json(404, {'Error': 'Resource not found'})
+
+    def __token(self):
+        authorization = self.headers.get('Authorization') or ''
+        return authorization[len('Bearer '):] if authorization.startswith('Bearer ') else None
+
+    def __authorized(self):
+        token = self.__token()
+        return token is not None and self.stub.is_valid_token(token)
+
+    def send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode('utf-8')
+
+        if status == 200 and self.command == 'GET' and self.stub.validators:
+            etag = '"%s"' % hashlib.md5(body).hexdigest()
+            if self.headers.get('If-None-Match') == etag:
+                self.stub.not_modified += 1
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.end_headers()
+                return
+            self.send_response(status)
+            self.send_header('ETag', etag)
+            self.send_header('Last-Modified', self.stub.LAST_MODIFIED)
+        else:
+            self.send_response(status)
+
+        for name, value in (headers or {}).items():
+            self.send_header(name, str(value))
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self._headers_buffer.append(b'\r\n' + body)
+        self.flush_headers()
+
+    def send_not_found(self):
+        self.send_json(404, {'Error': 'Resource not found'})
+
+    # Handlers
+
+    def handle_login(self):
+        try:
+            auth = json.loads(self.body.decode('utf-8'))
+        except ValueError:
+            return self.send_json(400, {'Error': 'Invalid JSON'})
+        if (auth.get('username'), auth.get('apikey'), auth.get('userkey')) not in self.stub.credentials:
+            return self.send_json(401, {'Error': 'API Key Required'})
+        self.send_json(200, {'token': self.stub.issue_token(auth.get('apikey'))})
+
+    def handle_refresh_token(self):
+        self.send_json(200, {'token': self.stub.issue_token(self.stub.api_key_of(self.__token()))})
+
+    def handle_search_series(self):
+        name = self.query.get('name')
+        imdb_id = self.query.get('imdbId')
+        zap2it_id = self.query.get('zap2itId')
+        matches = list()
+        for series_id in range(1, self.stub.series_count + 1):
+            series = self.stub.series(series_id, self.language)
+            if (name and name.lower() in series['seriesName'].lower()) or \
+                    (imdb_id and imdb_id == series['imdbId']) or (zap2it_id and zap2it_id == series['zap2itId']):
+                matches.append(dict((k, series[k]) for k in ('aliases', 'banner', 'firstAired', 'id', 'network',
+                                                            'overview', 'seriesName', 'slug', 'status')))
+        if not matches:
+            return self.send_not_found()
+        self.send_json(200, {'data': matches})
+
+    def handle_series(self, series_id):
+        if not self.stub.series_exists(series_id):
+            return self.send_not_found()
+        self.send_json(200, {'data': self.stub.series(series_id, self.language), 'errors': {}})
+
+    def handle_series_actors(self, series_id):
+        if not self.stub.series_exists(series_id):
+            return self.send_not_found()
+        self.send_json(200, {'data': self.stub.actors(series_id), 'errors': {}})
+
+    def handle_series_episodes(self, series_id):
+        if not self.stub.series_exists(series_id):
+            return self.send_not_found()
+
+        filters = {'absoluteNumber': 'absoluteNumber', 'airedSeason': 'airedSeason',
+                   'airedEpisode': 'airedEpisodeNumber', 'dvdSeason': 'dvdSeason',
+                   'dvdEpisode': 'dvdEpisodeNumber', 'imdbId': 'imdbId'}
+        episodes = self.stub.episodes(series_id, self.language)
+        for parameter, field in filters.items():
+            if parameter in self.query:
+                episodes = [e for e in episodes if str(e[field]) == self.query[parameter]]
+
+        last = max(1, (len(episodes) + PAGE_SIZE - 1) // PAGE_SIZE)
+        page = int(self.query.get('page', 1))
+        if not episodes or page > last:
+            return self.send_not_found()
+
+        links = {'first': 1, 'last': last, 'next': page + 1 if page < last else None,
+                 'prev': page - 1 if page > 1 else None}
+        self.send_json(200, {'links': links, 'data': episodes[(page - 1) * PAGE_SIZE:page * PAGE_SIZE],
+                             'errors': {}})
+
+    def handle_series_episodes_summary(self, series_id):
+        if not self.stub.series_exists(series_id):
+            return self.send_not_found()
+        episodes = self.stub.episodes(series_id)
+        seasons = sorted(set(str(e['airedSeason']) for e in episodes), key=int)
+        self.send_json(200, {'data': {'airedSeasons': seasons, 'airedEpisodes': str(len(episodes)),
+                                      'dvdSeasons': seasons, 'dvdEpisodes': str(len(episodes))}})
+
+    def handle_series_images(self, series_id):
+        if not self.stub.series_exists(series_id):
+            return self.send_not_found()
+        images = self.stub.images(series_id)
+        for parameter in ('keyType', 'resolution', 'subKey'):
+            if parameter in self.query:
+                images = [i for i in images if i[parameter] == self.query[parameter]]
+        if not images:
+            return self.send_not_found()
+        self.send_json(200, {'data': images, 'errors': {}})
+
+    def handle_artwork(self, file_name):
+        if '_cache/' not in file_name and not re.match(r'\w+/original/\d+-\d+\.jpg$', file_name):
+            return self.send_not_found()
+
+        content = self.stub.artwork(file_name)
+        start = 0
+        byte_range = re.match(r'bytes=(\d+)-$', self.headers.get('Range') or '')
+        if byte_range:
+            start = int(byte_range.group(1))
+            if start >= len(content):
+                self.send_response(416)
+                self.send_header('Content-Range', 'bytes */%d' % len(content))
+                self.send_header('Content-Length', '0')
+                return self.end_headers()
+            self.send_response(206)
+            self.send_header('Content-Range', 'bytes %d-%d/%d' % (start, len(content) - 1, len(content)))
+        else:
+            self.send_response(200)
+
+        body = content[start:]
+        self.send_header('Content-Type', 'image/jpeg')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+
+        if self.stub.pop_truncation():
+            body = body[:len(body) // 2]
+            self.close_connection = True
+        self.wfile.write(body)
+        self.stub.record_artwork_bytes(len(body))
+
+    def handle_episode(self, episode_id):
+        series_id, number = divmod(episode_id, 100000)
+        if not self.stub.series_exists(series_id) or not 0 < number <= self.stub.episodes_per_series:
+            return self.send_not_found()
+        self.send_json(200, {'data': self.stub.episode(series_id, number, self.language), 'errors': {}})
+
+    def handle_languages(self):
+        self.send_json(200, {'data': self.LANGUAGES})
+
+    def handle_language(self, language_id):
+        for language in self.LANGUAGES:
+            if language['id'] == language_id:
+                return self.send_json(200, {'data': language})
+        self.send_not_found()
+
+    def handle_updated(self):
+        try:
+            from_time = int(self.query['fromTime'])
+            to_time = int(self.query.get('toTime') or from_time + 7 * 24 * 3600)
+        except (KeyError, ValueError):
+            return self.send_json(405, {'Error': 'fromTime is required'})
+        if to_time - from_time > 7 * 24 * 3600:
+            to_time = from_time + 7 * 24 * 3600
+        self.send_json(200, {'data': self.stub.updated(from_time, to_time)})
+
+    def handle_user(self):
+        self.send_json(200, {'data': {'userName': VALID_USERNAME, 'language': 'en', 'favoritesDisplaymode': 'banners'}})
+
+    def handle_user_favorites(self):
+        self.send_json(200, {'data': {'favorites': sorted(str(f) for f in self.stub.favorites)}})
+
+    def handle_add_user_favorite(self, series_id):
+        self.stub.favorites.add(series_id)
+        self.handle_user_favorites()
+
+    def handle_delete_user_favorite(self, series_id):
+        self.stub.favorites.discard(series_id)
+        self.handle_user_favorites()
+
+    def __ratings_payload(self, item_type=None):
+        return {'data': [{'ratingType': t, 'ratingItemId': i, 'rating': r}
+                         for (t, i), r in sorted(self.stub.ratings.items()) if not item_type or t == item_type]}
+
+    def handle_user_ratings(self):
+        self.send_json(200, self.__ratings_payload(self.query.get('itemType')))
+
+    def handle_add_user_rating(self, item_type, item_id, item_rating):
+        self.stub.ratings[(item_type, item_id)] = item_rating
+        self.send_json(200, self.__ratings_payload())
+
+    def handle_delete_user_rating(self, item_type, item_id):
+        self.stub.ratings.pop((item_type, item_id), None)
+        self.send_json(200, self.__ratings_payload())
@@ -0,0 +1,133 @@
+from unittest import TestCase
+from tvdb_client.artwork import ArtworkDownloader, ArtworkStore, select_images
+from tvdb_client.clients import ApiV2Client
+from tvdb_client.exceptions import RequestFailedException
+from tvdb_client.utils.requests_util import RetryPolicy
+from tvdb_client.tests.stub_server import StubTVDBServer, VALID_USERNAME, VALID_API_KEY, VALID_ACCOUNT_IDENTIFIER
+import hashlib
+import os
+import shutil
+import tempfile
+
+__author__ = 'tsantana'
+
+
+class ArtworkDownloaderTestCase(TestCase):
+
+    def setUp(self):
+        self.stub = StubTVDBServer(artwork_size=100000).start()
+        self.directory = tempfile.mkdtemp()
+        self.api = ApiV2Client(VALID_USERNAME, VALID_API_KEY, VALID_ACCOUNT_IDENTIFIER)
+        self.api.API_BASE_URL = self.stub.url
+        self.api.login()
+        self.store = ArtworkStore(self.directory)
+        self.downloader = ArtworkDownloader(self.api, self.store, base_url=self.stub.url + '/banners',
+                                            retry_policy=RetryPolicy(retries=3, backoff_factor=0.001), chunk_size=8192)
+
+    def tearDown(self):
+        self.downloader.close()
+        self.store.close()
+        self.api.close()
+        self.stub.stop()
+        shutil.rmtree(self.directory)
+
+    def __assert_stored(self, report):
+        for file_name, path in report.paths.items():
+            with open(path, 'rb') as f:
+                content = f.read()
+            self.assertEqual(self.stub.artwork(file_name), content)
+            self.assertEqual(hashlib.sha256(content).hexdigest(), os.path.basename(path))
+
+    def test_001_select_images(self):
+        images = self.stub.images(1)
+
+        self.assertEqual(6, len(select_images(images, key_type='fanart')))
+        self.assertEqual(3, len(select_images(images, key_type='fanart', resolution='1920x1080')))
+        self.assertEqual(['1'], [image['subKey'] for image in select_images(images, key_type='season', sub_key=1)])
+
+        best = select_images(images, key_type='fanart', best_rated=2)
+        self.assertEqual([8.5, 7.5], [image['ratingsInfo']['average'] for image in best])
+        # One per type and sub key: 1 fanart, 1 poster, 3 seasons and 1 series.
+        self.assertEqual(6, len(select_images(images, best_rated=1)))
+
+    def test_002_download_series(self):
+        report = self.downloader.download_series([1, 2], key_type='poster')
+
+        self.assertTrue(report.complete)
+        self.assertEqual(8, report.downloaded)
+        self.assertEqual(800000, report.bytes)
+        self.assertTrue(report.files_per_second > 0 and report.bytes_per_second > 0)
+        self.assertEqual(8, len(self.store))
+        self.__assert_stored(report)
+
+        # Re-runs skip the files stored already.
+        report = self.downloader.download_series([1, 2], key_type='poster')
+        self.assertEqual((0, 8, 0), (report.downloaded, report.skipped, report.bytes))
+        self.assertEqual(8, len(report.paths))
+
+    def test_003_thumbnails_and_best_rated(self):
+        report = self.downloader.download_series(1, key_type='fanart', best_rated=1, thumbnails=True)
+
+        self.assertEqual(1, report.downloaded)
+        self.assertEqual(['_cache/fanart/original/1-4.jpg'], list(report.paths))
+        self.__assert_stored(report)
+
+    def test_004_interrupted_downloads_resume(self):
+        self.stub.truncate_next_artwork(2)
+        report = self.downloader.download_series(1, key_type='poster')
+
+        self.assertTrue(report.complete)
+        self.assertEqual((4, 2), (report.downloaded, report.resumed))
+        # Only the missing parts were downloaded again, rather than the whole files.
+        self.assertEqual(400000, report.bytes)
+        self.assertTrue(self.stub.artwork_bytes < 500000)
+        self.assertEqual(2, len([headers for _, _, headers in self.stub.request_log if 'Range' in headers]))
+        self.assertEqual([], os.listdir(os.path.join(self.directory, 'partial')))
+        self.__assert_stored(report)
+
+    def test_005_content_addressed(self):
+        report = self.downloader.download_series(1, key_type='poster')
+        path = self.store.object_path(hashlib.sha256(self.stub.artwork('poster/original/1-0.jpg')).hexdigest())
+        shutil.copy(path, os.path.join(self.directory, 'copy'))
+        self.store.put('poster/copy-of-1-0.jpg', os.path.join(self.directory, 'copy'))
+
+        self.assertEqual(path, self.store.get('poster/copy-of-1-0.jpg'))
+        self.assertEqual({'files': 5, 'objects': 4, 'bytes': 400000}, self.store.stats())
+        self.assertEqual(4, report.downloaded)
+
+    def test_006_failures(self):
+        report = self.downloader.download([{'fileName': 'missing.jpg'}, {'fileName': 'poster/original/1-0.jpg'}])
+
+        self.assertEqual(1, report.downloaded)
+        self.assertEqual(['missing.jpg'], list(report.failures))
+        self.assertEqual(['poster/original/1-0.jpg'], list(report.paths))
+        self.assertEqual([], select_images([], key_type='poster'))
+        self.assertEqual([], self.downloader.series_images(1, key_type='unknown'))
+
+        self.stub.fail_next(400)
+        self.assertRaises(RequestFailedException, self.downloader.series_images, 2)
+
+    def test_007_interrupted_responses_are_closed(self):
+        responses = list()
+        transport = self.downloader.transport
+
+        class _Recorder(object):
+
+            def request(self, *args, **kwargs):
+                response = transport.request(*args, **kwargs)
+                closed = list()
+                response.close = lambda close=response.close: (closed.append(True), close())
+                responses.append(closed)
+                return response
+
+            def close(self):
+                transport.close()
+
+        self.downloader.transport = _Recorder()
+        self.stub.truncate_next_artwork(2)
+        report = self.downloader.download_series(1, key_type='poster')
+
+        # The truncated transfers are closed before being resumed, so their connections go back to the pool.
+        self.assertTrue(report.complete)
+        self.assertEqual(6, len(responses))
+        self.assertTrue(all(responses))
@@ -0,0 +1,48 @@
+from unittest import TestCase
+from datetime import datetime, timedelta
+from tvdb_client.clients import AsyncApiV2Client
+from tvdb_client.exceptions import UserNotLoggedInException
+from tvdb_client.tests.stub_server import StubTVDBServer, VALID_USERNAME, VALID_API_KEY, VALID_ACCOUNT_IDENTIFIER
+import asyncio
+
+__author__ = 'tsantana'
+
+
+class AsyncClientTestCase(TestCase):
+
+    def setUp(self):
+        self.stub = StubTVDBServer(latency=0.02).start()
+        self.api = AsyncApiV2Client(VALID_USERNAME, VALID_API_KEY, VALID_ACCOUNT_IDENTIFIER, max_concurrency=4)
+        self.api.client.API_BASE_URL = self.stub.url
+
+    def tearDown(self):
+        self.api.close()
+        self.stub.stop()
+
+    def test_001_gather_is_bounded_by_max_concurrency(self):
+
+        async def refresh():
+            await self.api.login()
+            return await asyncio.gather(*[self.api.get_series(series_id) for series_id in range(1, 21)])
+
+        results = asyncio.run(refresh())
+
+        self.assertEqual(list(range(1, 21)), [r['data']['id'] for r in results])
+        self.assertGreater(self.stub.max_in_flight, 1)
+        self.assertLessEqual(self.stub.max_in_flight, 4)
+
+    def test_002_expired_token_is_renewed_once(self):
+
+        async def refresh():
+            await self.api.login()
+            self.api.client._ApiV2Client__auth_time = datetime.now() - timedelta(hours=23, minutes=1)
+            return await asyncio.gather(*[self.api.get_series_actors(series_id) for series_id in range(1, 11)])
+
+        results = asyncio.run(refresh())
+
+        self.assertTrue(all('data' in r for r in results))
+        refreshes = [path for method, path, headers in self.stub.request_log if path == '/refresh_token']
+        self.assertEqual(1, len(refreshes))
+
+    def test_003_not_logged_in(self):
+        self.assertRaises(UserNotLoggedInException, asyncio.run, self.api.get_series(1))
@@ -0,0 +1,100 @@
+from unittest import TestCase
+from tvdb_client.clients import ApiV2Client, AsyncApiV2Client
+from tvdb_client.exceptions import BatchTimeoutException, UserNotLoggedInException
+from tvdb_client.tests.stub_server import StubTVDBServer, VALID_USERNAME, VALID_API_KEY, VALID_ACCOUNT_IDENTIFIER
+import asyncio
+import time
+
+__author__ = 'tsantana'
+
+
+class BulkFetchTestCase(TestCase):
+
+    def setUp(self):
+        self.stub = StubTVDBServer(series_count=50, latency=0.02).start()
+        self.api = ApiV2Client(VALID_USERNAME, VALID_API_KEY, VALID_ACCOUNT_IDENTIFIER)
+        self.api.API_BASE_URL = self.stub.url
+
+    def tearDown(self):
+        self.api.close()
+        self.stub.stop()
+
+    def test_001_get_series_many(self):
+        self.api.login()
+        self.stub.reset_counters()
+
+        results = dict(self.api.get_series_many([3, 1, 2, 3, 1] + list(range(4, 41)), max_workers=4))
+
+        self.assertEqual(set(range(1, 41)), set(results))
+        self.assertTrue(all(results[series_id]['data']['id'] == series_id for series_id in results))
+        self.assertEqual(40, self.stub.requests)
+        self.assertGreater(self.stub.max_in_flight, 1)
+        self.assertLessEqual(self.stub.max_in_flight, 4)
+
+    def test_002_errors_are_reported_per_item(self):
+        self.api.login()
+
+        results = dict(self.api.get_series_many(iter([1, 999, 2])))
+
+        self.assertEqual(1, results[1]['data']['id'])
+        self.assertEqual(2, results[2]['data']['id'])
+        self.assertEqual(404, results[999]['code'])
+
+    def test_003_get_episodes_many(self):
+        self.api.login()
+
+        results = dict(self.api.get_episodes_many([100001, 200002]))
+
+        self.assertEqual({100001, 200002}, set(results))
+        self.assertEqual(200002, results[200002]['data']['id'])
+
+    def test_004_batch_timeout(self):
+        self.stub.latency = 0.3
+        self.api.login()
+
+        results = list(self.api.get_series_many(range(1, 21), max_workers=2, timeout=0.1))
+
+        self.assertEqual(set(range(1, 21)), set(series_id for series_id, result in results))
+        self.assertTrue(all(isinstance(result, BatchTimeoutException) for series_id, result in results))
+        time.sleep(self.stub.latency)  # Lets the abandoned requests complete before the stub is stopped
+
+    def test_005_not_logged_in(self):
+        self.assertRaises(UserNotLoggedInException, self.api.get_series_many, [1])
+
+
+class AsyncBulkFetchTestCase(TestCase):
+
+    def setUp(self):
+        self.stub = StubTVDBServer(series_count=50, latency=0.02).start()
+        self.api = AsyncApiV2Client(VALID_USERNAME, VALID_API_KEY, VALID_ACCOUNT_IDENTIFIER, max_concurrency=4)
+        self.api.client.API_BASE_URL = self.stub.url
+
+    def tearDown(self):
+        self.api.close()
+        self.stub.stop()
+
+    def test_001_get_series_many(self):
+
+        async def refresh():
+            await self.api.login()
+            return [item async for item in self.api.get_series_many([1, 2, 2, 999] + list(range(3, 21)))]
+
+        results = dict(asyncio.run(refresh()))
+
+        self.assertEqual(set(range(1, 21)) | {999}, set(results))
+        self.assertEqual(404, results[999]['code'])
+        self.assertEqual(7, results[7]['data']['id'])
+        self.assertLessEqual(self.stub.max_in_flight, 4)
+
+    def test_002_batch_timeout(self):
+        self.stub.latency = 0.3
+
+        async def refresh():
+            await self.api.login()
+            return [item async for item in self.api.get_episodes_many([100001, 100002], timeout=0.1)]
+
+        results = asyncio.run(refresh())
+
+        self.assertEqual({100001, 100002}, set(episode_id for episode_id, result in results))
+        self.assertTrue(all(isinstance(result, BatchTimeoutException) for episode_id, result in results))
+        time.sleep(self.stub.latency)  # Lets the abandoned requests complete before the stub is stopped
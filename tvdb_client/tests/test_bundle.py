@@ -0,0 +1,91 @@
+from unittest import TestCase
+from tvdb_client.clients import ApiV2Client, AsyncApiV2Client
+from tvdb_client.tests.stub_server import StubTVDBServer, VALID_USERNAME, VALID_API_KEY, VALID_ACCOUNT_IDENTIFIER
+import asyncio
+import time
+
+__author__ = 'tsantana'
+
+
+class SeriesBundleTestCase(TestCase):
+
+    def setUp(self):
+        self.stub = StubTVDBServer(latency=0.05).start()
+        self.api = ApiV2Client(VALID_USERNAME, VALID_API_KEY, VALID_ACCOUNT_IDENTIFIER)
+        self.api.API_BASE_URL = self.stub.url
+        self.api.login()
+
+    def tearDown(self):
+        self.api.close()
+        self.stub.stop()
+
+    def test_001_bundle(self):
+        start = time.time()
+        bundle = self.api.get_series_bundle(1)
+        elapsed = time.time() - start
+
+        data = bundle['data']
+        self.assertEqual({}, bundle['errors'])
+        self.assertEqual(1, data['series']['id'])
+        self.assertEqual(10, len(data['actors']))
+        self.assertEqual('250', data['episodes_summary']['airedEpisodes'])
+        self.assertEqual(list(range(1, 251)), [episode['absoluteNumber'] for episode in data['episodes']])
+        self.assertEqual({'fanart': 6, 'poster': 4, 'season': 3, 'seasonwide': 0, 'series': 2},
+                         dict((image_type, len(images)) for image_type, images in data['images'].items()))
+        # 11 requests of 50ms: the first page of episodes, then the two others.
+        self.assertTrue(elapsed < 0.3, elapsed)
+
+    def test_002_include_and_episode_details(self):
+        self.api.get_series_episodes = lambda series_id, page: {'links': {'last': 1}, 'data': [
+            {'id': 100001, 'absoluteNumber': 1}, {'id': 100099999, 'absoluteNumber': 2}]}
+
+        bundle = self.api.get_series_bundle(1, include=('episodes',), episode_details=True)
+
+        self.assertEqual(['episodes'], list(bundle['data']))
+        self.assertEqual(['Director 1', None], [episode.get('director') for episode in bundle['data']['episodes']])
+        self.assertEqual([100099999], list(bundle['errors']['episode_details']))
+        self.assertRaises(ValueError, self.api.get_series_bundle, 1, include=('trailers',))
+
+    def test_003_partial_failures(self):
+        def fail(series_id):
+            raise ValueError('Connection reset')
+
+        self.api.get_series_actors = fail
+        self.api.get_series_episodes_summary = lambda series_id: {'code': 503, 'message': 'Unavailable'}
+
+        bundle = self.api.get_series_bundle(1, include=('series', 'actors', 'episodes_summary'))
+
+        self.assertEqual(['series'], list(bundle['data']))
+        self.assertEqual('Connection reset', bundle['errors']['actors']['message'])
+        self.assertEqual(503, bundle['errors']['episodes_summary']['code'])
+        self.assertEqual(404, self.api.get_series_bundle(10 ** 6)['code'])
+
+    def test_004_timeout(self):
+        bundle = self.api.get_series_bundle(1, include=('series', 'episodes'), timeout=0.01)
+
+        self.assertEqual(None, bundle['code'])
+        self.assertIn('timed out', bundle['message'])
+        time.sleep(self.stub.latency)
+
+    def test_005_models(self):
+        api = ApiV2Client(VALID_USERNAME, VALID_API_KEY, VALID_ACCOUNT_IDENTIFIER, models=True)
+        api.API_BASE_URL = self.stub.url
+        api.login()
+        self.addCleanup(api.close)
+
+        bundle = api.get_series_bundle(3, include=('series', 'episodes'), episode_details=True)
+
+        self.assertEqual({}, bundle['errors'])
+        self.assertEqual('Series 3', bundle['data']['series'].series_name)
+        self.assertEqual(list(range(1, 251)), [episode.absolute_number for episode in bundle['data']['episodes']])
+        # The episodes listed by the pages are replaced by their details.
+        self.assertEqual(['Director 1', 'Director 2'], [episode.director for episode in bundle['data']['episodes'][:2]])
+
+    def test_006_async(self):
+        async def bundle():
+            async with AsyncApiV2Client(VALID_USERNAME, VALID_API_KEY, VALID_ACCOUNT_IDENTIFIER) as api:
+                api.client.API_BASE_URL = self.stub.url
+                await api.login()
+                return await api.get_series_bundle(2, include=('series', 'actors'))
+
+        self.assertEqual(['actors', 'series'], sorted(asyncio.run(bundle())['data']))
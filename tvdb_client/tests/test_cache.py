@@ -0,0 +1,165 @@
+from unittest import TestCase
+from tvdb_client.clients import ApiV2Client
+from tvdb_client.utils.cache import MemoryCache, SQLiteCache
+from tvdb_client.tests.stub_server import StubTVDBServer, VALID_USERNAME, VALID_API_KEY, VALID_ACCOUNT_IDENTIFIER
+import os
+import shutil
+import tempfile
+import time
+
+__author__ = 'tsantana'
+
+
+class CacheBackendTestCase(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def __check_lru(self, cache):
+        cache.set('a', {'v': 1}, 60)
+        cache.set('b', {'v': 2}, 60)
+        cache.get('a')
+        cache.set('c', {'v': 3}, 60)
+
+        self.assertEqual({'v': 1}, cache.get('a'))
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual({'v': 3}, cache.get('c'))
+        self.assertEqual({'hits': 3, 'misses': 1, 'evictions': 1, 'entries': 2}, cache.stats())
+
+    def __check_expiration(self, cache):
+        cache.set('a', {'v': 1}, 0.01)
+        time.sleep(0.02)
+
+        self.assertIsNone(cache.get('a'))
+
+    def __check_delete_prefix(self, cache):
+        for key in ('GET /series/1 ', 'GET /series/1/actors en', 'GET /series/12 ', 'GET /series/2 '):
+            cache.set(key, {'key': key}, 60)
+
+        self.assertEqual(2, cache.delete_prefix('GET /series/1 ') + cache.delete_prefix('GET /series/1/'))
+        self.assertEqual(2, len(cache))
+        self.assertIsNotNone(cache.get('GET /series/12 '))
+
+    def test_001_memory_lru(self):
+        self.__check_lru(MemoryCache(max_entries=2))
+
+    def test_002_memory_expiration(self):
+        self.__check_expiration(MemoryCache())
+
+    def test_003_sqlite_lru(self):
+        self.__check_lru(SQLiteCache(os.path.join(self.directory, 'cache.db'), max_entries=2))
+
+    def test_004_sqlite_expiration(self):
+        self.__check_expiration(SQLiteCache(os.path.join(self.directory, 'cache.db')))
+
+    def test_005_delete_prefix(self):
+        self.__check_delete_prefix(MemoryCache())
+        self.__check_delete_prefix(SQLiteCache(os.path.join(self.directory, 'cache.db')))
+
+    def test_006_sqlite_survives_restart(self):
+        path = os.path.join(self.directory, 'cache.db')
+        cache = SQLiteCache(path, max_entries=2)
+        cache.set('a', {'v': 1}, 60)
+        cache.set('b', {'v': 2}, 60)
+        cache.get('a')
+        cache.close()
+
+        cache = SQLiteCache(path, max_entries=2)
+        cache.set('c', {'v': 3}, 60)
+
+        self.assertEqual(2, len(cache))
+        self.assertEqual({'v': 1}, cache.get('a'))
+        self.assertIsNone(cache.get('b'))
+
+
+class ClientCacheTestCase(TestCase):
+
+    def setUp(self):
+        self.stub = StubTVDBServer().start()
+
+    def tearDown(self):
+        self.stub.stop()
+
+    def __make_client(self, language=None, **kwargs):
+        api = ApiV2Client(VALID_USERNAME, VALID_API_KEY, VALID_ACCOUNT_IDENTIFIER, language, **kwargs)
+        api.API_BASE_URL = self.stub.url
+        api.login()
+        self.stub.reset_counters()
+        return api
+
+    def test_001_read_endpoints_are_cached(self):
+        api = self.__make_client(cache=MemoryCache())
+
+        for _ in range(3):
+            self.assertEqual(1, api.get_series(1)['data']['id'])
+            self.assertEqual(10, len(api.get_series_actors(1)['data']))
+            self.assertEqual(5, len(api.get_languages()['data']))
+
+        self.assertEqual(3, self.stub.requests)
+        self.assertEqual(6, api.cache.hits)
+        self.assertEqual(3, api.cache.misses)
+
+    def test_002_uncached_endpoints_and_errors(self):
+        api = self.__make_client(cache=MemoryCache(), cache_ttls={'/series/{id}/actors': 0})
+
+        api.get_series_actors(1)
+        api.get_series_actors(1)
+        api.get_episode(100001)
+        api.get_episode(100001)
+        api.get_series(self.stub.series_count + 1)
+        api.get_series(self.stub.series_count + 1)
+
+        self.assertEqual(6, self.stub.requests)
+
+    def test_003_cache_is_partitioned_by_language(self):
+        cache = MemoryCache()
+        english = self.__make_client('en', cache=cache)
+        german = self.__make_client('de', cache=cache)
+
+        self.assertEqual('Series 1', english.get_series(1)['data']['seriesName'])
+        self.assertEqual('Series 1 (de)', german.get_series(1)['data']['seriesName'])
+        self.assertEqual('Series 1', english.get_series(1)['data']['seriesName'])
+        self.assertEqual(2, self.stub.requests)
+
+
+class RevalidationTestCase(TestCase):
+
+    def setUp(self):
+        self.stub = StubTVDBServer().start()
+        self.api = ApiV2Client(VALID_USERNAME, VALID_API_KEY, VALID_ACCOUNT_IDENTIFIER, cache=MemoryCache(),
+                               cache_ttls={'/series/{id}/episodes': 0.05, '/series/{id}/images': 0.05})
+        self.api.API_BASE_URL = self.stub.url
+        self.api.login()
+        self.stub.reset_counters()
+
+    def tearDown(self):
+        self.api.close()
+        self.stub.stop()
+
+    def test_001_expired_entries_are_revalidated(self):
+        first = self.api.get_series_episodes(1)
+        time.sleep(0.06)
+        second = self.api.get_series_episodes(1)
+
+        self.assertIs(first, second)
+        self.assertEqual(1, self.stub.not_modified)
+        self.assertEqual('"', self.stub.request_log[-1][2]['If-None-Match'][0])
+
+        stats = self.api.revalidation_stats['/series/{id}/episodes']
+        self.assertEqual(1, stats['revalidated'])
+        self.assertGreater(stats['bytes_saved'], 10000)
+
+        self.api.get_series_episodes(1)
+        self.assertEqual(2, self.stub.requests)
+
+    def test_002_changed_entries_are_downloaded(self):
+        self.api.get_series_images(1)
+        self.stub.validators = False
+        time.sleep(0.06)
+        self.api.get_series_images(1)
+
+        self.assertEqual(0, self.stub.not_modified)
+        self.assertEqual({}, self.api.revalidation_stats)
@@ -0,0 +1,98 @@
+from unittest import TestCase
+from tvdb_client.clients import ApiV2Client
+from tvdb_client.exceptions import CassetteMissException
+from tvdb_client.utils.cache import MemoryCache
+from tvdb_client.utils.cassette import CassetteTransport, cassette_key, RECORD, REPLAY, AUTO
+from tvdb_client.tests.stub_server import StubTVDBServer, VALID_USERNAME, VALID_API_KEY, VALID_ACCOUNT_IDENTIFIER
+import os
+import shutil
+import tempfile
+import time
+
+__author__ = 'tsantana'
+
+
+class CassetteKeyTestCase(TestCase):
+
+    def test_001_normalization(self):
+        self.assertEqual(cassette_key('get', 'https://API.thetvdb.com/series/1/episodes/query?page=2&airedSeason=1'),
+                         cassette_key('GET', 'https://api.thetvdb.com/series/1/episodes/query',
+                                      data={'airedSeason': 1, 'page': 2}, headers={'Authorization': 'Bearer x'}))
+        self.assertNotEqual(cassette_key('get', 'https://api.thetvdb.com/series/1'),
+                            cassette_key('get', 'https://api.thetvdb.com/series/1', headers={'Accept-Language': 'de'}))
+        self.assertNotEqual(cassette_key('get', 'https://api.thetvdb.com/series/1'),
+                            cassette_key('get', 'https://api.thetvdb.com/series/1', headers={'If-None-Match': '"1"'}))
+
+    def test_002_bodies(self):
+        self.assertNotEqual(cassette_key('put', 'https://api.thetvdb.com/user/favorites/1', data='{"a": 1}'),
+                            cassette_key('put', 'https://api.thetvdb.com/user/favorites/1', data='{"a": 2}'))
+        self.assertEqual(cassette_key('post', 'https://api.thetvdb.com/login', data='{"apikey": "1"}'),
+                         cassette_key('post', 'https://api.thetvdb.com/login', data='{"apikey": "2"}'))
+
+
+class CassetteTransportTestCase(TestCase):
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, 'crawl.cassette')
+        self.stub = StubTVDBServer().start()
+        self.addCleanup(self.stub.stop)
+
+    def __client(self, mode, **kwargs):
+        transport = CassetteTransport(self.path, mode=mode)
+        api = ApiV2Client(VALID_USERNAME, VALID_API_KEY, VALID_ACCOUNT_IDENTIFIER, transport=transport, **kwargs)
+        api.API_BASE_URL = self.stub.url
+        api.login()
+        return api
+
+    def __crawl(self, api):
+        return [api.get_series(1), api.get_series_episodes(1, page=2), api.get_series(10 ** 6),
+                [update for update in api.get_updated(1500000000, 1500000000 + 3600, stream=True)]]
+
+    def test_001_record_and_replay(self):
+        api = self.__client(RECORD)
+        recorded = self.__crawl(api)
+        api.close()
+        requests = self.stub.requests
+
+        api = self.__client(REPLAY)
+        replayed = self.__crawl(api)
+
+        self.assertEqual(recorded, replayed)
+        self.assertEqual(404, replayed[2]['code'])
+        self.assertEqual(requests, self.stub.requests)
+        self.assertEqual({'hits': 5, 'misses': 0, 'recorded': 0}, api.transport.stats())
+        self.assertEqual(5, len(api.transport))
+
+        self.assertRaises(CassetteMissException, api.get_series, 2)
+        api.close()
+
+    def test_002_auto(self):
+        api = self.__client(AUTO)
+        api.get_series(1)
+        api.get_series(1)
+        api.get_series(2)
+
+        self.assertEqual({'hits': 1, 'misses': 3, 'recorded': 3}, api.transport.stats())
+        self.assertEqual(3, self.stub.requests)
+        api.close()
+
+    def test_003_invalid_mode(self):
+        self.assertRaises(ValueError, CassetteTransport, self.path, mode='rewind')
+
+    def test_004_revalidations(self):
+        api = self.__client(RECORD, cache=MemoryCache(), cache_ttls={'/series/{id}': 0.05})
+        recorded = api.get_series(1)
+        time.sleep(0.1)
+        self.assertEqual(recorded, api.get_series(1))
+        self.assertEqual(1, api.revalidation_stats['/series/{id}']['revalidated'])
+        api.close()
+
+        # The 304 answered to the revalidation is recorded apart, and replayed to a client revalidating as well.
+        api = self.__client(REPLAY, cache=MemoryCache(), cache_ttls={'/series/{id}': 0.05})
+        self.assertEqual(recorded, api.get_series(1))
+        time.sleep(0.1)
+        self.assertEqual(recorded, api.get_series(1))
+        self.assertEqual({'hits': 3, 'misses': 0, 'recorded': 0}, api.transport.stats())
+        api.close()
@@ -0,0 +1,308 @@
+from unittest import TestCase, skipUnless
+from tvdb_client.clients import ApiV2Client
+from tvdb_client.crawl import CrawlCoordinator, CrawlWorker, RedisBackend, SQLiteBackend, SharedRateLimiter, \
+    SharedToken, shard_of
+from tvdb_client.tests.stub_server import StubTVDBServer, VALID_USERNAME, VALID_API_KEY, VALID_ACCOUNT_IDENTIFIER
+import importlib.util
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+__author__ = 'tsantana'
+
+DAY = 24 * 3600
+START = 1600000000
+REDIS_URL = os.environ.get('TVDB_CLIENT_REDIS_URL')
+
+
+def make_client(url, backend, rate=None):
+    api = ApiV2Client(VALID_USERNAME, VALID_API_KEY, VALID_ACCOUNT_IDENTIFIER, cache=backend.cache(),
+                      token_store=SharedToken(backend),
+                      rate_limiter=SharedRateLimiter(backend, rate) if rate is not None else None)
+    api.API_BASE_URL = url
+    api.login()
+    return api
+
+
+def crawl_process(url, path, rate, results):
+    """
+    The worker process of test_006: plans the crawl, as every node does, and processes tasks until none is left.
+    """
+    backend = SQLiteBackend(path)
+    CrawlCoordinator(backend).add_series(range(1, 61), shards=6)
+    api = make_client(url, backend, rate)
+
+    handled = list()
+    report = CrawlWorker(api, backend, lambda series_id, series, episodes: handled.append(series_id),
+                         max_workers=4).run(poll_interval=0.05)
+    results.put((os.getpid(), handled, report.completed))
+    api.close()
+    backend.close()
+
+
+class _Mirror(object):
+
+    def __init__(self, fail_on=()):
+        self.fail_on = set(fail_on)
+        self.series = dict()
+        self.lock = threading.Lock()
+
+    def __call__(self, series_id, series, episodes):
+        if series_id in self.fail_on:
+            raise RuntimeError('Mirror is down')
+        with self.lock:
+            self.series[series_id] = (series['data']['seriesName'], len(episodes) if episodes is not None else None)
+
+
+class _BackendTests(object):
+    """
+    The behavior every crawl backend must have.
+    """
+
+    def make_backend(self):
+        raise NotImplementedError()
+
+    def setUp(self):
+        self.backend = self.make_backend()
+        self.coordinator = CrawlCoordinator(self.backend)
+
+    def tearDown(self):
+        self.backend.close()
+
+    def test_001_plans_are_idempotent(self):
+        self.assertEqual(8, self.coordinator.add_series(range(1, 101), shards=8))
+        self.assertEqual(0, self.coordinator.add_series(range(1, 101), shards=8))
+        self.assertEqual(2, self.coordinator.add_updates(START, START + 10 * DAY))
+        self.assertEqual({'pending': 10, 'running': 0, 'done': 0, 'failed': 0}, self.coordinator.progress())
+
+        series_ids = list()
+        while True:
+            task = self.backend.claim('worker', 60)
+            if task is None:
+                break
+            series_ids.extend(task.payload.get('series_ids', []))
+            if 'series_ids' in task.payload:
+                self.assertEqual(set([int(task.name.split('-')[1])]),
+                                 set(shard_of(series_id, 8) for series_id in task.payload['series_ids']))
+
+        self.assertEqual(list(range(1, 101)), sorted(series_ids))
+        self.assertEqual(10, self.coordinator.progress()['running'])
+
+    def test_002_leases(self):
+        self.coordinator.add_series([1, 2, 3], shards=1)
+
+        task = self.backend.claim('a', 0.2)
+        self.assertEqual((0, [1, 2, 3]), (task.attempts, task.payload['series_ids']))
+        self.assertIsNone(self.backend.claim('b', 60))
+        self.assertTrue(self.backend.renew(task.name, 'a', 0.2))
+        self.backend.mark_done(task.name, 1)
+
+        # The lease of a crashed worker expires, and another worker takes the task over.
+        time.sleep(0.25)
+        self.assertEqual(task.name, self.backend.claim('b', 60).name)
+        self.assertEqual({1}, self.backend.done_items(task.name))
+        self.assertFalse(self.backend.renew(task.name, 'a', 60))
+        self.assertFalse(self.backend.complete(task.name, 'a'))
+
+        self.assertTrue(self.backend.release(task.name, 'b', 'Timeout', max_attempts=2))
+        self.assertEqual(1, self.backend.claim('b', 60).attempts)
+        self.assertTrue(self.backend.release(task.name, 'b', 'Timeout', max_attempts=2))
+        self.assertEqual({task.name: 'Timeout'}, self.backend.failures())
+        self.assertIsNone(self.backend.claim('b', 60))
+
+        self.coordinator.add_series([4], shards=1, name='more')
+        task = self.backend.claim('b', 60)
+        self.assertTrue(self.backend.complete(task.name, 'b'))
+        self.assertEqual({'pending': 0, 'running': 0, 'done': 1, 'failed': 1}, self.coordinator.progress())
+        self.assertTrue(self.coordinator.is_complete())
+
+    def test_003_values_locks_and_buckets(self):
+        self.assertIsNone(self.backend.get_value('token'))
+        self.backend.set_value('token', 'abc', ttl=0.1)
+        self.assertEqual('abc', self.backend.get_value('token'))
+        time.sleep(0.15)
+        self.assertIsNone(self.backend.get_value('token'))
+
+        self.assertTrue(self.backend.acquire_lock('login', 'a', 0.1))
+        self.assertFalse(self.backend.acquire_lock('login', 'b', 0.1))
+        self.backend.release_lock('login', 'b')
+        self.assertFalse(self.backend.acquire_lock('login', 'b', 0.1))
+        time.sleep(0.15)
+        self.assertTrue(self.backend.acquire_lock('login', 'b', 0.1))
+
+        self.assertEqual([0, 0], [self.backend.take_token('rate', 10, 2) for _ in range(2)])
+        self.assertAlmostEqual(0.1, self.backend.take_token('rate', 10, 2), delta=0.02)
+        self.backend.pause_bucket('rate', 1)
+        self.assertAlmostEqual(1, self.backend.take_token('rate', 10, 2), delta=0.02)
+
+
+class SQLiteBackendTestCase(_BackendTests, TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        super(SQLiteBackendTestCase, self).setUp()
+
+    def tearDown(self):
+        super(SQLiteBackendTestCase, self).tearDown()
+        shutil.rmtree(self.directory)
+
+    def make_backend(self):
+        return SQLiteBackend(os.path.join(self.directory, 'crawl.db'))
+
+
+@skipUnless(REDIS_URL and importlib.util.find_spec('redis'), 'TVDB_CLIENT_REDIS_URL is not set or redis is missing')
+class RedisBackendTestCase(_BackendTests, TestCase):
+
+    def make_backend(self):
+        backend = RedisBackend(REDIS_URL, prefix='tvdb_client:test:%d:' % os.getpid())
+        for key in backend.client.scan_iter(match=backend.prefix + '*'):
+            backend.client.delete(key)
+        return backend
+
+
+class CrawlWorkerTestCase(TestCase):
+
+    def setUp(self):
+        self.stub = StubTVDBServer(series_count=60, episodes_per_series=120).start()
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'crawl.db')
+        self.backend = SQLiteBackend(self.path)
+        self.coordinator = CrawlCoordinator(self.backend)
+
+    def tearDown(self):
+        self.backend.close()
+        self.stub.stop()
+        shutil.rmtree(self.directory)
+
+    def __logins(self):
+        return len([path for _, path, _ in self.stub.request_log if path == '/login'])
+
+    def test_001_series_shards(self):
+        api = make_client(self.stub.url, self.backend)
+        mirror = _Mirror()
+        self.coordinator.add_series(range(1, 21), shards=4)
+
+        report = CrawlWorker(api, self.backend, mirror, include_episodes=True, max_workers=4).run()
+
+        self.assertEqual((4, 4, 20), (report.claimed, report.completed, report.series_synced))
+        self.assertEqual(('Series 7', 120), mirror.series[7])
+        self.assertTrue(self.coordinator.is_complete())
+        api.close()
+
+    def test_002_update_windows(self):
+        api = make_client(self.stub.url, self.backend)
+        mirror = _Mirror()
+        self.coordinator.add_updates(START, START + 3 * DAY, window_seconds=DAY)
+
+        report = CrawlWorker(api, self.backend, mirror).run()
+
+        # Every series is updated once a day: each window refreshes all of them.
+        self.assertEqual((3, 180), (report.completed, report.series_synced))
+        self.assertEqual(60, len(mirror.series))
+        self.assertEqual(3, len([path for _, path, _ in self.stub.request_log if path.startswith('/updated/query')]))
+        api.close()
+
+    def test_003_failed_tasks_resume(self):
+        api = make_client(self.stub.url, self.backend)
+        self.coordinator.add_series(range(1, 11), shards=1)
+
+        report = CrawlWorker(api, self.backend, _Mirror(fail_on=[5]), max_attempts=2).run()
+        self.assertEqual((2, 0, 2), (report.claimed, report.completed, report.released))
+        # The second attempt only retries the failed series.
+        self.assertEqual((9, 9, 2), (report.series_synced, report.series_skipped, report.series_failed))
+        self.assertEqual({'series-0-of-1': "RuntimeError('Mirror is down')"}, self.backend.failures())
+
+        self.coordinator.add_series([5], shards=1, name='retry')
+        self.stub.fail_next(400)
+        report = CrawlWorker(api, self.backend, _Mirror()).run()
+        self.assertEqual((1, 1, 1), (report.completed, report.series_synced, report.series_failed))
+        api.close()
+
+    def test_004_expired_leases_are_taken_over(self):
+        api = make_client(self.stub.url, self.backend)
+        self.coordinator.add_series(range(1, 11), shards=1)
+
+        # A worker that crashed halfway through its task.
+        task = self.backend.claim('crashed', 0.3)
+        for series_id in range(1, 6):
+            self.backend.mark_done(task.name, series_id)
+
+        mirror = _Mirror()
+        started_at = time.time()
+        report = CrawlWorker(api, self.backend, mirror).run(poll_interval=0.05)
+
+        self.assertGreater(time.time() - started_at, 0.25)
+        self.assertEqual((1, 5, 5), (report.completed, report.series_synced, report.series_skipped))
+        self.assertEqual([6, 7, 8, 9, 10], sorted(mirror.series))
+        api.close()
+
+    def test_005_shared_token_and_rate_limit(self):
+        first = make_client(self.stub.url, self.backend, rate=20)
+        second = make_client(self.stub.url, self.backend, rate=20)
+
+        self.assertEqual(1, self.__logins())
+        self.assertEqual('Series 1', second.get_series(1)['data']['seriesName'])
+
+        # The cache is shared as well, and both clients take their tokens from the same bucket.
+        first.get_series(1)
+        self.assertEqual(1, len([path for _, path, _ in self.stub.request_log if path == '/series/1']))
+        started_at = time.time()
+        for series_id in range(2, 32):
+            (first if series_id % 2 else second).get_series(series_id)
+        self.assertGreater(time.time() - started_at, 0.45)
+
+        first.close()
+        second.close()
+
+    def test_006_multiprocessing(self):
+        context = multiprocessing.get_context('spawn')
+        results = context.Queue()
+        processes = [context.Process(target=crawl_process, args=(self.stub.url, self.path, 100, results))
+                     for _ in range(3)]
+        for process in processes:
+            process.start()
+
+        handled = [results.get(timeout=60) for _ in processes]
+        for process in processes:
+            process.join()
+
+        series_ids = [series_id for _, ids, _ in handled for series_id in ids]
+        self.assertEqual(list(range(1, 61)), sorted(series_ids))
+        self.assertEqual(6, sum(completed for _, _, completed in handled))
+        self.assertEqual(1, self.__logins())
+        self.assertEqual({'pending': 0, 'running': 0, 'done': 6, 'failed': 0}, self.coordinator.progress())
+
+    def test_007_deleted_series(self):
+        api = make_client(self.stub.url, self.backend)
+        self.coordinator.add_updates(START, START + DAY, window_seconds=DAY)
+        self.stub.delete_series(7)
+        deleted = list()
+
+        report = CrawlWorker(api, self.backend, _Mirror(), deleted_handler=deleted.append).run()
+
+        # A series deleted from TheTVDB is still listed as updated, and must not hold the task back.
+        self.assertEqual((1, 59, 1, 0), (report.completed, report.series_synced, report.series_deleted,
+                                         report.series_failed))
+        self.assertEqual([7], deleted)
+        self.assertTrue(self.coordinator.is_complete())
+        api.close()
+
+    def test_008_leases_are_renewed_during_slow_series(self):
+        api = make_client(self.stub.url, self.backend)
+        self.coordinator.add_series([1], shards=1)
+        claims = list()
+
+        def slow_mirror(series_id, series, episodes):
+            time.sleep(0.45)
+            claims.append(self.backend.claim('other', 60))
+            time.sleep(0.3)
+
+        report = CrawlWorker(api, self.backend, slow_mirror, lease_seconds=0.3).run()
+
+        # The series takes longer than the lease, which is renewed meanwhile rather than taken over.
+        self.assertEqual([None], claims)
+        self.assertEqual((1, 1, 0), (report.completed, report.series_synced, report.lost_leases))
+        api.close()
@@ -0,0 +1,72 @@
+from unittest import TestCase
+import subprocess
+import sys
+
+__author__ = 'tsantana'
+
+# The modules that must not be imported by a plain import tvdb_client.
+HEAVY_MODULES = ('requests', 'urllib3', 'asyncio', 'concurrent.futures', 'tvdb_client.clients.ApiV2Client')
+
+
+def import_times(statement):
+    """
+    Runs a statement in a new interpreter with -X importtime.
+
+    :return: a python dictionary of the modules it imported and their cumulative import time in microseconds.
+    """
+    output = subprocess.run([sys.executable, '-X', 'importtime', '-c', statement], stderr=subprocess.PIPE,
+                            check=True, universal_newlines=True).stderr
+    times = dict()
+    for line in output.splitlines():
+        if line.startswith('import time:') and '|' in line:
+            _, cumulative, module = line[len('import time:'):].split('|')
+            if cumulative.strip().isdigit():
+                times[module.strip()] = int(cumulative)
+    return times
+
+
+class LazyImportTestCase(TestCase):
+
+    def test_001_package_import_is_light(self):
+        times = import_times('import tvdb_client')
+
+        self.assertIn('tvdb_client', times)
+        self.assertEqual([], [module for module in HEAVY_MODULES if module in times])
+
+        # Far below the cost of importing requests, which is what the package used to pay.
+        baseline = import_times('import requests')['requests']
+        self.assertTrue(times['tvdb_client'] < baseline, (times['tvdb_client'], baseline))
+
+    def test_002_clients_load_on_first_use(self):
+        statement = ('import sys, tvdb_client; before = set(sys.modules); tvdb_client.ApiV2Client; '
+                     'print(" ".join(sorted(set(sys.modules) - before)))')
+        loaded = subprocess.run([sys.executable, '-c', statement], stdout=subprocess.PIPE, check=True,
+                                universal_newlines=True).stdout.split()
+
+        self.assertIn('requests', loaded)
+        self.assertIn('tvdb_client.clients.ApiV2Client', loaded)
+        self.assertNotIn('tvdb_client.clients.AsyncApiV2Client', loaded)
+
+    def test_003_public_names(self):
+        import tvdb_client
+        from tvdb_client import ApiV1Client, ApiV2Client, AsyncApiV2Client
+        from tvdb_client.clients import ApiV2Client as Client
+
+        self.assertIs(Client, ApiV2Client)
+        self.assertIs(ApiV2Client, tvdb_client.ApiV2Client)
+        self.assertTrue({'ApiV1Client', 'ApiV2Client', 'AsyncApiV2Client'} <= set(dir(tvdb_client)))
+        self.assertRaises(AttributeError, getattr, tvdb_client, 'ApiV3Client')
+        self.assertEqual('ApiV1Client', ApiV1Client.__name__)
+        self.assertEqual('AsyncApiV2Client', AsyncApiV2Client.__name__)
+
+    def test_004_clients_imported_by_their_siblings(self):
+        # The other clients import the ApiV2Client module, which must not shadow the ApiV2Client class.
+        for first in ('from tvdb_client import AsyncApiV2Client', 'from tvdb_client import ApiV2ClientPool',
+                      'from tvdb_client.clients.ApiV2ClientPool import ApiV2ClientPool'):
+            statement = ('%s; from tvdb_client import ApiV2Client; '
+                         'from tvdb_client.clients import ApiV2Client as Client; '
+                         'print(ApiV2Client.__name__, Client is ApiV2Client, ApiV2Client.__module__)' % first)
+            output = subprocess.run([sys.executable, '-c', statement], stdout=subprocess.PIPE, check=True,
+                                    universal_newlines=True).stdout.split()
+
+            self.assertEqual(['ApiV2Client', 'True', 'tvdb_client.clients.ApiV2Client'], output, first)
@@ -0,0 +1,169 @@
+from unittest import TestCase, skipIf
+from tvdb_client.clients import ApiV2Client
+from tvdb_client.utils import instrumentation
+from tvdb_client.utils.cache import MemoryCache
+from tvdb_client.utils.instrumentation import Histogram, Instrumentation, InstrumentationHook, PrometheusExporter, \
+    StatsDHook, OpenTelemetryHook
+from tvdb_client.utils.requests_util import RetryPolicy
+from tvdb_client.tests.stub_server import StubTVDBServer, VALID_USERNAME, VALID_API_KEY, VALID_ACCOUNT_IDENTIFIER
+import socket
+import warnings
+
+__author__ = 'tsantana'
+
+
+class _RecordingHook(InstrumentationHook):
+
+    def __init__(self):
+        self.contexts = []
+        self.events = []
+
+    def before_request(self, context):
+        context.headers['X-Request-Id'] = str(len(self.contexts))
+
+    def after_request(self, context):
+        self.contexts.append(context)
+
+    def event(self, name, endpoint, value):
+        self.events.append((name, endpoint, value))
+
+
+class HistogramTestCase(TestCase):
+
+    def test_001_buckets_and_quantiles(self):
+        histogram = Histogram((1, 2, 4))
+        for value in (0.5, 1.5, 1.5, 3, 10):
+            histogram.observe(value)
+
+        self.assertEqual([(1, 1), (2, 3), (4, 4), (float('inf'), 5)], histogram.cumulative_counts())
+        self.assertEqual(16.5, histogram.sum)
+        self.assertEqual(1.75, histogram.quantile(0.5))
+        self.assertEqual(4, histogram.quantile(0.99))
+        self.assertIsNone(Histogram().quantile(0.5))
+
+
+class ClientInstrumentationTestCase(TestCase):
+
+    def setUp(self):
+        self.stub = StubTVDBServer().start()
+        self.hook = _RecordingHook()
+        self.instrumentation = Instrumentation(hooks=[self.hook])
+        self.api = ApiV2Client(VALID_USERNAME, VALID_API_KEY, VALID_ACCOUNT_IDENTIFIER, cache=MemoryCache(),
+                               retry_policy=RetryPolicy(backoff_factor=0.01), instrumentation=self.instrumentation)
+        self.api.API_BASE_URL = self.stub.url
+        self.api.login()
+
+    def tearDown(self):
+        self.api.close()
+        self.stub.stop()
+
+    def test_001_requests_are_timed_per_endpoint(self):
+        self.api.get_series(1)
+        self.api.get_series(1)
+        self.api.get_series(2)
+
+        counters = self.instrumentation.counters
+        self.assertEqual(2, counters[('requests', '/series/{id}')])
+        self.assertEqual(1, counters[('cache_hits', '/series/{id}')])
+        self.assertEqual(2, counters[('cache_misses', '/series/{id}')])
+        self.assertEqual(1, counters[('logins', '/login')])
+
+        histograms = self.instrumentation.histograms
+        for name in ('request_seconds', 'response_seconds', 'download_seconds', 'parse_seconds', 'response_bytes'):
+            self.assertEqual(2, histograms[(name, '/series/{id}')].count, name)
+        self.assertEqual(2, histograms[('auth_seconds', None)].count)
+
+        context = self.hook.contexts[-1]
+        self.assertEqual(('GET', '/series/{id}', 200, 0), (context.method, context.endpoint, context.status_code,
+                                                           context.retries))
+        self.assertTrue(context.response_bytes > 0)
+        self.assertTrue(all(headers.get('X-Request-Id') for _, _, headers in self.stub.request_log))
+
+    def test_002_retries_and_errors(self):
+        self.stub.fail_next(503, count=2)
+
+        self.assertEqual(1, self.api.get_series(1)['data']['id'])
+        self.assertEqual(404, self.api.get_series(10 ** 6)['code'])
+
+        counters = self.instrumentation.counters
+        self.assertEqual(2, counters[('retries', '/series/{id}')])
+        self.assertEqual(1, counters[('errors', '/series/{id}')])
+        self.assertEqual(3, self.hook.contexts[1].attempts)
+        self.assertIn(('retries', '/series/{id}', 2), self.hook.events)
+
+    def test_003_token_refreshes(self):
+        self.api.renew_token()
+
+        self.assertEqual(1, self.instrumentation.counters[('token_refreshes', '/refresh_token')])
+
+    def test_004_failing_hooks_dont_fail_requests(self):
+        class FailingHook(InstrumentationHook):
+            def after_request(self, context):
+                raise ValueError('failed')
+
+        self.instrumentation.add_hook(FailingHook())
+
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            self.assertEqual(1, self.api.get_series(1)['data']['id'])
+
+        self.assertTrue(any('failed' in str(warning.message) for warning in caught))
+
+    def test_005_disabled(self):
+        api = ApiV2Client(VALID_USERNAME, VALID_API_KEY, VALID_ACCOUNT_IDENTIFIER)
+        api.API_BASE_URL = self.stub.url
+        api.login()
+
+        self.assertEqual(1, api.get_series(1)['data']['id'])
+        self.assertIsNone(api.instrumentation)
+        api.close()
+
+
+class ExportersTestCase(TestCase):
+
+    def setUp(self):
+        self.instrumentation = Instrumentation(histogram_buckets={'request_seconds': (0.1, 1)})
+        self.instrumentation.increment('requests', '/series/{id}', 3)
+        self.instrumentation.increment('logins', '/login')
+        self.instrumentation.observe('request_seconds', '/series/{id}', 0.05)
+        self.instrumentation.observe('request_seconds', '/series/{id}', 0.5)
+
+    def test_001_prometheus(self):
+        text = PrometheusExporter(self.instrumentation).render()
+
+        self.assertEqual(['# TYPE tvdb_client_logins_total counter',
+                          'tvdb_client_logins_total{endpoint="/login"} 1',
+                          '# TYPE tvdb_client_requests_total counter',
+                          'tvdb_client_requests_total{endpoint="/series/{id}"} 3',
+                          '# TYPE tvdb_client_request_seconds histogram',
+                          'tvdb_client_request_seconds_bucket{endpoint="/series/{id}",le="0.1"} 1',
+                          'tvdb_client_request_seconds_bucket{endpoint="/series/{id}",le="1"} 2',
+                          'tvdb_client_request_seconds_bucket{endpoint="/series/{id}",le="+Inf"} 2',
+                          'tvdb_client_request_seconds_sum{endpoint="/series/{id}"} 0.55',
+                          'tvdb_client_request_seconds_count{endpoint="/series/{id}"} 2'], text.splitlines())
+
+    def test_002_statsd(self):
+        server = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        server.bind(('127.0.0.1', 0))
+        server.settimeout(5)
+        self.addCleanup(server.close)
+
+        hook = StatsDHook('127.0.0.1', server.getsockname()[1])
+        self.addCleanup(hook.close)
+        hook.event('cache_hits', '/series/{id}/actors', 1)
+        hook.event('requests', '/series/{id}', 1)
+        hook.after_request(self.__context())
+
+        self.assertEqual(b'tvdb_client.series_id_actors.cache_hits:1|c', server.recv(1024))
+        self.assertEqual([b'tvdb_client.series_id.request:12.500|ms', b'tvdb_client.series_id.status.200:1|c',
+                          b'tvdb_client.series_id.response_bytes:2048|h'], server.recv(1024).splitlines())
+
+    @staticmethod
+    def __context():
+        context = instrumentation.RequestContext('get', 'https://api.thetvdb.com/series/1', {})
+        context.seconds, context.status_code, context.response_bytes = 0.0125, 200, 2048
+        return context
+
+    @skipIf(instrumentation.trace is not None, 'opentelemetry is installed')
+    def test_003_opentelemetry_requires_the_package(self):
+        self.assertRaises(ImportError, OpenTelemetryHook)
@@ -0,0 +1,58 @@
+from unittest import TestCase
+from tvdb_client.clients import ApiV2Client
+from tvdb_client.utils import json_decoders
+from tvdb_client.tests.stub_server import StubTVDBServer, VALID_USERNAME, VALID_API_KEY, VALID_ACCOUNT_IDENTIFIER
+import json
+
+__author__ = 'tsantana'
+
+
+class JSONDecodersTestCase(TestCase):
+
+    def test_001_decoders_parse_bytes(self):
+        stub = StubTVDBServer(episodes_per_series=100)
+        document = {'data': stub.episodes(1), 'links': {'first': 1, 'last': 3, 'next': 2, 'prev': None}}
+        content = json.dumps(document, ensure_ascii=False).replace('Episode 1"', u'\u00c9pisode 1"').encode('utf-8')
+
+        expected = json.loads(content.decode('utf-8'))
+        for name in json_decoders.available_decoders():
+            self.assertEqual(expected, json_decoders.get_decoder(name)(content), name)
+
+    def test_002_default_and_unknown_decoders(self):
+        self.assertEqual(json_decoders.get_decoder(json_decoders.available_decoders()[0]), json_decoders.get_decoder())
+        self.assertEqual('json', json_decoders.available_decoders()[-1])
+        self.assertRaises(ValueError, json_decoders.get_decoder, 'simdjson')
+
+
+class ClientDecoderTestCase(TestCase):
+
+    def setUp(self):
+        self.stub = StubTVDBServer().start()
+
+    def tearDown(self):
+        self.stub.stop()
+
+    def test_001_custom_decoder(self):
+        decoded = []
+
+        def decoder(content):
+            decoded.append(type(content))
+            return json.loads(content)
+
+        api = ApiV2Client(VALID_USERNAME, VALID_API_KEY, VALID_ACCOUNT_IDENTIFIER, json_decoder=decoder)
+        api.API_BASE_URL = self.stub.url
+        api.login()
+
+        self.assertEqual(1, api.get_series(1)['data']['id'])
+        self.assertEqual(404, api.get_series(5000)['code'])
+        self.assertEqual([bytes] * 3, decoded)
+        api.close()
+
+    def test_002_stdlib_decoder(self):
+        api = ApiV2Client(VALID_USERNAME, VALID_API_KEY, VALID_ACCOUNT_IDENTIFIER, json_decoder='json')
+        api.API_BASE_URL = self.stub.url
+        api.login()
+
+        self.assertEqual(json_decoders.stdlib_decode, api.json_decoder)
+        self.assertEqual(2, api.get_series(2)['data']['id'])
+        api.close()
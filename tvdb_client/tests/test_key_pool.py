@@ -0,0 +1,132 @@
+from unittest import TestCase
+from concurrent.futures import ThreadPoolExecutor
+from tvdb_client import ApiV2ClientPool
+from tvdb_client.clients.ApiV2ClientPool import ROUND_ROBIN
+from tvdb_client.exceptions import NoAvailableKeyException
+from tvdb_client.tests.stub_server import StubTVDBServer
+import time
+
+__author__ = 'tsantana'
+
+CREDENTIALS = [('user%d' % n, 'KEY%d' % n, 'ACCOUNT%d' % n) for n in range(1, 5)]
+
+
+class KeyPoolTestCase(TestCase):
+
+    def __pool(self, stub, **options):
+        pool = ApiV2ClientPool(CREDENTIALS, **options)
+        for client in pool.clients.values():
+            client.API_BASE_URL = stub.url
+        self.addCleanup(pool.close)
+        return pool
+
+    def test_001_keys_log_in_lazily(self):
+        with StubTVDBServer(credentials=CREDENTIALS) as stub:
+            pool = self.__pool(stub, strategy=ROUND_ROBIN)
+
+            self.assertEqual(0, stub.requests)
+            self.assertEqual(1, pool.get_series(1)['data']['id'])
+            self.assertEqual(2, stub.requests)
+            self.assertEqual([1, 0, 0, 0], [pool.stats()[name]['logins'] for name in ('user1', 'user2', 'user3',
+                                                                                      'user4')])
+
+            for series_id in range(2, 9):
+                pool.get_series(series_id)
+
+        self.assertEqual({'KEY1': 2, 'KEY2': 2, 'KEY3': 2, 'KEY4': 2}, stub.key_requests)
+        self.assertEqual(dict((name, 2) for name in pool.clients),
+                         dict((name, stats['requests']) for name, stats in pool.stats().items()))
+
+    def test_002_least_loaded_spreads_concurrent_calls(self):
+        with StubTVDBServer(credentials=CREDENTIALS, latency=0.02) as stub:
+            pool = self.__pool(stub, coalesce_requests=False)
+            pool.login()
+
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                results = list(executor.map(pool.get_series, [n % 20 + 1 for n in range(80)]))
+
+        self.assertTrue(all('data' in result for result in results))
+        self.assertTrue(all(15 <= count <= 25 for count in stub.key_requests.values()), stub.key_requests)
+        self.assertEqual(0, sum(stats['in_flight'] for stats in pool.stats().values()))
+
+    def test_003_throttled_keys_leave_the_rotation(self):
+        with StubTVDBServer(credentials=CREDENTIALS, key_rate_limit=5) as stub:
+            pool = self.__pool(stub, throttle_cooldown=60)
+            # Every key is allowed a burst of 5 requests: the 21st call is throttled on all of them.
+            results = [pool.get_series(n % 100 + 1) for n in range(21)]
+
+            self.assertTrue(all('data' in result for result in results[:20]))
+            self.assertEqual(429, results[20]['code'])
+            self.assertEqual({'KEY1': 1, 'KEY2': 1, 'KEY3': 1, 'KEY4': 1}, stub.key_throttled)
+            self.assertTrue(all(not stats['available'] and stats['throttled'] == 1
+                                for stats in pool.stats().values()))
+
+            start = time.time()
+            with self.assertRaises(NoAvailableKeyException) as context:
+                pool.get_series(1000)
+            self.assertLess(time.time() - start, 0.1)
+            self.assertTrue(55 < context.exception.retry_after <= 60)
+
+    def test_004_keys_scale_throughput(self):
+        with StubTVDBServer(credentials=CREDENTIALS, key_rate_limit=20) as stub:
+            pool = self.__pool(stub, throttle_cooldown=0.05)
+            start = time.time()
+            results = dict(pool.get_series_many(range(1, 81), max_workers=8))
+            elapsed = time.time() - start
+
+        # 80 series at 20 requests per second and key: 4 keys do it in about a second, one would need 4.
+        self.assertEqual(80, len([result for result in results.values() if 'data' in result]))
+        self.assertLess(elapsed, 2.5)
+
+    def test_005_unauthorized_keys_leave_the_rotation(self):
+        with StubTVDBServer(credentials=CREDENTIALS) as stub:
+            pool = self.__pool(stub, strategy=ROUND_ROBIN)
+            pool.login()
+            stub.revoke_key('KEY2')
+
+            self.assertTrue(all('data' in pool.get_series(n) for n in range(1, 13)))
+            stats = pool.stats()
+            self.assertEqual((1, False), (stats['user2']['unauthorized'], stats['user2']['available']))
+            self.assertEqual(12, sum(s['requests'] for name, s in stats.items() if name != 'user2'))
+
+    def test_006_failed_logins(self):
+        with StubTVDBServer(credentials=CREDENTIALS[1:2]) as stub:
+            pool = self.__pool(stub)
+
+            self.assertEqual(5, pool.get_series(5)['data']['id'])
+            self.assertEqual(['user1'], [name for name, s in pool.stats().items() if not s['available']])
+            self.assertEqual(1, pool.stats()['user2']['logins'])
+            self.assertEqual(404, pool.get_series(100000)['code'])
+
+        self.assertRaises(ValueError, ApiV2ClientPool, [])
+        self.assertRaises(ValueError, ApiV2ClientPool, CREDENTIALS[:1] * 2)
+        self.assertRaises(ValueError, ApiV2ClientPool, CREDENTIALS, strategy='random')
+
+    def test_007_coalesced_calls_bench_one_key(self):
+        with StubTVDBServer(credentials=CREDENTIALS, latency=0.1) as stub:
+            pool = self.__pool(stub, throttle_cooldown=60)
+            pool.login()
+            stub.fail_next(429)
+
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                results = list(executor.map(pool.get_series, [7] * 4))
+
+            # The callers share one routed call: only the key answered 429 leaves the rotation.
+            self.assertTrue(all(result['data']['id'] == 7 for result in results))
+            self.assertEqual(1, len([stats for stats in pool.stats().values() if not stats['available']]))
+            self.assertEqual(2, len([path for _, path, _ in stub.request_log if path == '/series/7']))
+            self.assertEqual({'calls': 1, 'coalesced': 3}, pool.single_flight.stats())
+
+    def test_008_episode_pages_are_routed(self):
+        with StubTVDBServer(credentials=CREDENTIALS, episodes_per_series=450) as stub:
+            pool = self.__pool(stub, strategy=ROUND_ROBIN, throttle_cooldown=60)
+            pool.login()
+            stub.fail_next(429)
+
+            episodes = list(pool.iter_series_episodes(3, max_workers=2))
+
+            self.assertEqual(list(range(1, 451)), [episode['absoluteNumber'] for episode in episodes])
+            self.assertEqual(1, sum(stats['throttled'] for stats in pool.stats().values()))
+            self.assertEqual(0, sum(stats['in_flight'] for stats in pool.stats().values()))
+            # The first page was sent again with another key, and the others spread over the keys.
+            self.assertEqual(6, sum(stats['requests'] for stats in pool.stats().values()))
@@ -0,0 +1,122 @@
+from unittest import TestCase
+from tvdb_client.clients import ApiV2Client, AsyncApiV2Client
+from tvdb_client.models import Series
+from tvdb_client.utils.cache import MemoryCache
+from tvdb_client.tests.stub_server import StubTVDBServer, VALID_USERNAME, VALID_API_KEY, VALID_ACCOUNT_IDENTIFIER
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import time
+
+__author__ = 'tsantana'
+
+
+class MultiLanguageTestCase(TestCase):
+
+    def setUp(self):
+        self.stub = StubTVDBServer(latency=0.05, missing_translations=('zh',)).start()
+        self.api = ApiV2Client(VALID_USERNAME, VALID_API_KEY, VALID_ACCOUNT_IDENTIFIER, cache=MemoryCache())
+        self.api.API_BASE_URL = self.stub.url
+        self.api.login()
+
+    def tearDown(self):
+        self.api.close()
+        self.stub.stop()
+
+    def __languages_sent(self, path):
+        return sorted(headers.get('Accept-Language') or '' for _, request_path, headers in self.stub.request_log
+                      if request_path == path)
+
+    def test_001_translations_are_fetched_concurrently(self):
+        self.api.language_codes()
+        start = time.time()
+        response = self.api.get_series(1, languages=['de', 'fr', 'es'])
+        elapsed = time.time() - start
+
+        self.assertEqual({}, response['errors'])
+        self.assertEqual({'de': 'Series 1 (de)', 'fr': 'Series 1 (fr)', 'es': 'Series 1 (es)'},
+                         dict((language, series['seriesName']) for language, series in response['data'].items()))
+        # The fallback language is retrieved as well, in parallel.
+        self.assertEqual(['de', 'en', 'es', 'fr'], self.__languages_sent('/series/1'))
+        self.assertLess(elapsed, 0.15)
+
+    def test_002_cache_is_partitioned_by_language(self):
+        self.api.get_series(1, languages=['de', 'en'])
+        self.api.get_series(1, languages=['en', 'de', 'fr'])
+        self.api.get_series(1)
+
+        # One request per language, the client's own (none) included.
+        self.assertEqual(['', 'de', 'en', 'fr'], self.__languages_sent('/series/1'))
+        self.assertEqual('Series 1 (fr)', self.api.get_series(1, languages='fr')['data']['fr']['seriesName'])
+
+        self.assertEqual(4, self.api.invalidate_series(1))
+
+    def test_003_missing_translations_fall_back(self):
+        response = self.api.get_episode(100001, languages=['zh', 'de'])
+
+        zh = response['data']['zh']
+        self.assertEqual('Episode 1 (de)', zh['episodeName'])
+        self.assertEqual(self.stub.episode(1, 1, 'en')['overview'], zh['overview'])
+        self.assertEqual(100001, zh['id'])
+        self.assertEqual({'zh': {'episodeName': 'de', 'overview': 'de'}}, response['fallbacks'])
+
+        response = self.api.get_series(2, languages=['zh'])
+        self.assertEqual('Series 2', response['data']['zh']['seriesName'])
+        self.assertEqual(['Show 2'], response['data']['zh']['aliases'])
+        self.assertEqual({'zh': {'seriesName': 'en', 'aliases': 'en', 'overview': 'en'}}, response['fallbacks'])
+
+    def test_004_language_codes_are_resolved_once(self):
+        self.api.cache = None
+
+        self.assertEqual({'en', 'de', 'fr', 'es', 'zh'}, self.api.language_codes())
+        self.assertEqual(['de', 'en'], self.api.validate_languages(['de', 'en', 'de']))
+        self.assertRaises(ValueError, self.api.get_series, 1, languages=['de', 'xx'])
+        self.assertRaises(ValueError, self.api.validate_languages, [])
+
+        self.assertEqual(1, len([path for _, path, _ in self.stub.request_log if path == '/languages']))
+
+    def test_005_errors(self):
+        self.assertEqual(404, self.api.get_series(100000, languages=['de', 'fr'])['code'])
+
+        self.api.get_series(3, languages=['en'])
+        self.stub.fail_next(400)
+        response = self.api.get_series(3, languages=['en', 'de'])
+
+        self.assertEqual(['en'], list(response['data']))
+        self.assertEqual(400, response['errors']['de']['code'])
+
+    def test_006_models(self):
+        self.api.models = True
+        response = self.api.get_series(1, languages=['de', 'fr'])
+
+        self.assertIsInstance(response['data']['de'], Series)
+        self.assertEqual('Series 1 (fr)', response['data']['fr'].series_name)
+
+    def test_007_async(self):
+        async def translations():
+            async with AsyncApiV2Client(VALID_USERNAME, VALID_API_KEY, VALID_ACCOUNT_IDENTIFIER) as api:
+                api.client.API_BASE_URL = self.stub.url
+                await api.login()
+                return await asyncio.gather(api.get_series(1, languages=['de', 'fr']),
+                                            api.get_series(1, languages=['de', 'fr']), api.language_codes())
+
+        first, second, codes = asyncio.run(translations())
+
+        self.assertEqual(first, second)
+        self.assertEqual('Series 1 (de)', first['data']['de']['seriesName'])
+        self.assertIn('fr', codes)
+
+    def test_008_coalescing_keeps_models(self):
+        api = ApiV2Client(VALID_USERNAME, VALID_API_KEY, VALID_ACCOUNT_IDENTIFIER, language='en', models=True)
+        api.API_BASE_URL = self.stub.url
+        api.login()
+        api.language_codes()
+        self.addCleanup(api.close)
+
+        # The translation in the language of the client is requested as a python dictionary, the plain call as a model.
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            series = executor.submit(api.get_series, 1)
+            time.sleep(0.01)
+            translations = executor.submit(api.get_series, 1, languages=['en', 'de'])
+
+            self.assertIsInstance(series.result()['data'], Series)
+            self.assertEqual('Series 1', translations.result()['data']['en'].series_name)
@@ -0,0 +1,116 @@
+from unittest import TestCase, skipIf
+from tvdb_client.clients import ApiV2Client
+from tvdb_client.store import MetadataStore
+from tvdb_client.sync import SyncEngine
+from tvdb_client.tests.stub_server import StubTVDBServer, VALID_USERNAME, VALID_API_KEY, VALID_ACCOUNT_IDENTIFIER
+import importlib.util
+import os
+import shutil
+import tempfile
+
+__author__ = 'tsantana'
+
+
+class MetadataStoreTestCase(TestCase):
+
+    def setUp(self):
+        self.stub = StubTVDBServer(episodes_per_series=60, series_count=20).start()
+        self.directory = tempfile.mkdtemp()
+        self.store = MetadataStore(os.path.join(self.directory, 'metadata.db'))
+        self.api = ApiV2Client(VALID_USERNAME, VALID_API_KEY, VALID_ACCOUNT_IDENTIFIER, store=self.store)
+        self.api.API_BASE_URL = self.stub.url
+        self.api.login()
+
+    def tearDown(self):
+        self.api.close()
+        self.store.close()
+        self.stub.stop()
+        shutil.rmtree(self.directory)
+
+    def test_001_client_responses_are_stored(self):
+        self.api.get_series(1)
+        self.api.get_series_episodes(1)
+        self.api.get_series_actors(1)
+        self.api.get_series_images(1, image_type='poster')
+        self.api.get_series(100000)
+
+        self.assertEqual(self.stub.series(1), self.store.get_series(1))
+        self.assertIsNone(self.store.get_series(100000))
+        self.assertEqual(1, self.store.count('series'))
+        self.assertEqual(60, self.store.count('episodes'))
+        self.assertEqual(['Actor %d' % n for n in range(1, 11)], [a['name'] for a in self.store.get_actors(1)])
+        self.assertEqual(4, len(self.store.get_images(1, key_type='poster')))
+
+    def test_002_queries(self):
+        self.store.store_series([self.stub.series(1), self.stub.series(2)])
+        self.store.store_episodes(self.stub.episodes(1) + self.stub.episodes(2))
+
+        first_season = self.store.get_episodes(aired_season=1)
+        self.assertEqual({1, 2}, set(episode['seriesId'] for episode in first_season))
+        self.assertTrue(all(episode['airedSeason'] == 1 for episode in first_season))
+
+        episode = self.store.get_episodes(series_id=2, aired_season=1, aired_episode=3)
+        self.assertEqual([self.stub.episode(2, 3)], episode)
+
+        aired = self.store.get_episodes(series_id=1, first_aired_from='2001-01-01', first_aired_to='2001-12-31')
+        self.assertTrue(aired)
+        self.assertTrue(all(e['firstAired'].startswith('2001-') for e in aired))
+
+    def test_003_newer_versions_win(self):
+        series = self.stub.series(1)
+        self.store.store_series([series])
+
+        older = dict(series, seriesName='Old name', lastUpdated=series['lastUpdated'] - 1)
+        self.store.store_series([older])
+        self.assertEqual(series['seriesName'], self.store.get_series(1)['seriesName'])
+
+        newer = dict(series, seriesName='New name', lastUpdated=series['lastUpdated'] + 1)
+        self.store.store_series([newer])
+        self.assertEqual('New name', self.store.get_series(1)['seriesName'])
+
+        # A listing summary of the same version doesn't replace the full episode.
+        episode = self.stub.episode(1, 1)
+        self.store.store_episodes([episode])
+        self.store.store_episodes([dict((key, episode[key]) for key in ('id', 'seriesId', 'airedSeason',
+                                                                        'airedEpisodeNumber', 'lastUpdated'))])
+        self.assertEqual(episode, self.store.get_episodes(series_id=1)[0])
+
+    def test_004_persistence_and_models(self):
+        self.api.models = True
+        self.api.get_series(3)
+        self.store.close()
+
+        self.store = MetadataStore(self.store.path)
+        self.assertEqual('Series 3', self.store.get_series(3)['seriesName'])
+
+    def test_005_sync_handler(self):
+        self.api.store = None
+        engine = SyncEngine(self.api, self.store.sync_handler, max_workers=2)
+        engine.run(1500000000, 1500086400)
+
+        self.assertEqual(self.stub.series_count, self.store.count('series'))
+        self.assertEqual(self.stub.series_count * 60, self.store.count('episodes'))
+
+    def test_006_unknown_table(self):
+        self.assertRaises(ValueError, self.store.count, 'users')
+
+    @skipIf(importlib.util.find_spec('pyarrow') is None, 'pyarrow is not installed')
+    def test_007_columnar_export(self):
+        self.store.store_episodes(self.stub.episodes(1) + self.stub.episodes(2))
+
+        table = self.store.to_arrow('episodes', where='aired_season = ?', params=(1,))
+        self.assertEqual(40, table.num_rows)
+        self.assertEqual([1] * 40, table.column('aired_season').to_pylist())
+
+        path = os.path.join(self.directory, 'episodes.parquet')
+        self.assertEqual(self.store.count('episodes'), self.store.export_parquet('episodes', path, batch_size=7))
+        import pyarrow.parquet
+        self.assertEqual(self.store.count('episodes'), pyarrow.parquet.read_table(path).num_rows)
+
+    def test_008_translations_are_not_stored(self):
+        self.api.get_series(1)
+        response = self.api.get_series(1, languages=['de', 'fr'])
+
+        self.assertEqual('Series 1 (fr)', response['data']['fr']['seriesName'])
+        self.assertEqual('Series 1', self.store.get_series(1)['seriesName'])
+        self.assertEqual(1, self.store.count('series'))
@@ -0,0 +1,85 @@
+from unittest import TestCase
+from tvdb_client.clients import ApiV2Client
+from tvdb_client.models import Series, Episode, Actor, Image, Language
+from tvdb_client.utils.cache import SQLiteCache
+from tvdb_client.tests.stub_server import StubTVDBServer, VALID_USERNAME, VALID_API_KEY, VALID_ACCOUNT_IDENTIFIER
+import pickle
+
+__author__ = 'tsantana'
+
+
+class ModelsTestCase(TestCase):
+
+    def setUp(self):
+        self.stub = StubTVDBServer(episodes_per_series=30)
+
+    def test_001_eager_and_lazy_fields(self):
+        data = self.stub.episode(3, 7)
+        episode = Episode(data)
+
+        self.assertEqual(300007, episode.id)
+        self.assertEqual('Episode 7', episode.episode_name)
+        self.assertTrue(isinstance(episode._extra, str))
+        self.assertEqual(['Writer 1'], episode.writers)
+        self.assertTrue(isinstance(episode._extra, dict))
+        self.assertIsNone(episode.airs_before_season)
+        self.assertEqual(data, episode.to_dict())
+
+    def test_002_no_instance_dict(self):
+        series = Series(self.stub.series(1))
+
+        self.assertFalse(hasattr(series, '__dict__'))
+        self.assertRaises(AttributeError, getattr, series, 'unknown_field')
+        self.assertRaises(AttributeError, setattr, series, 'unknown_field', 1)
+
+    def test_003_equality_and_pickle(self):
+        actor = Actor(self.stub.actors(2)[0])
+
+        self.assertEqual(Actor(self.stub.actors(2)[0]), actor)
+        self.assertNotEqual(Actor(self.stub.actors(2)[1]), actor)
+        self.assertEqual(actor, pickle.loads(pickle.dumps(actor)))
+        language = {'id': 7, 'abbreviation': 'en', 'name': 'English', 'englishName': 'English'}
+        self.assertEqual(language, Language(language).to_dict())
+
+
+class ClientModelsTestCase(TestCase):
+
+    def setUp(self):
+        self.stub = StubTVDBServer(episodes_per_series=250).start()
+
+    def tearDown(self):
+        self.stub.stop()
+
+    def __client(self, **kwargs):
+        api = ApiV2Client(VALID_USERNAME, VALID_API_KEY, VALID_ACCOUNT_IDENTIFIER, **kwargs)
+        api.API_BASE_URL = self.stub.url
+        api.login()
+        self.addCleanup(api.close)
+        return api
+
+    def test_001_models_are_opt_in(self):
+        self.assertTrue(isinstance(self.__client().get_series(1)['data'], dict))
+
+        api = self.__client(models=True)
+
+        self.assertTrue(isinstance(api.get_series(1)['data'], Series))
+        self.assertTrue(all(isinstance(actor, Actor) for actor in api.get_series_actors(1)['data']))
+        images = api.get_series_images(1, image_type='poster')['data']
+        self.assertTrue(all(isinstance(image, Image) for image in images))
+        self.assertEqual(100001, api.get_episode(100001)['data'].id)
+        self.assertEqual(404, api.get_series(5000)['code'])
+
+    def test_002_iter_series_episodes(self):
+        episodes = list(self.__client(models=True).iter_series_episodes(1))
+
+        self.assertEqual(list(range(100001, 100251)), [episode.id for episode in episodes])
+        self.assertTrue(all(isinstance(episode, Episode) for episode in episodes))
+
+    def test_003_cache_holds_dictionaries(self):
+        api = self.__client(models=True, cache=SQLiteCache(':memory:'))
+
+        first, second = api.get_series(1), api.get_series(1)
+
+        self.assertEqual(1, api.cache.stats()['hits'])
+        self.assertEqual(first['data'], second['data'])
+        self.assertTrue(isinstance(second['data'], Series))
@@ -0,0 +1,66 @@
+from unittest import TestCase
+from tvdb_client.clients import ApiV2Client, AsyncApiV2Client
+from tvdb_client.exceptions import RequestFailedException
+from tvdb_client.tests.stub_server import StubTVDBServer, VALID_USERNAME, VALID_API_KEY, VALID_ACCOUNT_IDENTIFIER
+import asyncio
+
+__author__ = 'tsantana'
+
+
+class EpisodesPaginationTestCase(TestCase):
+
+    def setUp(self):
+        self.stub = StubTVDBServer(episodes_per_series=1050).start()
+        self.api = ApiV2Client(VALID_USERNAME, VALID_API_KEY, VALID_ACCOUNT_IDENTIFIER)
+        self.api.API_BASE_URL = self.stub.url
+        self.api.login()
+
+    def tearDown(self):
+        self.api.close()
+        self.stub.stop()
+
+    def test_001_paged_variant_is_reachable(self):
+        resp = self.api.get_series_episodes(1, page=2)
+
+        self.assertEqual(100, len(resp['data']))
+        self.assertEqual(101, resp['data'][0]['absoluteNumber'])
+        self.assertEqual(11, resp['links']['last'])
+
+    def test_002_iter_in_page_order(self):
+        numbers = [e['absoluteNumber'] for e in self.api.iter_series_episodes(1, max_workers=3)]
+
+        self.assertEqual(list(range(1, 1051)), numbers)
+        self.assertEqual(11, len([p for m, p, h in self.stub.request_log if '/episodes' in p]))
+
+    def test_003_iter_in_arrival_order(self):
+        numbers = [e['absoluteNumber'] for e in self.api.iter_series_episodes(1, ordered=False)]
+
+        self.assertEqual(list(range(1, 1051)), sorted(numbers))
+
+    def test_004_iter_stops_early(self):
+        episodes = self.api.iter_series_episodes(2, max_workers=2)
+        first = [next(episodes) for _ in range(5)]
+        episodes.close()
+
+        self.assertEqual([1, 2, 3, 4, 5], [e['absoluteNumber'] for e in first])
+        self.assertLessEqual(len([p for m, p, h in self.stub.request_log if '/episodes' in p]), 3)
+
+    def test_005_iter_unknown_series_is_empty(self):
+        self.assertEqual([], list(self.api.iter_series_episodes(self.stub.series_count + 1)))
+
+    def test_006_iter_fails_on_error(self):
+        self.api._ApiV2Client__token = 'revoked'
+
+        self.assertRaises(RequestFailedException, list, self.api.iter_series_episodes(1))
+
+    def test_007_async_iter(self):
+        api = AsyncApiV2Client(VALID_USERNAME, VALID_API_KEY, VALID_ACCOUNT_IDENTIFIER, max_concurrency=3)
+        api.client.API_BASE_URL = self.stub.url
+
+        async def collect(ordered):
+            await api.login()
+            return [e['absoluteNumber'] async for e in api.iter_series_episodes(1, ordered=ordered)]
+
+        self.assertEqual(list(range(1, 1051)), asyncio.run(collect(True)))
+        self.assertEqual(list(range(1, 1051)), sorted(asyncio.run(collect(False))))
+        api.close()
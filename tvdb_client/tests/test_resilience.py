@@ -0,0 +1,156 @@
+from unittest import TestCase
+from tvdb_client.clients import ApiV2Client
+from tvdb_client.exceptions import CassetteMissException, CircuitOpenException
+from tvdb_client.utils.requests_util import RetryPolicy, RateLimiter, CircuitBreaker
+from tvdb_client.tests.stub_server import StubTVDBServer, VALID_USERNAME, VALID_API_KEY, VALID_ACCOUNT_IDENTIFIER
+from concurrent.futures import ThreadPoolExecutor
+import time
+
+__author__ = 'tsantana'
+
+
+class _Response(object):
+
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+class RetryPolicyTestCase(TestCase):
+
+    def test_001_exponential_backoff(self):
+        policy = RetryPolicy(backoff_factor=0.5, max_backoff=3, jitter=False)
+
+        self.assertEqual([0.5, 1, 2, 3, 3], [policy.backoff(attempt) for attempt in range(5)])
+
+    def test_002_jitter(self):
+        policy = RetryPolicy(backoff_factor=1)
+
+        self.assertTrue(all(0 <= policy.backoff(3) <= 8 for _ in range(100)))
+
+    def test_003_retry_after(self):
+        policy = RetryPolicy(max_backoff=10)
+
+        self.assertEqual(4, policy.backoff(0, _Response(429, {'Retry-After': '4'})))
+        self.assertEqual(10, policy.backoff(0, _Response(503, {'Retry-After': '10'})))
+        # Retrying before a longer Retry-After would be throttled again: the request is given up instead.
+        self.assertIsNone(policy.backoff(0, _Response(503, {'Retry-After': '120'})))
+        self.assertAlmostEqual(0, policy.backoff(0, _Response(503, {'Retry-After': 'Sat, 01 Jan 2022 00:00:00 GMT'})))
+
+    def test_004_retryable_statuses(self):
+        policy = RetryPolicy()
+
+        self.assertTrue(policy.is_retryable(None))
+        self.assertTrue(policy.is_retryable(_Response(429)))
+        self.assertFalse(policy.is_retryable(_Response(404)))
+
+
+class RateLimiterTestCase(TestCase):
+
+    def test_001_rate_is_shared_across_threads(self):
+        limiter = RateLimiter(rate=100, burst=5)
+
+        start = time.time()
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(lambda _: limiter.acquire(), range(35)))
+
+        self.assertGreaterEqual(time.time() - start, 0.28)
+
+    def test_002_pause(self):
+        limiter = RateLimiter(rate=1000)
+        limiter.pause(0.1)
+
+        self.assertGreaterEqual(limiter.acquire(), 0.09)
+
+
+class _FailingTransport(object):
+
+    def request(self, request_type, url, **kwargs):
+        raise CassetteMissException('No recorded response for %s' % url, url)
+
+
+class ClientResilienceTestCase(TestCase):
+
+    def setUp(self):
+        self.stub = StubTVDBServer().start()
+
+    def tearDown(self):
+        self.stub.stop()
+
+    def __make_client(self, **kwargs):
+        api = ApiV2Client(VALID_USERNAME, VALID_API_KEY, VALID_ACCOUNT_IDENTIFIER, **kwargs)
+        api.API_BASE_URL = self.stub.url
+        api.login()
+        self.stub.reset_counters()
+        return api
+
+    def test_001_server_errors_are_retried(self):
+        api = self.__make_client(retry_policy=RetryPolicy(backoff_factor=0.01))
+        self.stub.fail_next(503, 2)
+
+        self.assertEqual(1, api.get_series(1)['data']['id'])
+        self.assertEqual(3, self.stub.requests)
+
+    def test_002_retry_after_is_honored(self):
+        api = self.__make_client(retry_policy=RetryPolicy(max_backoff=2), rate_limiter=RateLimiter(rate=1000))
+        self.stub.fail_next(429, 1, retry_after=1)
+
+        start = time.time()
+        self.assertEqual(1, api.get_series(1)['data']['id'])
+        self.assertGreaterEqual(time.time() - start, 1)
+
+        # A longer Retry-After than the policy allows is returned rather than retried too early.
+        api.retry_policy = RetryPolicy(max_backoff=0.2)
+        self.stub.fail_next(429, 1, retry_after=1)
+        start = time.time()
+        self.assertEqual(429, api.get_series(2)['code'])
+        self.assertLess(time.time() - start, 0.2)
+
+    def test_003_retries_are_exhausted(self):
+        api = self.__make_client(retry_policy=RetryPolicy(retries=2, backoff_factor=0.01))
+        self.stub.fail_next(500, 5)
+
+        resp = api.get_series(1)
+
+        self.assertEqual(500, resp['code'])
+        self.assertEqual(3, self.stub.requests)
+
+    def test_004_client_errors_are_not_retried(self):
+        api = self.__make_client()
+
+        self.assertEqual(404, api.get_series(self.stub.series_count + 1)['code'])
+        self.assertEqual(1, self.stub.requests)
+
+    def test_005_circuit_breaker(self):
+        breaker = CircuitBreaker(failure_threshold=3, reset_timeout=0.2)
+        api = self.__make_client(retry_policy=RetryPolicy(retries=0), circuit_breaker=breaker)
+        self.stub.fail_next(503, 3)
+
+        for _ in range(3):
+            self.assertEqual(503, api.get_series(1)['code'])
+        self.assertRaises(CircuitOpenException, api.get_series, 1)
+        self.assertEqual(3, self.stub.requests)
+        self.assertEqual(CircuitBreaker.OPEN, breaker.state)
+
+        time.sleep(0.2)
+        self.assertEqual(1, api.get_series(1)['data']['id'])
+        self.assertEqual(CircuitBreaker.CLOSED, breaker.state)
+
+    def test_006_trial_request_raising(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.1)
+        api = self.__make_client(retry_policy=RetryPolicy(retries=0), circuit_breaker=breaker)
+        self.stub.fail_next(503)
+        self.assertEqual(503, api.get_series(1)['code'])
+
+        # The trial request raises an error other than a connection error: it counts as failed rather than leaving the
+        # circuit half-open.
+        time.sleep(0.1)
+        transport = api.transport
+        api.transport = _FailingTransport()
+        self.assertRaises(CassetteMissException, api.get_series, 1)
+        self.assertEqual(CircuitBreaker.OPEN, breaker.state)
+
+        api.transport = transport
+        time.sleep(0.1)
+        self.assertEqual(1, api.get_series(1)['data']['id'])
+        self.assertEqual(CircuitBreaker.CLOSED, breaker.state)
@@ -0,0 +1,158 @@
+from unittest import TestCase
+from tvdb_client.clients import ApiV2Client, AsyncApiV2Client
+from tvdb_client.exceptions import DeadlineExceededException
+from tvdb_client.utils.requests_util import RequestScheduler, RetryPolicy, request_context, \
+    submit_in_context, INTERACTIVE, BATCH
+from tvdb_client.tests.stub_server import StubTVDBServer, VALID_USERNAME, VALID_API_KEY, VALID_ACCOUNT_IDENTIFIER
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import threading
+import time
+
+__author__ = 'tsantana'
+
+
+class RequestSchedulerTestCase(TestCase):
+
+    def test_001_higher_lanes_go_first(self):
+        scheduler = RequestScheduler(max_concurrency=1)
+        admitted = list()
+
+        def request(lane):
+            scheduler.acquire(lane)
+            admitted.append(lane)
+            scheduler.release(lane)
+
+        scheduler.acquire(BATCH)
+        threads = [threading.Thread(target=request, args=(lane,)) for lane in (BATCH, BATCH, INTERACTIVE)]
+        for thread in threads:
+            thread.start()
+            time.sleep(0.05)
+
+        self.assertEqual({BATCH: 2, INTERACTIVE: 1}, dict((lane, stats['waiting'])
+                                                          for lane, stats in scheduler.stats().items()))
+        scheduler.release(BATCH)
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual([INTERACTIVE, BATCH, BATCH], admitted)
+        self.assertEqual(3, scheduler.stats()[BATCH]['admitted'])
+
+    def test_002_capped_lanes_leave_room(self):
+        scheduler = RequestScheduler(max_concurrency=3, lane_limits={BATCH: 2})
+
+        scheduler.acquire(BATCH)
+        scheduler.acquire(BATCH)
+        self.assertRaises(DeadlineExceededException, scheduler.acquire, BATCH, time.time() + 0.05)
+        # A batch request waiting at its cap doesn't hold back the interactive ones.
+        waiting = threading.Thread(target=scheduler.acquire, args=(BATCH,))
+        waiting.start()
+        self.assertLess(scheduler.acquire(INTERACTIVE, time.time() + 0.05), 0.05)
+
+        scheduler.release(BATCH)
+        waiting.join()
+        stats = scheduler.stats()
+        self.assertEqual((3, 1, 2), (stats[BATCH]['admitted'], stats[BATCH]['expired'], stats[BATCH]['in_flight']))
+        self.assertEqual(1, stats[INTERACTIVE]['in_flight'])
+
+    def test_003_invalid_lanes(self):
+        self.assertRaises(ValueError, RequestScheduler, lane_limits={'bulk': 1})
+        self.assertRaises(ValueError, RequestScheduler().acquire, 'bulk')
+
+
+class ClientSchedulerTestCase(TestCase):
+
+    def setUp(self):
+        self.stub = StubTVDBServer(latency=0.1).start()
+        self.scheduler = RequestScheduler(max_concurrency=2)
+        self.api = self.__make_client()
+        self.api.login()
+
+    def tearDown(self):
+        self.api.close()
+        self.stub.stop()
+
+    def __make_client(self, **kwargs):
+        api = ApiV2Client(VALID_USERNAME, VALID_API_KEY, VALID_ACCOUNT_IDENTIFIER, scheduler=self.scheduler, **kwargs)
+        api.API_BASE_URL = self.stub.url
+        return api
+
+    def test_001_lookups_preempt_crawls(self):
+        with ThreadPoolExecutor(max_workers=10) as executor:
+            crawl = [executor.submit(self.api.get_series_episodes, series_id) for series_id in range(1, 11)]
+            time.sleep(0.05)
+
+            started_at = time.time()
+            self.assertEqual('Series 1', self.api.get_series(1)['data']['seriesName'])
+            elapsed = time.time() - started_at
+            self.assertTrue(all('data' in future.result() for future in crawl))
+
+        # It waits for a slot to free up, rather than for the 8 crawl requests queued before it.
+        self.assertLess(elapsed, 0.3)
+        self.assertEqual(2, self.stub.max_in_flight)
+        # The login is interactive as well.
+        stats = self.scheduler.stats()
+        self.assertEqual((10, 2), (stats[BATCH]['admitted'], stats[INTERACTIVE]['admitted']))
+
+    def test_002_crawls_use_idle_capacity(self):
+        self.scheduler = RequestScheduler(max_concurrency=4, lane_limits={BATCH: 2})
+        api = self.__make_client(endpoint_lanes={'/series/{id}': BATCH})
+        api.login()
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            started_at = time.time()
+            list(executor.map(api.get_series, range(1, 7)))
+            self.assertGreater(time.time() - started_at, 0.3)
+            self.assertEqual(2, self.stub.max_in_flight)
+
+            with request_context(lane=INTERACTIVE):
+                started_at = time.time()
+                [future.result() for future in [submit_in_context(executor, api.get_series, series_id)
+                                                for series_id in range(7, 11)]]
+                self.assertLess(time.time() - started_at, 0.2)
+            self.assertEqual(4, self.stub.max_in_flight)
+        api.close()
+
+    def test_003_deadlines(self):
+        with request_context(timeout=0.05):
+            self.assertRaises(DeadlineExceededException, self.api.get_series, 1)
+
+        # Retries stop when their backoff would end past the deadline.
+        self.api.retry_policy = RetryPolicy(backoff_factor=0.3, jitter=False)
+        self.stub.fail_next(503, count=3)
+        started_at = time.time()
+        with request_context(timeout=0.6):
+            self.assertEqual(503, self.api.get_series(2)['code'])
+        self.assertLess(time.time() - started_at, 0.6)
+        self.assertEqual(2, len([path for _, path, _ in self.stub.request_log if path == '/series/2']))
+
+        # Nested contexts keep the earliest deadline, and requests queued past it are given up.
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            crawl = [executor.submit(self.api.get_series_episodes, series_id) for series_id in (3, 4)]
+            time.sleep(0.02)
+            with request_context(timeout=0.05), request_context(timeout=10):
+                self.assertRaises(DeadlineExceededException, self.api.get_series, 5)
+            [future.result() for future in crawl]
+        self.assertEqual(1, self.scheduler.stats()[INTERACTIVE]['expired'])
+
+    def test_004_context_is_carried_to_fan_outs(self):
+        self.api.language_codes()
+
+        with request_context(lane=BATCH):
+            self.api.get_series_bundle(1, include=('series', 'actors', 'episodes_summary'))
+            self.api.get_series(2, languages=['de', 'fr'])
+
+        stats = self.scheduler.stats()
+        self.assertEqual((6, 2), (stats[BATCH]['admitted'], stats[INTERACTIVE]['admitted']))
+
+        async def lookup():
+            async with AsyncApiV2Client(VALID_USERNAME, VALID_API_KEY, VALID_ACCOUNT_IDENTIFIER,
+                                        scheduler=self.scheduler) as api:
+                api.client.API_BASE_URL = self.stub.url
+                await api.login()
+                with request_context(lane=BATCH):
+                    return await api.get_series(5)
+
+        self.assertEqual(5, asyncio.run(lookup())['data']['id'])
+        self.assertEqual((7, 3), (self.scheduler.stats()[BATCH]['admitted'],
+                                  self.scheduler.stats()[INTERACTIVE]['admitted']))
@@ -0,0 +1,118 @@
+from unittest import TestCase
+from tvdb_client.clients import ApiV2Client
+from tvdb_client.models import Series
+from tvdb_client.search import SeriesSearchIndex, normalize
+from tvdb_client.tests.stub_server import StubTVDBServer, VALID_USERNAME, VALID_API_KEY, VALID_ACCOUNT_IDENTIFIER
+import os
+import shutil
+import tempfile
+
+__author__ = 'tsantana'
+
+
+class SeriesSearchIndexTestCase(TestCase):
+
+    def setUp(self):
+        self.index = SeriesSearchIndex()
+        for series_id, name, aliases in ((1, 'Game of Thrones', ['GoT']), (2, "Grey's Anatomy", []),
+                                         (3, u'Les Revenants', ['The Returned']), (4, 'The Office (US)', []),
+                                         (5, 'The Office', []), (6, 'Thrones of Games', [])):
+            self.index.add({'id': series_id, 'seriesName': name, 'aliases': aliases, 'imdbId': 'tt%07d' % series_id,
+                            'overview': 'Overview %d' % series_id})
+
+    def __ids(self, **kwargs):
+        return [series['id'] for series in self.index.search(**kwargs)]
+
+    def test_001_normalize(self):
+        self.assertEqual('greys anatomy', normalize("Grey's.Anatomy"))
+        self.assertEqual('les revenants', normalize(u'LES_R\u00c9VENANTS'))
+        self.assertEqual('law and order svu', normalize('Law & Order: SVU'))
+
+    def test_002_exact_and_token_matches(self):
+        self.assertEqual([5], self.__ids(name='the office'))
+        self.assertEqual([4], self.__ids(name='office us'))
+        self.assertEqual([2], self.__ids(name='greys anatomy'))
+        self.assertEqual([1], self.__ids(name='GoT'))
+        self.assertEqual([3], self.__ids(name='The.Returned'))
+
+    def test_003_fuzzy_matches(self):
+        self.assertEqual([1, 6], self.__ids(name='Game of Thornes'))
+        self.assertEqual([2], self.__ids(name='Gray Anatomy'))
+        self.assertEqual([], self.__ids(name='Breaking Bad'))
+        self.assertEqual([], self.__ids(name='Office Space'))
+
+    def test_004_external_ids(self):
+        self.assertEqual([4], self.__ids(imdb_id='tt0000004'))
+        self.assertEqual([], self.__ids(zap2it_id='EP000004'))
+
+    def test_005_update_and_remove(self):
+        self.index.add({'id': 2, 'seriesName': 'Grey Sloan'})
+
+        self.assertEqual([], self.__ids(name="Grey's Anatomy"))
+        self.assertEqual([2], self.__ids(name='Grey Sloan'))
+        self.assertEqual('Overview 2', self.index.search(name='Grey Sloan')[0]['overview'])
+
+        self.index.remove(2)
+
+        self.assertEqual([], self.__ids(name='Grey Sloan'))
+        self.assertEqual(5, len(self.index))
+        self.assertEqual({'hits': 2, 'misses': 2, 'series': 5}, self.index.stats())
+
+    def test_006_save_and_load(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+
+        self.index.save(os.path.join(directory, 'index.json'))
+        index = SeriesSearchIndex.load(os.path.join(directory, 'index.json'))
+
+        self.assertEqual(6, len(index))
+        self.assertEqual([1], [series['id'] for series in index.search(name='game of thrones')])
+
+
+class ClientSearchIndexTestCase(TestCase):
+
+    def setUp(self):
+        self.stub = StubTVDBServer(series_count=100).start()
+        self.index = SeriesSearchIndex()
+        self.api = ApiV2Client(VALID_USERNAME, VALID_API_KEY, VALID_ACCOUNT_IDENTIFIER, search_index=self.index)
+        self.api.API_BASE_URL = self.stub.url
+        self.api.login()
+
+    def tearDown(self):
+        self.api.close()
+        self.stub.stop()
+
+    def __search_requests(self):
+        return len([path for method, path, headers in self.stub.request_log if path.startswith('/search/series')])
+
+    def test_001_local_hits_avoid_requests(self):
+        self.api.get_series(42)
+
+        self.assertEqual([42], [series['id'] for series in self.api.search_series(name='Series 42')['data']])
+        self.assertEqual([42], [series['id'] for series in self.api.search_series(imdb_id='tt0000042')['data']])
+        self.assertEqual(0, self.__search_requests())
+
+    def test_002_misses_fall_back_to_remote(self):
+        self.assertEqual([7, 70, 71, 72, 73, 74, 75, 76, 77, 78, 79],
+                         sorted(series['id'] for series in self.api.search_series(name='Series 7')['data']))
+        self.assertEqual(1, self.__search_requests())
+
+        self.assertEqual(7, self.api.search_series(name='series 7')['data'][0]['id'])
+        self.assertEqual(1, self.__search_requests())
+        self.assertEqual(404, self.api.search_series(name='Unknown')['code'])
+        self.assertEqual({'hits': 1, 'misses': 2, 'series': 11}, self.index.stats())
+
+    def test_003_models(self):
+        self.api.models = True
+        self.api.get_series(42)
+
+        self.assertTrue(isinstance(self.api.search_series(name='Series 42')['data'][0], Series))
+
+    def test_004_refresh(self):
+        self.api.get_series(1)
+        self.api.get_series(2)
+        self.index.add({'id': 1, 'seriesName': 'Stale name'})
+
+        self.assertEqual(2, self.index.refresh(self.api, 1500000000, 1500000000 + 2 * 24 * 3600))
+        self.assertEqual([1], [series['id'] for series in self.index.search(name='Series 1')])
+        self.assertEqual([], self.index.search(name='Stale name'))
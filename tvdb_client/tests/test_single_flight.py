@@ -0,0 +1,119 @@
+from unittest import TestCase
+from tvdb_client.clients import ApiV2Client, AsyncApiV2Client
+from tvdb_client.utils.single_flight import SingleFlight, AsyncSingleFlight
+from tvdb_client.tests.stub_server import StubTVDBServer, VALID_USERNAME, VALID_API_KEY, VALID_ACCOUNT_IDENTIFIER
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import threading
+
+__author__ = 'tsantana'
+
+
+class SingleFlightTestCase(TestCase):
+
+    def test_001_concurrent_calls_are_coalesced(self):
+        single_flight = SingleFlight()
+        started, release = threading.Event(), threading.Event()
+        calls = []
+
+        def call():
+            calls.append(1)
+            started.set()
+            release.wait()
+            return {'data': 1}
+
+        with ThreadPoolExecutor(max_workers=5) as executor:
+            leader = executor.submit(single_flight.do, 'key', call)
+            started.wait()
+            followers = [executor.submit(single_flight.do, 'key', call) for _ in range(4)]
+            while single_flight.stats()['coalesced'] < 4:
+                pass
+            release.set()
+
+        self.assertTrue(all(future.result() is leader.result() for future in followers))
+        self.assertEqual(1, len(calls))
+        self.assertEqual({'calls': 1, 'coalesced': 4}, single_flight.stats())
+
+        single_flight.do('key', lambda: None)
+        self.assertEqual({'calls': 2, 'coalesced': 4}, single_flight.stats())
+
+    def test_002_errors_are_shared(self):
+        single_flight = SingleFlight()
+
+        def fail():
+            raise ValueError('failed')
+
+        self.assertRaises(ValueError, single_flight.do, 'key', fail)
+        self.assertEqual(1, single_flight.do('key', lambda: 1))
+
+    def test_003_async(self):
+        single_flight = AsyncSingleFlight()
+        calls = []
+
+        async def call():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return len(calls)
+
+        async def run():
+            waiter = asyncio.ensure_future(single_flight.do('key', call))
+            await asyncio.sleep(0)
+            waiter.cancel()
+            return await asyncio.gather(*[single_flight.do('key', call) for _ in range(5)])
+
+        self.assertEqual([1] * 5, asyncio.run(run()))
+        self.assertEqual({'calls': 1, 'coalesced': 5}, single_flight.stats())
+
+
+class ClientSingleFlightTestCase(TestCase):
+
+    def setUp(self):
+        self.stub = StubTVDBServer(latency=0.05).start()
+
+    def tearDown(self):
+        self.stub.stop()
+
+    def __series_requests(self, series_id):
+        return len([path for method, path, headers in self.stub.request_log if path == '/series/%d' % series_id])
+
+    def test_001_threads(self):
+        api = ApiV2Client(VALID_USERNAME, VALID_API_KEY, VALID_ACCOUNT_IDENTIFIER)
+        api.API_BASE_URL = self.stub.url
+        api.login()
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(api.get_series, [1] * 8 + [2] * 8))
+
+        self.assertEqual([1] * 8 + [2] * 8, [result['data']['id'] for result in results])
+        self.assertEqual(1, self.__series_requests(1))
+        self.assertEqual(1, self.__series_requests(2))
+        self.assertEqual(14, api.single_flight.stats()['coalesced'])
+        api.close()
+
+    def test_002_disabled(self):
+        api = ApiV2Client(VALID_USERNAME, VALID_API_KEY, VALID_ACCOUNT_IDENTIFIER, coalesce_requests=False)
+        api.API_BASE_URL = self.stub.url
+        api.login()
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            list(executor.map(api.get_series, [1] * 4))
+
+        self.assertEqual(4, self.__series_requests(1))
+        self.assertIsNone(api.single_flight)
+        api.close()
+
+    def test_003_async(self):
+        api = AsyncApiV2Client(VALID_USERNAME, VALID_API_KEY, VALID_ACCOUNT_IDENTIFIER, max_concurrency=4)
+        api.client.API_BASE_URL = self.stub.url
+
+        async def refresh():
+            await api.login()
+            return await asyncio.gather(*([api.get_series(1) for _ in range(10)] +
+                                          [api.get_series_episodes(1, page=2) for _ in range(10)]))
+
+        results = asyncio.run(refresh())
+
+        self.assertTrue(all(result is results[0] for result in results[:10]))
+        self.assertEqual(1, self.__series_requests(1))
+        self.assertEqual({'calls': 2, 'coalesced': 18}, api.single_flight.stats())
+        api.close()
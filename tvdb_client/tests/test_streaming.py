@@ -0,0 +1,96 @@
+from unittest import TestCase
+from tvdb_client.clients import ApiV2Client
+from tvdb_client.exceptions import RequestFailedException
+from tvdb_client.models import Episode
+from tvdb_client.utils.json_stream import JSONArrayStream
+from tvdb_client.tests.stub_server import StubTVDBServer, VALID_USERNAME, VALID_API_KEY, VALID_ACCOUNT_IDENTIFIER
+import json
+
+__author__ = 'tsantana'
+
+
+class JSONArrayStreamTestCase(TestCase):
+
+    def __chunks(self, document, size):
+        content = json.dumps(document, ensure_ascii=False, indent=1).encode('utf-8')
+        return [content[i:i + size] for i in range(0, len(content), size)]
+
+    def test_001_items_and_envelope(self):
+        document = {'links': {'first': 1, 'last': 3}, 'data': [{'name': u'Épisode', 'id': 123456}, [1, 2], 12345,
+                                                               'x', None, {}, 7.5], 'errors': {'invalidFilters': []}}
+
+        for size in (1, 2, 3, 7, 64, 4096):
+            stream = JSONArrayStream(self.__chunks(document, size))
+
+            self.assertEqual(document['data'], list(stream), size)
+            self.assertEqual({'links': document['links'], 'errors': document['errors']}, stream.envelope)
+
+    def test_002_items_are_yielded_incrementally(self):
+        chunks = self.__chunks({'links': {'last': 1}, 'data': [{'id': n} for n in range(100)]}, 16)
+        read = []
+
+        def reader():
+            for chunk in chunks:
+                read.append(chunk)
+                yield chunk
+
+        stream = JSONArrayStream(reader())
+
+        self.assertEqual({'id': 0}, next(iter(stream)))
+        self.assertEqual({'links': {'last': 1}}, stream.envelope)
+        self.assertLess(len(read), len(chunks) // 10)
+
+    def test_003_empty_and_invalid_documents(self):
+        self.assertEqual([], list(JSONArrayStream([b'{}'])))
+        self.assertEqual([], list(JSONArrayStream([b'{"data": [], "links": null}'])))
+        self.assertRaises(ValueError, list, JSONArrayStream([b'{"data": [1, 2']))
+        self.assertRaises(ValueError, list, JSONArrayStream([b'[1, 2]']))
+
+
+class StreamingClientTestCase(TestCase):
+
+    def setUp(self):
+        self.stub = StubTVDBServer().start()
+        self.api = ApiV2Client(VALID_USERNAME, VALID_API_KEY, VALID_ACCOUNT_IDENTIFIER)
+        self.api.API_BASE_URL = self.stub.url
+        self.api.login()
+
+    def tearDown(self):
+        self.api.close()
+        self.stub.stop()
+
+    def test_001_stream_series_episodes(self):
+        expected = self.api.get_series_episodes(1, aired_season=2)
+
+        with self.api.get_series_episodes(1, aired_season=2, stream=True) as response:
+            episodes = list(response)
+
+        self.assertEqual(expected['data'], episodes)
+        self.assertEqual(expected['links'], response.links)
+
+        response = self.api.get_series_episodes(1, page=3, stream=True)
+        self.assertEqual(list(range(100201, 100251)), [episode['id'] for episode in response])
+
+    def test_002_stream_updated_and_ratings(self):
+        self.assertEqual(self.api.get_updated(1500000000, 1500086400)['data'],
+                         list(self.api.get_updated(1500000000, 1500086400, stream=True)))
+
+        self.api.add_user_rating('series', 1, 8)
+        self.assertEqual(self.api.get_user_ratings()['data'], list(self.api.get_user_ratings(stream=True)))
+        self.assertEqual(self.api.get_user_ratings('series')['data'],
+                         list(self.api.get_user_ratings('series', stream=True)))
+
+    def test_003_stream_errors_are_raised(self):
+        try:
+            self.api.get_series_episodes(5000, stream=True)
+            self.fail('RequestFailedException expected')
+        except RequestFailedException as e:
+            self.assertEqual(404, e.error['code'])
+
+    def test_004_stream_models(self):
+        self.api.models = True
+
+        episodes = list(self.api.get_series_episodes(2, stream=True))
+
+        self.assertEqual(100, len(episodes))
+        self.assertTrue(all(isinstance(episode, Episode) for episode in episodes))
@@ -0,0 +1,50 @@
+from unittest import TestCase
+from tvdb_client.clients import ApiV2Client
+from tvdb_client.utils.requests_util import RetryPolicy
+from tvdb_client.tests.stub_server import StubTVDBServer, VALID_USERNAME, VALID_API_KEY, VALID_ACCOUNT_IDENTIFIER
+
+__author__ = 'tsantana'
+
+
+class StubFailureInjectionTestCase(TestCase):
+
+    def __client(self, stub, retries=0):
+        api = ApiV2Client(VALID_USERNAME, VALID_API_KEY, VALID_ACCOUNT_IDENTIFIER,
+                          retry_policy=RetryPolicy(retries=retries, backoff_factor=0.001, max_backoff=0.01))
+        api.API_BASE_URL = stub.url
+        api.login()
+        self.addCleanup(api.close)
+        return api
+
+    def test_001_error_rate(self):
+        with StubTVDBServer(error_rate=0.5, error_statuses=(503,), seed=1) as stub:
+            api = self.__client(stub)
+            codes = [api.get_series(1).get('code', 200) for _ in range(100)]
+
+        self.assertEqual({200, 503}, set(codes))
+        self.assertEqual(stub.injected_errors, codes.count(503))
+        self.assertTrue(30 < stub.injected_errors < 70)
+
+    def test_002_errors_are_retried(self):
+        with StubTVDBServer(error_rate=0.3, seed=2) as stub:
+            api = self.__client(stub, retries=5)
+
+            self.assertTrue(all(api.get_series(1)['data']['id'] == 1 for _ in range(20)))
+            self.assertTrue(stub.injected_errors > 0)
+
+    def test_003_rate_limit(self):
+        with StubTVDBServer(rate_limit=2) as stub:
+            api = self.__client(stub)
+            responses = [api.get_series(1) for _ in range(10)]
+
+        self.assertEqual(2, len([response for response in responses if 'data' in response]))
+        self.assertEqual([429] * 8, [response['code'] for response in responses if 'data' not in response])
+        self.assertEqual(8, stub.throttled)
+
+    def test_004_payload_padding(self):
+        with StubTVDBServer(payload_padding=10000) as stub:
+            api = self.__client(stub)
+
+            self.assertEqual(10000, len(api.get_series(1)['data']['overview']) -
+                             len(StubTVDBServer().series(1)['overview']))
+            self.assertTrue(len(api.get_episode(100001)['data']['overview']) > 10000)
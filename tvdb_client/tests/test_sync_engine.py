@@ -0,0 +1,121 @@
+from unittest import TestCase
+from tvdb_client.clients import ApiV2Client
+from tvdb_client.sync import SyncCheckpoint, SyncEngine
+from tvdb_client.utils.cache import MemoryCache
+from tvdb_client.tests.stub_server import StubTVDBServer, VALID_USERNAME, VALID_API_KEY, VALID_ACCOUNT_IDENTIFIER
+import os
+import shutil
+import tempfile
+import threading
+
+__author__ = 'tsantana'
+
+DAY = 24 * 3600
+START = 1600000000
+
+
+class _Mirror(object):
+
+    def __init__(self, fail_on=None):
+        self.fail_on = fail_on
+        self.series = dict()
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, series_id, series, episodes):
+        if series_id == self.fail_on:
+            raise RuntimeError('Mirror is down')
+        with self.lock:
+            self.calls += 1
+            self.series[series_id] = (series['data']['seriesName'], len(episodes) if episodes is not None else None)
+
+
+class SyncEngineTestCase(TestCase):
+
+    def setUp(self):
+        self.stub = StubTVDBServer(series_count=20, episodes_per_series=120).start()
+        self.api = ApiV2Client(VALID_USERNAME, VALID_API_KEY, VALID_ACCOUNT_IDENTIFIER, cache=MemoryCache())
+        self.api.API_BASE_URL = self.stub.url
+        self.api.login()
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        self.api.close()
+        self.stub.stop()
+        shutil.rmtree(self.directory)
+
+    def __series_requests(self):
+        return len([p for m, p, h in self.stub.request_log if p.startswith('/series/') and p.count('/') == 2])
+
+    def test_001_windows_of_one_week(self):
+        mirror = _Mirror()
+        engine = SyncEngine(self.api, mirror, max_workers=4)
+
+        result = engine.run(start_time=START, end_time=START + 10 * DAY)
+
+        self.assertTrue(result.complete)
+        self.assertEqual(2, result.windows)
+        self.assertEqual(40, result.series_synced)
+        self.assertEqual(START + 10 * DAY, result.high_water_mark)
+        self.assertEqual(('Series 7', 120), mirror.series[7])
+        updated = [p for m, p, h in self.stub.request_log if p.startswith('/updated/query')]
+        self.assertEqual(['/updated/query?fromTime=%d&toTime=%d' % (START, START + 7 * DAY),
+                          '/updated/query?fromTime=%d&toTime=%d' % (START + 7 * DAY, START + 10 * DAY)], updated)
+
+    def test_002_series_ids_are_deduplicated(self):
+        engine = SyncEngine(self.api, _Mirror(), include_episodes=False)
+
+        result = engine.run(start_time=START, end_time=START + 7 * DAY)
+
+        self.assertGreater(result.updates, 20)
+        self.assertEqual(20, result.series_synced)
+        self.assertEqual(20, self.__series_requests())
+
+    def test_003_resumes_after_failure(self):
+        path = os.path.join(self.directory, 'sync.db')
+        engine = SyncEngine(self.api, _Mirror(fail_on=5), SyncCheckpoint(path))
+
+        result = engine.run(start_time=START, end_time=START + 3 * DAY)
+
+        self.assertFalse(result.complete)
+        self.assertEqual([5], list(result.failures))
+        self.assertIsNone(result.high_water_mark)
+        engine.checkpoint.close()
+
+        mirror = _Mirror()
+        engine = SyncEngine(self.api, mirror, SyncCheckpoint(path))
+        result = engine.run(end_time=START + 3 * DAY)
+
+        self.assertTrue(result.complete)
+        self.assertEqual([5], list(mirror.series))
+        self.assertEqual(19, result.series_skipped)
+        self.assertEqual(START + 3 * DAY, result.high_water_mark)
+
+        result = engine.run(end_time=START + 3 * DAY)
+        self.assertEqual(0, result.windows)
+
+    def test_004_cached_series_are_refreshed(self):
+        self.api.get_series(3)
+        self.stub.reset_counters()
+
+        SyncEngine(self.api, _Mirror(), include_episodes=False).run(start_time=START, end_time=START + DAY)
+
+        self.assertEqual(20, self.__series_requests())
+
+    def test_005_start_time_required(self):
+        self.assertRaises(ValueError, SyncEngine(self.api, _Mirror()).run)
+
+    def test_006_deleted_series(self):
+        # Series 4 was deleted: TheTVDB still lists it among the updates, but answers 404 for it.
+        self.stub.delete_series(4)
+        deleted = list()
+        mirror = _Mirror()
+        engine = SyncEngine(self.api, mirror, include_episodes=False, deleted_handler=deleted.append)
+
+        result = engine.run(start_time=START, end_time=START + 10 * DAY)
+
+        self.assertTrue(result.complete)
+        self.assertEqual((19 * 2, 2), (result.series_synced, result.series_deleted))
+        self.assertEqual([4, 4], deleted)
+        self.assertNotIn(4, mirror.series)
+        self.assertEqual(START + 10 * DAY, result.high_water_mark)
@@ -0,0 +1,92 @@
+from unittest import TestCase
+from datetime import datetime, timedelta
+from tvdb_client.clients import ApiV2Client
+from tvdb_client.tests.stub_server import StubTVDBServer, VALID_USERNAME, VALID_API_KEY, VALID_ACCOUNT_IDENTIFIER
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+
+__author__ = 'tsantana'
+
+
+class TokenRenewalTestCase(TestCase):
+
+    THREADS = 64
+
+    def setUp(self):
+        self.stub = StubTVDBServer(latency=0.01).start()
+
+    def tearDown(self):
+        self.stub.stop()
+
+    def __make_client(self, **kwargs):
+        api = ApiV2Client(VALID_USERNAME, VALID_API_KEY, VALID_ACCOUNT_IDENTIFIER, pool_size=self.THREADS, **kwargs)
+        api.API_BASE_URL = self.stub.url
+        return api
+
+    def __count(self, path):
+        return len([p for m, p, h in self.stub.request_log if p == path])
+
+    def __stress(self, api, calls):
+        barrier = threading.Barrier(self.THREADS)
+
+        def call(series_id):
+            if series_id <= self.THREADS:
+                barrier.wait()
+            return api.get_series(series_id)
+
+        with ThreadPoolExecutor(max_workers=self.THREADS) as executor:
+            return list(executor.map(call, range(1, calls + 1)))
+
+    def test_001_token_is_not_due_before_login(self):
+        api = self.__make_client()
+
+        self.assertFalse(api.token_needs_renewal())
+        api.close()
+
+    def test_002_single_flight_refresh(self):
+        api = self.__make_client()
+        api.login()
+        api._ApiV2Client__auth_time = datetime.now() - timedelta(hours=23, minutes=1)
+
+        results = self.__stress(api, 4 * self.THREADS)
+
+        self.assertTrue(all('data' in r for r in results))
+        self.assertEqual(1, self.__count('/refresh_token'))
+        self.assertEqual(1, self.__count('/login'))
+        api.close()
+
+    def test_003_single_flight_login_after_expiration(self):
+        api = self.__make_client()
+        api.login()
+        api._ApiV2Client__auth_time = datetime.now() - timedelta(hours=25)
+
+        results = self.__stress(api, 2 * self.THREADS)
+
+        self.assertTrue(all('data' in r for r in results))
+        self.assertEqual(0, self.__count('/refresh_token'))
+        self.assertEqual(2, self.__count('/login'))
+        api.close()
+
+    def test_004_background_renewal(self):
+        api = self.__make_client(background_renewal=True)
+        api.TOKEN_BACKGROUND_RENEWAL_SECONDS = 0.2
+        api.login()
+
+        time.sleep(0.5)
+        self.assertGreaterEqual(self.__count('/refresh_token'), 1)
+
+        api.close()
+        refreshes = self.__count('/refresh_token')
+        time.sleep(0.3)
+        self.assertEqual(refreshes, self.__count('/refresh_token'))
+
+    def test_005_failed_refresh_falls_back_to_login(self):
+        api = self.__make_client()
+        api.login()
+        api._ApiV2Client__token = 'revoked'
+        api._ApiV2Client__auth_time = datetime.now() - timedelta(hours=23, minutes=1)
+
+        self.assertEqual(1, api.get_series(1)['data']['id'])
+        self.assertEqual(2, self.__count('/login'))
+        api.close()
@@ -0,0 +1,56 @@
+from unittest import TestCase
+from tvdb_client.clients import ApiV2Client
+from tvdb_client.utils import requests_util
+from tvdb_client.tests.stub_server import StubTVDBServer, VALID_USERNAME, VALID_API_KEY, VALID_ACCOUNT_IDENTIFIER
+
+__author__ = 'tsantana'
+
+
+class SessionTransportTestCase(TestCase):
+
+    def setUp(self):
+        self.stub = StubTVDBServer().start()
+
+    def tearDown(self):
+        self.stub.stop()
+
+    def __make_client(self, **kwargs):
+        api = ApiV2Client(VALID_USERNAME, VALID_API_KEY, VALID_ACCOUNT_IDENTIFIER, **kwargs)
+        api.API_BASE_URL = self.stub.url
+        return api
+
+    def test_001_pooled_transport_reuses_connection(self):
+        api = self.__make_client()
+        api.login()
+
+        for series_id in range(1, 21):
+            resp = api.get_series(series_id)
+            self.assertEqual(series_id, resp['data']['id'])
+
+        self.assertEqual(21, self.stub.requests)
+        self.assertEqual(1, self.stub.connections)
+        api.close()
+
+    def test_002_no_keep_alive_opens_connection_per_request(self):
+        api = self.__make_client(transport=requests_util.SessionTransport(keep_alive=False))
+        api.login()
+
+        for series_id in range(1, 6):
+            api.get_series(series_id)
+
+        self.assertEqual(6, self.stub.connections)
+        api.close()
+
+    def test_003_provided_transport_is_used(self):
+        transport = requests_util.SessionTransport(pool_maxsize=2)
+        api = self.__make_client(transport=transport)
+        api.login()
+
+        self.assertIs(transport, api.transport)
+        self.assertEqual('Series 3', api.get_series(3)['data']['seriesName'])
+        api.close()
+
+    def test_004_run_request_without_transport(self):
+        resp = requests_util.run_request('get', self.stub.url + '/languages')
+
+        self.assertEqual(401, resp.status_code)
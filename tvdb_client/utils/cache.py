@@ -0,0 +1,300 @@
+# coding: utf-8
+"""
+Response caches for ApiV2Client. A cache maps a request key (method, URL and language) to the parsed response of that
+request for a limited time. Three backends are provided: MemoryCache, for a single process, SQLiteCache, which keeps
+its entries on disk so a warm cache survives process restarts, and RedisCache, shared by the processes of many hosts.
+"""
+from collections import OrderedDict, namedtuple
+import json
+import re
+import sqlite3
+import threading
+import time
+
+__author__ = 'tsantana'
+
+
+class CacheEntry(namedtuple('CacheEntry', ('value', 'expires_at', 'validators'))):
+    """
+    A cached value with the time it expires at and the validators (ETag, Last-Modified and size of the body) of the
+    response it came from, which allow it to be revalidated after it expires.
+    """
+
+    __slots__ = ()
+
+    def is_fresh(self):
+        return self.expires_at >= time.time()
+
+
+def make_cache_key(request_type, url, language=None):
+    """
+    Builds the cache key of a request.
+
+    :param request_type: The HTTP method of the request.
+    :param url: The full URL of the request, including the query string.
+    :param language: The Accept-Language of the request, if any.
+    :return: a str identifying the request.
+    """
+    return '%s %s %s' % (request_type.upper(), url, language or '')
+
+
+class BaseCache(object):
+    """
+    The interface of the response caches. Subclasses implement _load, _store, _remove, _clear and __len__, and this
+    class takes care of expiration and of the hit/miss counters.
+
+    Cached values are shared between callers, so they must not be modified.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.RLock()
+
+    def get(self, key):
+        """
+        Retrieves a value from the cache.
+
+        :param key: The key built by make_cache_key.
+        :return: the cached value, or None if there's no value for the key or it has expired.
+        """
+        entry = self.get_entry(key)
+
+        return entry.value if entry is not None and entry.is_fresh() else None
+
+    def get_entry(self, key):
+        """
+        Retrieves an entry from the cache, even if it has expired, so it can be revalidated. Expired entries are
+        counted as misses.
+
+        :param key: The key built by make_cache_key.
+        :return: a CacheEntry, or None if there's no entry for the key.
+        """
+        with self._lock:
+            entry = self._load(key)
+
+            if entry is not None and entry.is_fresh():
+                self.hits += 1
+            else:
+                self.misses += 1
+
+            return entry
+
+    def set(self, key, value, ttl, validators=None):
+        """
+        Stores a value in the cache, evicting the least recently used entries if the cache is full.
+
+        :param key: The key built by make_cache_key.
+        :param value: The value to be cached.
+        :param ttl: The number of seconds the value is valid for.
+        :param validators: An optional python dictionary with the validators of the response the value came from.
+        :return: None
+        """
+        with self._lock:
+            self._store(key, CacheEntry(value, time.time() + ttl, validators))
+
+    def delete(self, key):
+        with self._lock:
+            self._remove(key)
+
+    def delete_prefix(self, prefix):
+        """
+        Removes all entries whose key starts with the prefix provided.
+
+        :param prefix: The start of the keys to remove.
+        :return: the number of entries removed.
+        """
+        with self._lock:
+            return self._remove_prefix(prefix)
+
+    def clear(self):
+        with self._lock:
+            self._clear()
+
+    def stats(self):
+        """
+        :return: a python dictionary with the hit, miss and eviction counters and the current number of entries.
+        """
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions, 'entries': len(self)}
+
+    def _load(self, key):
+        raise NotImplementedError()
+
+    def _store(self, key, entry):
+        raise NotImplementedError()
+
+    def _remove(self, key):
+        raise NotImplementedError()
+
+    def _remove_prefix(self, prefix):
+        raise NotImplementedError()
+
+    def _clear(self):
+        raise NotImplementedError()
+
+    def __len__(self):
+        raise NotImplementedError()
+
+
+class MemoryCache(BaseCache):
+    """
+    An in-process LRU cache.
+    """
+
+    def __init__(self, max_entries=1024):
+        super(MemoryCache, self).__init__(max_entries)
+        self.__entries = OrderedDict()
+
+    def _load(self, key):
+        entry = self.__entries.get(key)
+        if entry is not None:
+            self.__entries.move_to_end(key)
+        return entry
+
+    def _store(self, key, entry):
+        self.__entries[key] = entry
+        self.__entries.move_to_end(key)
+
+        while len(self.__entries) > self.max_entries:
+            self.__entries.popitem(last=False)
+            self.evictions += 1
+
+    def _remove(self, key):
+        self.__entries.pop(key, None)
+
+    def _remove_prefix(self, prefix):
+        keys = [key for key in self.__entries if key.startswith(prefix)]
+        for key in keys:
+            del self.__entries[key]
+        return len(keys)
+
+    def _clear(self):
+        self.__entries.clear()
+
+    def __len__(self):
+        return len(self.__entries)
+
+
+class SQLiteCache(BaseCache):
+    """
+    An LRU cache persisted to a SQLite database file. Values are stored as JSON.
+    """
+
+    def __init__(self, path, max_entries=100000):
+        """
+        :param path: The path of the SQLite database file. It's created if it doesn't exist.
+        :param max_entries: The maximum number of entries kept in the database.
+        """
+        super(SQLiteCache, self).__init__(max_entries)
+        self.path = path
+        self.__connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.__connection.execute('PRAGMA journal_mode=WAL')
+        self.__connection.execute('CREATE TABLE IF NOT EXISTS response_cache (key TEXT PRIMARY KEY, '
+                                  'value TEXT NOT NULL, expires_at REAL NOT NULL, validators TEXT, '
+                                  'accessed INTEGER NOT NULL)')
+        if 'validators' not in [column[1] for column in self.__connection.execute('PRAGMA table_info(response_cache)')]:
+            self.__connection.execute('ALTER TABLE response_cache ADD COLUMN validators TEXT')
+        self.__connection.execute('CREATE INDEX IF NOT EXISTS response_cache_accessed ON response_cache (accessed)')
+        self.__clock, self.__count = self.__connection.execute('SELECT COALESCE(MAX(accessed), 0), COUNT(*) '
+                                                               'FROM response_cache').fetchone()
+
+    def __tick(self):
+        self.__clock += 1
+        return self.__clock
+
+    def _load(self, key):
+        row = self.__connection.execute('SELECT value, expires_at, validators FROM response_cache WHERE key = ?',
+                                        (key,)).fetchone()
+        if row is None:
+            return None
+
+        self.__connection.execute('UPDATE response_cache SET accessed = ? WHERE key = ?', (self.__tick(), key))
+        return CacheEntry(json.loads(row[0]), row[1], json.loads(row[2]) if row[2] else None)
+
+    def _store(self, key, entry):
+        if self.__connection.execute('SELECT 1 FROM response_cache WHERE key = ?', (key,)).fetchone() is None:
+            self.__count += 1
+        validators = json.dumps(entry.validators) if entry.validators else None
+        self.__connection.execute('INSERT OR REPLACE INTO response_cache '
+                                  '(key, value, expires_at, validators, accessed) VALUES (?, ?, ?, ?, ?)',
+                                  (key, json.dumps(entry.value), entry.expires_at, validators, self.__tick()))
+
+        excess = self.__count - self.max_entries
+        if excess > 0:
+            self.__connection.execute('DELETE FROM response_cache WHERE key IN '
+                                      '(SELECT key FROM response_cache ORDER BY accessed LIMIT ?)', (excess,))
+            self.__count -= excess
+            self.evictions += excess
+
+    def _remove(self, key):
+        self.__count -= self.__connection.execute('DELETE FROM response_cache WHERE key = ?', (key,)).rowcount
+
+    def _remove_prefix(self, prefix):
+        removed = self.__connection.execute('DELETE FROM response_cache WHERE key >= ? AND key < ?',
+                                            (prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1))).rowcount
+        self.__count -= removed
+        return removed
+
+    def _clear(self):
+        self.__connection.execute('DELETE FROM response_cache')
+        self.__count = 0
+
+    def __len__(self):
+        return self.__count
+
+    def close(self):
+        self.__connection.close()
+
+
+class RedisCache(BaseCache):
+    """
+    A cache shared by processes and hosts through Redis (or any server speaking its protocol). Values are stored as
+    JSON, and entries are kept stale_seconds after they expire so they can still be revalidated. Redis evicts entries
+    according to its own maxmemory-policy, so there's no max_entries.
+    """
+
+    def __init__(self, client, prefix='tvdb_client:cache:', stale_seconds=24 * 3600):
+        """
+        :param client: A redis.Redis client (or any object with its get, set, delete and scan_iter methods).
+        :param prefix: The prefix of the keys of the cache in Redis.
+        :param stale_seconds: The number of seconds entries are kept after they expire.
+        """
+        super(RedisCache, self).__init__(None)
+        self.client = client
+        self.prefix = prefix
+        self.stale_seconds = stale_seconds
+
+    def __keys(self, prefix):
+        # Keys are URLs, whose ? and brackets are glob patterns to SCAN.
+        return list(self.client.scan_iter(match=re.sub(r'([\\*?\[\]])', r'\\\1', self.prefix + prefix) + '*'))
+
+    def _load(self, key):
+        value = self.client.get(self.prefix + key)
+        if value is None:
+            return None
+
+        entry = json.loads(value)
+        return CacheEntry(entry['value'], entry['expires_at'], entry.get('validators'))
+
+    def _store(self, key, entry):
+        expires_in = max(1, int((entry.expires_at - time.time() + self.stale_seconds) * 1000))
+        self.client.set(self.prefix + key, json.dumps({'value': entry.value, 'expires_at': entry.expires_at,
+                                                       'validators': entry.validators}), px=expires_in)
+
+    def _remove(self, key):
+        self.client.delete(self.prefix + key)
+
+    def _remove_prefix(self, prefix):
+        keys = self.__keys(prefix)
+        if keys:
+            self.client.delete(*keys)
+        return len(keys)
+
+    def _clear(self):
+        self._remove_prefix('')
+
+    def __len__(self):
+        return len(self.__keys(''))
@@ -0,0 +1,219 @@
+# coding: utf-8
+"""
+Record and replay of the requests of a client. A CassetteTransport records the responses of the requests sent through
+it to an archive (a SQLite database file, with the bodies compressed) and replays them from it later without any network
+access, i.e. to run CI against a recorded crawl or to reprocess one.
+
+Requests are matched by a normalized key (see cassette_key): the method, the URL with its query parameters sorted, the
+Accept-Language, the conditional headers and a digest of the body, so the token or the order of the parameters don't
+matter.
+"""
+from tvdb_client.exceptions import CassetteMissException
+from tvdb_client.utils.cache import make_cache_key
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import zlib
+
+__author__ = 'tsantana'
+
+RECORD = 'record'
+REPLAY = 'replay'
+AUTO = 'auto'
+
+# The paths whose request body is left out of the key: the credentials sent to /login must not prevent a replay with
+# other credentials.
+UNMATCHED_BODY_PATHS = ('/login',)
+
+# The headers of the conditional requests revalidating cached responses, answered 304 (Not Modified) with no body: they
+# must not replace the response of the unconditional request.
+CONDITIONAL_HEADERS = ('If-None-Match', 'If-Modified-Since')
+
+
+def cassette_key(request_type, url, data=None, headers=None):
+    """
+    Builds the normalized key of a request.
+
+    :param request_type: The HTTP method of the request.
+    :param url: The full url of the request.
+    :param data: The query parameters (GET) or body (other methods) of the request, if any.
+    :param headers: The headers of the request, if any. Only Accept-Language and CONDITIONAL_HEADERS are part of the
+    key.
+    :return: a str identifying the request.
+    """
+    request_type = request_type.upper()
+    headers = headers or {}
+    split_url = urlsplit(url)
+    query = parse_qsl(split_url.query, keep_blank_values=True)
+    body_digest = None
+
+    if request_type == 'GET':
+        query.extend((data or {}).items())
+    elif data and not split_url.path.endswith(UNMATCHED_BODY_PATHS):
+        body = data if isinstance(data, bytes) else str(data).encode('utf-8')
+        body_digest = hashlib.sha1(body).hexdigest()
+
+    url = urlunsplit((split_url.scheme, split_url.netloc.lower(), split_url.path,
+                      urlencode(sorted((str(k), str(v)) for k, v in query)), ''))
+    key = make_cache_key(request_type, url, headers.get('Accept-Language'))
+    conditions = ['%s=%s' % (name, headers[name]) for name in CONDITIONAL_HEADERS if headers.get(name)]
+
+    return ' '.join([key] + conditions + ([body_digest] if body_digest else []))
+
+
+def build_response(url, status_code, headers, content):
+    """
+    Builds a requests.Response whose body has been read already, as the ones replayed by CassetteTransport.
+    """
+    response = Response()
+    response.url = url
+    response.status_code = status_code
+    response.headers = CaseInsensitiveDict(headers)
+    response.encoding = 'utf-8'
+    response._content = content
+    response._content_consumed = True
+    return response
+
+
+class CassetteTransport(object):
+    """
+    A transport (see requests_util.SessionTransport) recording responses to, and replaying them from, a SQLite archive.
+
+    In REPLAY mode every request is answered from the archive, and requests not found in it raise
+    CassetteMissException. In RECORD mode every request is sent through the wrapped transport and its response is
+    stored, replacing any previous one. In AUTO mode requests found in the archive are replayed and the others are sent
+    and recorded, which resumes an interrupted recording.
+
+    Lookups go through the primary key index of the archive, whose pages are memory mapped, so replays are bound by
+    the disk (or the page cache) rather than by the network.
+    """
+
+    COMMIT_EVERY = 1000
+
+    def __init__(self, path, mode=REPLAY, transport=None, compression_level=6):
+        """
+        :param path: The path of the archive file. It's created if it doesn't exist.
+        :param mode: REPLAY, RECORD or AUTO.
+        :param transport: The transport the requests are sent through in RECORD and AUTO modes. A pooled
+        requests_util.SessionTransport if none is provided.
+        :param compression_level: The zlib level the bodies are compressed with.
+        """
+        if mode not in (RECORD, REPLAY, AUTO):
+            raise ValueError('Unknown cassette mode %r: use record, replay or auto.' % mode)
+
+        if transport is None and mode != REPLAY:
+            from tvdb_client.utils.requests_util import SessionTransport
+            transport = SessionTransport()
+
+        self.path = path
+        self.mode = mode
+        self.transport = transport
+        self.compression_level = compression_level
+        self.hits = 0
+        self.misses = 0
+        self.recorded = 0
+        self.__pending = 0
+        self.__lock = threading.Lock()
+        self.__connection = sqlite3.connect(path, check_same_thread=False)
+        self.__connection.execute('PRAGMA journal_mode=WAL')
+        self.__connection.execute('PRAGMA mmap_size=%d' % (1 << 30))
+        self.__connection.execute('CREATE TABLE IF NOT EXISTS cassette (key TEXT PRIMARY KEY, url TEXT NOT NULL, '
+                                  'status INTEGER NOT NULL, headers TEXT NOT NULL, body BLOB NOT NULL, '
+                                  'recorded_at REAL NOT NULL) WITHOUT ROWID')
+        self.__connection.commit()
+
+    def __len__(self):
+        with self.__lock:
+            return self.__connection.execute('SELECT COUNT(*) FROM cassette').fetchone()[0]
+
+    def request(self, request_type, url, data=None, headers=None, stream=False, timeout=None):
+        key = cassette_key(request_type, url, data, headers)
+
+        if self.mode != RECORD:
+            response = self.replay(key)
+            if response is not None:
+                return response
+            if self.mode == REPLAY:
+                raise CassetteMissException('No recorded response for %s' % key, key)
+
+        options = dict()
+        if stream:
+            options['stream'] = True
+        if timeout is not None:
+            options['timeout'] = timeout
+        response = self.transport.request(request_type, url, data=data, headers=headers, **options)
+        self.record(key, response)
+        return response
+
+    def replay(self, key):
+        """
+        :param key: The key of a request, built by cassette_key.
+        :return: the recorded requests.Response of the request, or None if it wasn't recorded.
+        """
+        with self.__lock:
+            row = self.__connection.execute('SELECT url, status, headers, body FROM cassette WHERE key = ?',
+                                            (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+
+        url, status, headers, body = row
+        return build_response(url, status, json.loads(headers), zlib.decompress(body))
+
+    def record(self, key, response):
+        """
+        Stores the response of a request, reading its body if it was not read yet.
+
+        :param key: The key of the request, built by cassette_key.
+        :param response: The requests.Response of the request.
+        :return: None
+        """
+        content = response.content or b''
+        body = zlib.compress(content, self.compression_level)
+        # The body is stored decoded, so it's replayed as such.
+        headers = dict((name, value) for name, value in response.headers.items()
+                       if name.lower() not in ('content-encoding', 'transfer-encoding'))
+        headers['Content-Length'] = str(len(content))
+        headers = json.dumps(headers)
+
+        with self.__lock:
+            self.__connection.execute('INSERT OR REPLACE INTO cassette (key, url, status, headers, body, recorded_at) '
+                                      'VALUES (?, ?, ?, ?, ?, ?)',
+                                      (key, response.url, response.status_code, headers, body, time.time()))
+            self.recorded += 1
+            self.__pending += 1
+            if self.__pending >= self.COMMIT_EVERY:
+                self.__commit()
+
+    def __commit(self):
+        self.__connection.commit()
+        self.__pending = 0
+
+    def flush(self):
+        """
+        Commits the responses recorded so far to the archive.
+
+        :return: None
+        """
+        with self.__lock:
+            self.__commit()
+
+    def stats(self):
+        """
+        :return: a python dictionary with the number of requests replayed (hits), not found (misses) and recorded.
+        """
+        with self.__lock:
+            return {'hits': self.hits, 'misses': self.misses, 'recorded': self.recorded}
+
+    def close(self):
+        with self.__lock:
+            self.__commit()
+            self.__connection.close()
+        if self.transport is not None:
+            self.transport.close()
@@ -0,0 +1,432 @@
+# coding: utf-8
+"""
+Instrumentation of the requests sent by ApiV2Client. An Instrumentation passed to a client (instrumentation=...) times
+every request per endpoint and counts retries, token renewals, cache hits and misses and payload sizes. Hooks are
+notified before and after every request and of every event, which is how the StatsD and OpenTelemetry integrations
+plug in, while PrometheusExporter renders the metrics collected in the Prometheus text format.
+
+Clients without an Instrumentation only pay an `is None` check per request.
+"""
+from tvdb_client.utils import utils
+from bisect import bisect_left
+import socket
+import threading
+import time
+import warnings
+
+try:
+    from opentelemetry import trace
+except ImportError:  # pragma: no cover
+    trace = None
+
+__author__ = 'tsantana'
+
+# Seconds.
+TIME_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Bytes.
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+# The histograms recorded per endpoint, and their buckets:
+#   request_seconds: the whole request, retries and backoffs included.
+#   response_seconds: the last attempt up to its response headers: connection (DNS, TCP and TLS when not pooled),
+#       upload and TheTVDB processing time. Only available for transports returning requests.Response.
+#   download_seconds: the rest of the last attempt, reading the body. Not recorded for streamed responses.
+#   parse_seconds: decoding the JSON body.
+#   auth_seconds: building the Authorization header, token renewals included (recorded without endpoint).
+#   response_bytes: the size of the body.
+HISTOGRAM_BUCKETS = {
+    'request_seconds': TIME_BUCKETS,
+    'response_seconds': TIME_BUCKETS,
+    'download_seconds': TIME_BUCKETS,
+    'parse_seconds': TIME_BUCKETS,
+    'auth_seconds': TIME_BUCKETS,
+    'response_bytes': SIZE_BUCKETS,
+}
+
+
+class Histogram(object):
+    """
+    A thread-safe histogram of cumulative buckets, as Prometheus defines them.
+    """
+
+    def __init__(self, buckets=TIME_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.__lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect_left(self.buckets, value)
+        with self.__lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def cumulative_counts(self):
+        """
+        :return: a list of tuples (upper bound, number of observations up to it), the last bound being infinity.
+        """
+        with self.__lock:
+            counts = list(self.counts)
+
+        total, cumulative = 0, list()
+        for bound, count in zip(self.buckets + (float('inf'),), counts):
+            total += count
+            cumulative.append((bound, total))
+        return cumulative
+
+    def quantile(self, q):
+        """
+        Estimates a quantile by linear interpolation within the bucket it falls in.
+
+        :param q: The quantile, between 0 and 1 (i.e. 0.99).
+        :return: the estimated value, or None if nothing was observed.
+        """
+        cumulative = self.cumulative_counts()
+        count = cumulative[-1][1]
+        if not count:
+            return None
+
+        rank = q * count
+        lower_bound, lower_count = 0.0, 0
+        for bound, total in cumulative:
+            if total >= rank:
+                if bound == float('inf'):
+                    return lower_bound
+                return lower_bound + (bound - lower_bound) * (rank - lower_count) / float(total - lower_count)
+            lower_bound, lower_count = bound, total
+
+    def snapshot(self):
+        return {'count': self.count, 'sum': self.sum, 'p50': self.quantile(0.5), 'p99': self.quantile(0.99)}
+
+
+class RequestContext(object):
+    """
+    The state of a request being instrumented, handed to the hooks. Hooks may add their own attributes to it (i.e. a
+    tracing span) and, before the request, headers to send.
+    """
+
+    def __init__(self, method, url, headers):
+        self.method = method.upper()
+        self.url = url
+        self.endpoint = utils.endpoint_from_url(url)
+        self.headers = headers
+        self.started_at = time.perf_counter()
+        self.seconds = None
+        self.attempts = 0
+        self.last_attempt_seconds = None
+        self.response = None
+        self.status_code = None
+        self.response_bytes = None
+        self.error = None
+
+    @property
+    def retries(self):
+        return max(0, self.attempts - 1)
+
+    def attempt_finished(self, attempt, response, seconds):
+        self.attempts = attempt + 1
+        self.last_attempt_seconds = seconds
+
+
+class InstrumentationHook(object):
+    """
+    The base class of the hooks of an Instrumentation. Every method does nothing, so hooks only override what they need.
+    Hooks are called from the threads sending the requests, so they must be thread-safe and fast.
+    """
+
+    def before_request(self, context):
+        """
+        :param context: The RequestContext of the request about to be sent.
+        """
+        pass
+
+    def after_request(self, context):
+        """
+        :param context: The RequestContext of the request just finished, with its status_code, response_bytes, seconds
+        and retries, or its error.
+        """
+        pass
+
+    def event(self, name, endpoint, value):
+        """
+        :param name: The name of the counter incremented, i.e. cache_hits, retries or token_refreshes.
+        :param endpoint: The endpoint it's incremented for, if any.
+        :param value: The increment.
+        """
+        pass
+
+
+class Instrumentation(object):
+    """
+    Collects the metrics of the requests of one or many clients, and notifies its hooks.
+    """
+
+    def __init__(self, hooks=None, histogram_buckets=None):
+        """
+        :param hooks: An optional list of InstrumentationHook.
+        :param histogram_buckets: An optional python dictionary of histogram name to buckets, merged over
+        HISTOGRAM_BUCKETS.
+        """
+        self.hooks = list(hooks or [])
+        self.histogram_buckets = dict(HISTOGRAM_BUCKETS)
+        self.histogram_buckets.update(histogram_buckets or {})
+        self.histograms = dict()
+        self.counters = dict()
+        self.__lock = threading.Lock()
+
+    def add_hook(self, hook):
+        self.hooks.append(hook)
+
+    def __histogram(self, name, endpoint):
+        histogram = self.histograms.get((name, endpoint))
+        if histogram is None:
+            with self.__lock:
+                histogram = self.histograms.setdefault((name, endpoint),
+                                                       Histogram(self.histogram_buckets.get(name, TIME_BUCKETS)))
+        return histogram
+
+    def observe(self, name, endpoint, value):
+        """
+        Records a value in the histogram of the given name and endpoint.
+
+        :param name: The name of the histogram, i.e. parse_seconds.
+        :param endpoint: The endpoint of the value (i.e. /series/{id}), or None.
+        :param value: The value observed.
+        :return: None
+        """
+        self.__histogram(name, endpoint).observe(value)
+
+    def increment(self, name, endpoint=None, value=1):
+        """
+        Increments the counter of the given name and endpoint and notifies the hooks.
+
+        :param name: The name of the counter, i.e. cache_hits.
+        :param endpoint: The endpoint of the event (i.e. /series/{id}), or None.
+        :param value: The increment.
+        :return: None
+        """
+        with self.__lock:
+            self.counters[(name, endpoint)] = self.counters.get((name, endpoint), 0) + value
+
+        for hook in self.hooks:
+            self.__call_hook(hook.event, name, endpoint, value)
+
+    @staticmethod
+    def __call_hook(method, *args):
+        try:
+            method(*args)
+        except Exception as e:
+            warnings.warn('Instrumentation hook %r failed: %s' % (method, e))
+
+    def start_request(self, method, url, headers):
+        """
+        :param method: The HTTP method of the request.
+        :param url: The full url of the request.
+        :param headers: The python dictionary of the headers of the request, which hooks may add to.
+        :return: the RequestContext of the request, to pass to finish_request once it's done.
+        """
+        context = RequestContext(method, url, headers)
+
+        for hook in self.hooks:
+            self.__call_hook(hook.before_request, context)
+
+        return context
+
+    def finish_request(self, context, response=None, error=None, stream=False):
+        """
+        Records the metrics of a request and notifies the hooks.
+
+        :param context: The RequestContext returned by start_request.
+        :param response: The response of the last attempt, if any.
+        :param error: The exception the request failed with, if any.
+        :param stream: Whether the body of the response was left unread.
+        :return: None
+        """
+        context.seconds = time.perf_counter() - context.started_at
+        context.response = response
+        context.error = error
+        endpoint = context.endpoint
+
+        self.observe('request_seconds', endpoint, context.seconds)
+        self.increment('requests', endpoint)
+        if context.retries:
+            self.increment('retries', endpoint, context.retries)
+
+        if response is not None:
+            context.status_code = response.status_code
+            if stream:
+                length = response.headers.get('Content-Length')
+                context.response_bytes = int(length) if length and length.isdigit() else None
+            else:
+                context.response_bytes = len(response.content or b'')
+
+            elapsed = getattr(response, 'elapsed', None)
+            if elapsed is not None:
+                response_seconds = elapsed.total_seconds()
+                self.observe('response_seconds', endpoint, response_seconds)
+                if not stream and context.last_attempt_seconds is not None:
+                    self.observe('download_seconds', endpoint,
+                                 max(0.0, context.last_attempt_seconds - response_seconds))
+
+            if context.response_bytes is not None:
+                self.observe('response_bytes', endpoint, context.response_bytes)
+
+        if error is not None or response is None or response.status_code >= 400:
+            self.increment('errors', endpoint)
+
+        for hook in self.hooks:
+            self.__call_hook(hook.after_request, context)
+
+    def metrics(self):
+        """
+        :return: a tuple (counters, histograms) of copies of the counters and histograms dictionaries, which can be
+        iterated over while requests add new endpoints to them.
+        """
+        with self.__lock:
+            return dict(self.counters), dict(self.histograms)
+
+    def snapshot(self):
+        """
+        :return: a python dictionary with the counters (keyed by (name, endpoint)) and a summary (count, sum, p50 and
+        p99) of every histogram (keyed by (name, endpoint) as well).
+        """
+        counters, histograms = self.metrics()
+
+        return {'counters': counters,
+                'histograms': dict((key, histogram.snapshot()) for key, histogram in histograms.items())}
+
+
+class PrometheusExporter(object):
+    """
+    Renders the metrics of an Instrumentation in the Prometheus text exposition format, i.e. to be served on a
+    /metrics endpoint of the application.
+    """
+
+    CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+    def __init__(self, instrumentation, namespace='tvdb_client'):
+        self.instrumentation = instrumentation
+        self.namespace = namespace
+
+    @staticmethod
+    def __labels(endpoint, **extra):
+        labels = [('endpoint', endpoint)] if endpoint is not None else []
+        labels.extend(sorted(extra.items()))
+        if not labels:
+            return ''
+        return '{%s}' % ','.join('%s="%s"' % (k, str(v).replace('\\', '\\\\').replace('"', '\\"'))
+                                 for k, v in labels)
+
+    @staticmethod
+    def __format(value):
+        if value == float('inf'):
+            return '+Inf'
+        return repr(float(value)) if isinstance(value, float) else str(value)
+
+    def render(self):
+        """
+        :return: the text of the metrics.
+        """
+        counters, histograms = self.instrumentation.metrics()
+        lines = list()
+
+        counters = sorted(counters.items(), key=lambda item: (item[0][0], item[0][1] or ''))
+        for i, ((name, endpoint), value) in enumerate(counters):
+            metric = '%s_%s_total' % (self.namespace, name)
+            if i == 0 or counters[i - 1][0][0] != name:
+                lines.append('# TYPE %s counter' % metric)
+            lines.append('%s%s %s' % (metric, self.__labels(endpoint), value))
+
+        histograms = sorted(histograms.items(), key=lambda item: (item[0][0], item[0][1] or ''))
+        for i, ((name, endpoint), histogram) in enumerate(histograms):
+            metric = '%s_%s' % (self.namespace, name)
+            if i == 0 or histograms[i - 1][0][0] != name:
+                lines.append('# TYPE %s histogram' % metric)
+            cumulative = histogram.cumulative_counts()
+            for bound, count in cumulative:
+                lines.append('%s_bucket%s %d' % (metric, self.__labels(endpoint, le=self.__format(bound)), count))
+            lines.append('%s_sum%s %s' % (metric, self.__labels(endpoint), self.__format(histogram.sum)))
+            lines.append('%s_count%s %d' % (metric, self.__labels(endpoint), cumulative[-1][1]))
+
+        return '\n'.join(lines) + '\n'
+
+
+class StatsDHook(InstrumentationHook):
+    """
+    Sends the timings, sizes and events of the requests to a StatsD server over UDP, i.e.
+    tvdb_client.series_id.request:12.5|ms. Packets are fire and forget: a missing server never slows requests down.
+    """
+
+    def __init__(self, host='localhost', port=8125, prefix='tvdb_client'):
+        self.address = (host, port)
+        self.prefix = prefix
+        self.__socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def __metric(self, endpoint, name):
+        parts = [self.prefix]
+        if endpoint:
+            parts.append('_'.join(part.strip('{}') for part in endpoint.strip('/').split('/')) or 'root')
+        parts.append(name)
+        return '.'.join(parts)
+
+    def __send(self, lines):
+        try:
+            self.__socket.sendto('\n'.join(lines).encode('utf-8'), self.address)
+        except (socket.error, OSError):
+            pass
+
+    def after_request(self, context):
+        lines = ['%s:%.3f|ms' % (self.__metric(context.endpoint, 'request'), context.seconds * 1000.0),
+                 '%s:1|c' % self.__metric(context.endpoint, 'status.%s' % (context.status_code or 'error'))]
+        if context.response_bytes is not None:
+            lines.append('%s:%d|h' % (self.__metric(context.endpoint, 'response_bytes'), context.response_bytes))
+        self.__send(lines)
+
+    def event(self, name, endpoint, value):
+        if name not in ('requests', 'errors'):
+            self.__send(['%s:%d|c' % (self.__metric(endpoint, name), value)])
+
+    def close(self):
+        self.__socket.close()
+
+
+class OpenTelemetryHook(InstrumentationHook):
+    """
+    Wraps every request in an OpenTelemetry client span and propagates its trace context in the request headers.
+    Requires the opentelemetry-api package.
+    """
+
+    def __init__(self, tracer=None):
+        """
+        :param tracer: An optional opentelemetry Tracer. If none is provided, the one of the global tracer provider is
+        used.
+        :raise ImportError: if opentelemetry is not installed.
+        """
+        if trace is None:
+            raise ImportError('OpenTelemetryHook requires the opentelemetry-api package.')
+
+        from opentelemetry import propagate
+        self.__inject = propagate.inject
+        self.tracer = tracer if tracer is not None else trace.get_tracer('tvdb_client')
+
+    def before_request(self, context):
+        context.span = self.tracer.start_span('%s %s' % (context.method, context.endpoint), kind=trace.SpanKind.CLIENT,
+                                              attributes={'http.method': context.method, 'http.url': context.url,
+                                                          'http.route': context.endpoint})
+        self.__inject(context.headers, context=trace.set_span_in_context(context.span))
+
+    def after_request(self, context):
+        span = context.span
+        span.set_attribute('http.retries', context.retries)
+        if context.status_code is not None:
+            span.set_attribute('http.status_code', context.status_code)
+        if context.response_bytes is not None:
+            span.set_attribute('http.response_content_length', context.response_bytes)
+
+        if context.error is not None:
+            span.record_exception(context.error)
+        if context.error is not None or context.status_code is None or context.status_code >= 500:
+            span.set_status(trace.Status(trace.StatusCode.ERROR))
+        span.end()
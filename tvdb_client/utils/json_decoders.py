@@ -0,0 +1,69 @@
+# coding: utf-8
+"""
+JSON decoders for the bodies of the responses. They all parse the bytes of the body directly, with no intermediate str
+copy. orjson and ujson are used when installed, as they're several times faster than the json module on the large
+episode and image pages; the json module is the fallback.
+"""
+import json
+import sys
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+from tvdb_client.utils.utils import make_str_content
+
+__author__ = 'tsantana'
+
+PREFERENCE = ('orjson', 'ujson', 'json')
+
+
+def stdlib_decode(content):
+    """
+    Decodes with the json module, which parses bytes (detecting their encoding) since python 3.6.
+
+    :param content: The bytes (or str) of a JSON document.
+    :return: the decoded python object.
+    """
+    if isinstance(content, bytes) and sys.version_info < (3, 6):
+        content = make_str_content(content)
+
+    return json.loads(content)
+
+
+DECODERS = {
+    'orjson': orjson.loads if orjson is not None else None,
+    'ujson': ujson.loads if ujson is not None else None,
+    'json': stdlib_decode,
+}
+
+
+def available_decoders():
+    """
+    :return: the names of the decoders that can be used, fastest first.
+    """
+    return [name for name in PREFERENCE if DECODERS[name] is not None]
+
+
+def get_decoder(name=None):
+    """
+    Finds a decoder by name.
+
+    :param name: One of orjson, ujson or json. If none is provided, the fastest decoder installed is returned.
+    :return: a function decoding the bytes of a JSON document into a python object.
+    :raise ValueError: if the decoder is unknown or its library is not installed.
+    """
+    if name is None:
+        name = available_decoders()[0]
+
+    if DECODERS.get(name) is None:
+        raise ValueError('JSON decoder %s is not available. Available decoders: %s.' %
+                         (name, ', '.join(available_decoders())))
+
+    return DECODERS[name]
@@ -0,0 +1,165 @@
+# coding: utf-8
+"""
+Incremental parsing of the large list responses of TheTVDB ({"links": {...}, "data": [...], "errors": {...}}), so the
+items of data are handed to the caller as soon as they're received instead of once the whole body is buffered and
+decoded.
+"""
+import codecs
+import json
+
+__author__ = 'tsantana'
+
+WHITESPACE = ' \t\n\r'
+NUMBER_CHARACTERS = '0123456789.eE+-'
+
+
+class JSONArrayStream(object):
+    """
+    Parses a JSON object read from an iterable of byte chunks, yielding the items of one of its array members (data,
+    by default) one at a time. Every other member (links, errors...) is decoded as a whole and kept in envelope, which
+    is complete once the iteration is over. Only the item (or member) being decoded is held in memory.
+    """
+
+    def __init__(self, chunks, key='data'):
+        """
+        :param chunks: An iterable of bytes, i.e. requests.Response.iter_content().
+        :param key: The name of the array member whose items are yielded.
+        """
+        self.key = key
+        self.envelope = dict()
+        self.__chunks = iter(chunks)
+        self.__text_decoder = codecs.getincrementaldecoder('utf-8')()
+        self.__json_decoder = json.JSONDecoder()
+        self.__buffer = ''
+        self.__position = 0
+        self.__eof = False
+
+    def __fill(self):
+        """
+        Reads the next chunk into the buffer, dropping what has been parsed already.
+
+        :return: False if the chunks are over.
+        """
+        if self.__eof:
+            return False
+
+        chunk = next(self.__chunks, None)
+        if chunk is None:
+            self.__eof = True
+            text = self.__text_decoder.decode(b'', final=True)
+        else:
+            text = self.__text_decoder.decode(chunk)
+
+        self.__buffer = self.__buffer[self.__position:] + text
+        self.__position = 0
+        return True
+
+    def __peek(self):
+        """
+        :return: the next character which is not whitespace, without consuming it, or '' at the end of the document.
+        """
+        while True:
+            while self.__position < len(self.__buffer) and self.__buffer[self.__position] in WHITESPACE:
+                self.__position += 1
+            if self.__position < len(self.__buffer) or not self.__fill():
+                return self.__buffer[self.__position:self.__position + 1]
+
+    def __expect(self, characters):
+        character = self.__peek()
+        if not character or character not in characters:
+            raise ValueError('Expected one of %r at position %d of the JSON stream, got %r.' %
+                             (characters, self.__position, character))
+        self.__position += 1
+        return character
+
+    def __value(self):
+        self.__peek()
+        while True:
+            try:
+                value, end = self.__json_decoder.raw_decode(self.__buffer, self.__position)
+            except ValueError:
+                if not self.__fill():
+                    raise
+                continue
+
+            # A number at the end of the buffer may be the start of a longer one, so it's decoded again once more of
+            # the document is read. Filling the buffer moves the value to its start.
+            if (end < len(self.__buffer) and self.__buffer[end] not in NUMBER_CHARACTERS) or self.__eof:
+                self.__position = end
+                return value
+            self.__fill()
+
+    def __iter__(self):
+        self.__expect('{')
+        if self.__peek() == '}':
+            return
+
+        while True:
+            key = self.__value()
+            self.__expect(':')
+
+            if key == self.key and self.__peek() == '[':
+                self.__position += 1
+                if self.__peek() == ']':
+                    self.__position += 1
+                else:
+                    while True:
+                        yield self.__value()
+                        if self.__expect(',]') == ']':
+                            break
+            else:
+                self.envelope[key] = self.__value()
+
+            if self.__expect(',}') == '}':
+                return
+
+
+class StreamedResponse(object):
+    """
+    A successful list response being streamed from TheTVDB. Iterating over it yields the items of its data as they're
+    received; links and errors are available once they've been read, which is at the latest when the iteration is
+    over. The connection is released when the iteration ends or when close is called, so it should be used as a
+    context manager if it may not be consumed entirely.
+    """
+
+    def __init__(self, raw_response, model=None, chunk_size=64 * 1024):
+        """
+        :param raw_response: The requests.Response of a request sent with stream=True.
+        :param model: An optional tvdb_models.TVDBModel subclass the items are converted into.
+        :param chunk_size: The number of bytes read from the connection at a time.
+        """
+        self.raw_response = raw_response
+        self.model = model
+        self.__stream = JSONArrayStream(raw_response.iter_content(chunk_size))
+
+    @property
+    def status_code(self):
+        return self.raw_response.status_code
+
+    @property
+    def envelope(self):
+        return self.__stream.envelope
+
+    @property
+    def links(self):
+        return self.__stream.envelope.get('links')
+
+    @property
+    def errors(self):
+        return self.__stream.envelope.get('errors')
+
+    def __iter__(self):
+        try:
+            for item in self.__stream:
+                yield self.model(item) if self.model is not None else item
+        finally:
+            self.close()
+
+    def close(self):
+        self.raw_response.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -1,25 +1,440 @@
+__author__ = 'tsantana'
+import bisect
+import contextlib
+import contextvars
+import itertools
+import random
 import requests
+import threading
+import time
 import warnings
 
+from email.utils import parsedate_tz, mktime_tz
+from requests.adapters import HTTPAdapter
 from requests.exceptions import RequestException
+from tvdb_client.exceptions import CircuitOpenException, DeadlineExceededException
 
 REQUEST_METHODS = ('GET', 'POST', 'PUT', 'DELETE')
 
+# The lanes of a RequestScheduler: user facing lookups, and the bulk traffic of crawls.
+INTERACTIVE = 'interactive'
+BATCH = 'batch'
 
-def __request_get(url, data=None, headers=None):
-    return requests.get(url, params=data, headers=headers)
+__lane = contextvars.ContextVar('tvdb_client_lane', default=None)
+__deadline = contextvars.ContextVar('tvdb_client_deadline', default=None)
 
 
-def __request_post(url, data=None, headers=None):
-    return requests.post(url, data=data, headers=headers)
+class SessionTransport(object):
+    """
+    A pooled HTTP transport backed by a requests.Session. Connections are kept alive and reused across requests, so
+    only the first request to a host pays the TCP and TLS handshake. Each client should own one transport (or share
+    one between clients talking to the same host), and the pool size should match the number of threads using it.
+    """
 
+    def __init__(self, pool_connections=10, pool_maxsize=10, pool_block=False, keep_alive=True, session=None):
+        """
+        :param pool_connections: The number of distinct hosts to keep connection pools for.
+        :param pool_maxsize: The maximum number of connections kept open per host.
+        :param pool_block: Whether to block when the pool is exhausted instead of opening extra, non-pooled connections.
+        :param keep_alive: When False, every request asks the server to close the connection after the response.
+        :param session: An optional pre-configured requests.Session. If provided, it is used as is and its adapters
+        are not replaced.
+        """
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, pool_block=pool_block)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
 
-def __request_put(url, data=None, headers=None):
-    return requests.put(url, data=data, headers=headers)
+        self.session = session
+        self.keep_alive = keep_alive
 
+    def request(self, request_type, url, data=None, headers=None, stream=False, timeout=None):
+        if not self.keep_alive:
+            headers = dict(headers or {})
+            headers['Connection'] = 'close'
 
-def __request_delete(url, data=None, headers=None):
-    return requests.delete(url, data=data, headers=headers)
+        if request_type.upper() == 'GET':
+            return self.session.get(url, params=data, headers=headers, stream=stream, timeout=timeout)
+        else:
+            return self.session.request(request_type.upper(), url, data=data, headers=headers, stream=stream,
+                                        timeout=timeout)
+
+    def close(self):
+        self.session.close()
+
+
+class RateLimiter(object):
+    """
+    A thread-safe token bucket. Tokens are added at a steady rate up to a maximum (the burst), and every request
+    takes one, waiting for it if the bucket is empty. Sharing one limiter between all the threads (and clients) using
+    the same TheTVDB account keeps them under its rate limit together.
+    """
+
+    def __init__(self, rate, burst=None):
+        """
+        :param rate: The number of requests allowed per second.
+        :param burst: The number of requests that may be sent at once after an idle period. Defaults to the rate.
+        """
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else max(1, rate))
+        self.__tokens = self.burst
+        self.__updated_at = time.time()
+        self.__paused_until = 0.0
+        self.__lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Takes one token from the bucket, waiting for it if needed.
+
+        :return: the number of seconds waited.
+        """
+        waited = 0.0
+
+        while True:
+            with self.__lock:
+                now = time.time()
+                self.__tokens = min(self.burst, self.__tokens + (now - self.__updated_at) * self.rate)
+                self.__updated_at = now
+
+                if now >= self.__paused_until and self.__tokens >= 1:
+                    self.__tokens -= 1
+                    return waited
+
+                wait = max(self.__paused_until - now, (1 - self.__tokens) / self.rate)
+
+            time.sleep(wait)
+            waited += wait
+
+    def pause(self, seconds):
+        """
+        Holds every request for the given number of seconds, i.e. when TheTVDB answers 429 with a Retry-After.
+
+        :param seconds: The number of seconds to pause for.
+        :return: None
+        """
+        with self.__lock:
+            self.__paused_until = max(self.__paused_until, time.time() + seconds)
+
+
+class RequestScheduler(object):
+    """
+    Shares a concurrency budget between lanes of requests with different priorities, so user facing lookups don't
+    queue behind the bulk traffic of a crawl. A request waits for a slot when max_concurrency requests are in flight
+    (or as many as its lane is capped to): slots are then given to the waiting requests of the first lane, in the
+    order they arrived, before any of the next lanes. As long as no request of a higher lane waits, lower lanes use
+    all the capacity left.
+
+    Requests in flight are never interrupted, so capping the lower lanes (i.e. max_concurrency=8 and
+    lane_limits={'batch': 6}) keeps slots free for interactive requests even while a crawl is running.
+    """
+
+    def __init__(self, max_concurrency=8, lanes=(INTERACTIVE, BATCH), lane_limits=None):
+        """
+        :param max_concurrency: The number of requests in flight at once, all lanes together.
+        :param lanes: The names of the lanes, from the highest priority to the lowest.
+        :param lane_limits: An optional python dictionary of lane to the number of requests of the lane in flight at
+        once. Lanes without a limit may use the whole budget.
+        """
+        lane_limits = dict(lane_limits or {})
+        unknown = set(lane_limits) - set(lanes)
+        if unknown:
+            raise ValueError('Limits of unknown lanes: %s' % ', '.join(sorted(unknown)))
+
+        self.max_concurrency = max_concurrency
+        self.lanes = tuple(lanes)
+        self.lane_limits = lane_limits
+        self.__priorities = dict((lane, priority) for priority, lane in enumerate(self.lanes))
+        self.__waiting = list()
+        self.__tickets = itertools.count()
+        self.__in_flight = dict.fromkeys(self.lanes, 0)
+        self.__stats = dict((lane, {'admitted': 0, 'expired': 0, 'waited_seconds': 0.0}) for lane in self.lanes)
+        self.__condition = threading.Condition()
+
+    def __has_room(self, lane):
+        return self.__in_flight[lane] < self.lane_limits.get(lane, self.max_concurrency)
+
+    def __is_admissible(self, ticket):
+        if sum(self.__in_flight.values()) >= self.max_concurrency or not self.__has_room(ticket[2]):
+            return False
+
+        # Waiting requests of capped lanes can't take the slot, so they don't hold back the others.
+        for waiting in self.__waiting:
+            if waiting == ticket:
+                return True
+            if self.__has_room(waiting[2]):
+                return False
+
+    def acquire(self, lane, deadline=None):
+        """
+        Takes a slot for a request of the lane, waiting for it if needed.
+
+        :param lane: The lane of the request.
+        :param deadline: The optional time (as returned by time.time) after which the request is given up.
+        :return: the number of seconds waited.
+        :raise DeadlineExceededException: if the deadline passes before a slot is available.
+        """
+        if lane not in self.__priorities:
+            raise ValueError('Unknown lane %r: use one of %s.' % (lane, ', '.join(self.lanes)))
+
+        started_at = time.time()
+        with self.__condition:
+            ticket = (self.__priorities[lane], next(self.__tickets), lane)
+            bisect.insort(self.__waiting, ticket)
+            try:
+                while not self.__is_admissible(ticket):
+                    remaining = deadline - time.time() if deadline is not None else None
+                    if remaining is not None and remaining <= 0:
+                        self.__stats[lane]['expired'] += 1
+                        raise DeadlineExceededException('Deadline exceeded after waiting %.3f seconds for a %s slot.' %
+                                                        (time.time() - started_at, lane))
+                    self.__condition.wait(remaining)
+
+                waited = time.time() - started_at
+                self.__in_flight[lane] += 1
+                self.__stats[lane]['admitted'] += 1
+                self.__stats[lane]['waited_seconds'] += waited
+                return waited
+            finally:
+                self.__waiting.remove(ticket)
+                # The requests queued behind this one may be admissible now.
+                self.__condition.notify_all()
+
+    def release(self, lane):
+        """
+        Gives back the slot of a request of the lane.
+
+        :param lane: The lane of the request.
+        :return: None
+        """
+        with self.__condition:
+            self.__in_flight[lane] -= 1
+            self.__condition.notify_all()
+
+    def stats(self):
+        """
+        :return: a python dictionary of lane to its requests in flight, waiting, admitted, given up while waiting
+        (expired) and the total number of seconds they waited.
+        """
+        with self.__condition:
+            stats = dict((lane, dict(self.__stats[lane], in_flight=self.__in_flight[lane], waiting=0))
+                         for lane in self.lanes)
+            for _, _, lane in self.__waiting:
+                stats[lane]['waiting'] += 1
+            return stats
+
+
+@contextlib.contextmanager
+def request_context(lane=None, timeout=None):
+    """
+    Sets the lane and the deadline of the requests sent within it, i.e. to run lookups of a crawl in the batch lane,
+    or to give up on an interactive lookup (waiting for a slot, retries and backoffs included) after a few seconds.
+    Nested contexts keep the earliest deadline. Clients carry the context over to the threads fanning out requests.
+
+    :param lane: The optional lane of the requests, instead of the one of their endpoint.
+    :param timeout: The optional number of seconds the requests must complete in.
+    :return: a context manager.
+    """
+    deadline = time.time() + timeout if timeout is not None else None
+    current = __deadline.get()
+    if current is not None and (deadline is None or current < deadline):
+        deadline = current
+
+    lane_token = __lane.set(lane or __lane.get())
+    deadline_token = __deadline.set(deadline)
+    try:
+        yield
+    finally:
+        __deadline.reset(deadline_token)
+        __lane.reset(lane_token)
+
+
+def current_lane():
+    """
+    :return: the lane set by the innermost request_context, or None.
+    """
+    return __lane.get()
+
+
+def current_deadline():
+    """
+    :return: the deadline (as returned by time.time) set by the request_contexts, or None.
+    """
+    return __deadline.get()
+
+
+def submit_in_context(executor, func, *args, **kwargs):
+    """
+    Submits a call to an executor, running it within the request_context (and any other context variable) of the
+    caller.
+
+    :return: the concurrent.futures.Future of the call.
+    """
+    return executor.submit(contextvars.copy_context().run, func, *args, **kwargs)
+
+
+class RetryPolicy(object):
+    """
+    Decides whether and when a failed request is retried. Requests failing with a connection error or with one of the
+    retry statuses are retried up to retries times, waiting exponentially longer between attempts (with full jitter,
+    so concurrent clients don't retry in lockstep) or for as long as the Retry-After header of the response asks. A
+    request whose Retry-After exceeds max_backoff is not retried, as a retry sent earlier would be throttled again.
+    """
+
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+    def __init__(self, retries=5, backoff_factor=0.5, max_backoff=30.0, retry_statuses=RETRY_STATUSES, jitter=True):
+        """
+        :param retries: The maximum number of retries of a request.
+        :param backoff_factor: The base number of seconds of the backoff: attempt n waits up to backoff_factor * 2^n.
+        :param max_backoff: The maximum number of seconds to wait between attempts, Retry-After included: longer
+        Retry-Afters end the retries.
+        :param retry_statuses: The HTTP status codes worth a retry.
+        :param jitter: Whether the backoff is randomized between 0 and its computed value.
+        """
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.retry_statuses = retry_statuses
+        self.jitter = jitter
+
+    def is_retryable(self, response):
+        return response is None or response.status_code in self.retry_statuses
+
+    def retry_after(self, response):
+        """
+        :return: the number of seconds the Retry-After header of the response asks to wait, or None.
+        """
+        value = response.headers.get('Retry-After') if response is not None else None
+        if not value:
+            return None
+
+        if value.strip().isdigit():
+            return float(value)
+
+        date = parsedate_tz(value)
+        return max(0.0, mktime_tz(date) - time.time()) if date else None
+
+    def backoff(self, attempt, response=None):
+        """
+        :param attempt: The number of the attempt that just failed, starting at 0.
+        :param response: The failed response, if any.
+        :return: the number of seconds to wait before the next attempt, or None if the Retry-After of the response
+        exceeds max_backoff and the request must not be retried.
+        """
+        retry_after = self.retry_after(response)
+        if retry_after is not None:
+            return retry_after if retry_after <= self.max_backoff else None
+
+        backoff = min(self.max_backoff, self.backoff_factor * (2 ** attempt))
+        return random.uniform(0, backoff) if self.jitter else backoff
+
+
+class CircuitBreaker(object):
+    """
+    Fails fast when TheTVDB is degraded. After failure_threshold consecutive failed requests (connection errors or
+    server side errors) the circuit opens and requests raise CircuitOpenException without being sent. Once
+    reset_timeout seconds have passed a single trial request is let through: the circuit closes again if it
+    succeeds and stays open for another reset_timeout otherwise.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    FAILURE_STATUSES = (429, 500, 502, 503, 504)
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, failure_statuses=FAILURE_STATUSES):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failure_statuses = failure_statuses
+        self.state = self.CLOSED
+        self.__failures = 0
+        self.__opened_at = 0.0
+        self.__lock = threading.Lock()
+
+    def before_request(self):
+        """
+        :raise CircuitOpenException: if the circuit is open and it's not yet time for a trial request.
+        """
+        with self.__lock:
+            if self.state == self.CLOSED:
+                return
+
+            if self.state == self.OPEN and time.time() - self.__opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                return
+
+            raise CircuitOpenException('TheTVDB API is failing, requests are suspended for up to %.1f seconds.' %
+                                       max(0.0, self.reset_timeout - (time.time() - self.__opened_at)))
+
+    def record(self, response):
+        """
+        Records the outcome of a request.
+
+        :param response: The response of the request, or None if it failed with a connection error.
+        :return: None
+        """
+        with self.__lock:
+            if response is not None and response.status_code not in self.failure_statuses:
+                self.__failures = 0
+                self.state = self.CLOSED
+                return
+
+            self.__failures += 1
+            if self.state == self.HALF_OPEN or self.__failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.__opened_at = time.time()
+
+
+def response_validators(response):
+    """
+    Extracts the validators of a response, which allow it to be revalidated later on with a conditional request.
+
+    :param response: A requests.Response.
+    :return: a python dictionary with the ETag, the Last-Modified and the size of the body of the response, or None if
+    the response has neither an ETag nor a Last-Modified header.
+    """
+    etag = response.headers.get('ETag')
+    last_modified = response.headers.get('Last-Modified')
+
+    if not etag and not last_modified:
+        return None
+
+    return {'etag': etag, 'last_modified': last_modified, 'size': len(response.content)}
+
+
+def add_conditional_headers(headers, validators):
+    """
+    Turns a request into a conditional one, to which the server answers 304 (Not Modified) with no body if the
+    response the validators came from is still current.
+
+    :param headers: The python dictionary with the headers of the request. It's modified in place.
+    :param validators: The validators returned by response_validators.
+    :return: the headers provided.
+    """
+    if validators.get('etag'):
+        headers['If-None-Match'] = validators['etag']
+    if validators.get('last_modified'):
+        headers['If-Modified-Since'] = validators['last_modified']
+
+    return headers
+
+
+def __request_get(url, data=None, headers=None, stream=False, timeout=None):
+    return requests.get(url, params=data, headers=headers, stream=stream, timeout=timeout)
+
+
+def __request_post(url, data=None, headers=None, stream=False, timeout=None):
+    return requests.post(url, data=data, headers=headers, stream=stream, timeout=timeout)
+
+
+def __request_put(url, data=None, headers=None, stream=False, timeout=None):
+    return requests.put(url, data=data, headers=headers, stream=stream, timeout=timeout)
+
+
+def __request_delete(url, data=None, headers=None, stream=False, timeout=None):
+    return requests.delete(url, data=data, headers=headers, stream=stream, timeout=timeout)
 
 
 def __request_factory(request_type):
@@ -31,14 +446,120 @@ def __request_factory(request_type):
         return None
 
 
-def run_request(request_type, url, retries=5, data=None, headers=None):
-    func = __request_factory(request_type)
+def __transport_request_factory(request_type, transport):
+
+    if request_type.upper() in REQUEST_METHODS:
+        def func(url, data=None, headers=None, stream=False, timeout=None):
+            # Only passed when set, so transports predating streaming (or timeouts) keep working.
+            options = dict()
+            if stream:
+                options['stream'] = True
+            if timeout is not None:
+                options['timeout'] = timeout
+            return transport.request(request_type, url, data=data, headers=headers, **options)
+        return func
+    else:
+        return None
+
+
+def run_request(request_type, url, retries=5, data=None, headers=None, transport=None, retry_policy=None,
+                rate_limiter=None, circuit_breaker=None, stream=False, on_attempt=None, scheduler=None, lane=None,
+                deadline=None):
+    """
+    Sends a request, retrying it according to the retry policy.
+
+    :param request_type: One of get, post, put or delete.
+    :param url: The full url of the request.
+    :param retries: The maximum number of retries, when no retry_policy is provided.
+    :param data: The optional query parameters (get) or body (other methods) of the request.
+    :param headers: The optional headers of the request.
+    :param transport: The optional transport to send the request through (i.e. a SessionTransport).
+    :param retry_policy: The optional RetryPolicy. If none is provided, a default one with the given retries is used.
+    :param rate_limiter: The optional RateLimiter every attempt must get a token from.
+    :param circuit_breaker: The optional CircuitBreaker guarding the API.
+    :param stream: If True, the body of the response is not read, so it can be consumed incrementally.
+    :param on_attempt: An optional function called after every attempt with its number (starting at 0), its response
+    (None on a connection error) and its duration in seconds, i.e. instrumentation.RequestContext.attempt_finished.
+    :param scheduler: The optional RequestScheduler every attempt must get a slot from. The slot is given back while
+    backing off.
+    :param lane: The lane of the request in the scheduler. Defaults to the lane of the request_context, if any, and to
+    the first lane of the scheduler otherwise.
+    :param deadline: The optional time (as returned by time.time) the request must complete by. Defaults to the
+    deadline of the request_context, if any. The time left is the timeout of every attempt, and no retry is made if
+    its backoff would end past the deadline.
+    :return: the requests.Response of the last attempt, or None if all attempts failed with a connection error.
+    :raise DeadlineExceededException: if the deadline passes before an attempt is made, or the last attempt failed
+    with a connection error (i.e. timed out) and there's no time left to retry.
+    """
+    if transport is not None:
+        func = __transport_request_factory(request_type, transport)
+    else:
+        func = __request_factory(request_type)
+
+    if retry_policy is None:
+        retry_policy = RetryPolicy(retries=retries)
+
+    if deadline is None:
+        deadline = current_deadline()
+    if scheduler is not None and lane is None:
+        lane = current_lane() or scheduler.lanes[0]
+
+    response = None
+    for attempt in range(retry_policy.retries+1):
+        if deadline is not None and time.time() >= deadline:
+            raise DeadlineExceededException('Deadline exceeded before attempt %d of %s' % (attempt, url))
+        # Only requests with a slot compete for the tokens, so the scheduler decides which lane goes first.
+        if scheduler is not None:
+            scheduler.acquire(lane, deadline)
 
-    for attempt in range(retries+1):
         try:
-            response = func(url, data=data, headers=headers)
-            return response
-        except RequestException:
-            warnings.warn('Got error on request for attemp %d - %s' %
-                          (attempt, 'retry is possible' if attempt < retries else 'no retry'))
-    return None
+            if circuit_breaker is not None:
+                circuit_breaker.before_request()
+            try:
+                if rate_limiter is not None:
+                    rate_limiter.acquire()
+
+                started_at = time.perf_counter() if on_attempt is not None else None
+                timeout = max(0.001, deadline - time.time()) if deadline is not None else None
+                try:
+                    response = func(url, data=data, headers=headers, stream=stream, timeout=timeout)
+                except RequestException:
+                    response = None
+                    warnings.warn('Got error on request for attemp %d - %s' %
+                                  (attempt, 'retry is possible' if attempt < retry_policy.retries else 'no retry'))
+            except BaseException:
+                # The outcome must be recorded whatever happens, or a trial request would leave the circuit half-open,
+                # failing every request from then on.
+                if circuit_breaker is not None:
+                    circuit_breaker.record(None)
+                raise
+        finally:
+            if scheduler is not None:
+                scheduler.release(lane)
+
+        if on_attempt is not None:
+            on_attempt(attempt, response, time.perf_counter() - started_at)
+
+        if circuit_breaker is not None:
+            circuit_breaker.record(response)
+
+        if not retry_policy.is_retryable(response) or attempt == retry_policy.retries:
+            break
+
+        backoff = retry_policy.backoff(attempt, response)
+        if backoff is None:
+            # TheTVDB asks to wait longer than the policy allows: the other requests wait, this one gives up.
+            if rate_limiter is not None and response.status_code == 429:
+                rate_limiter.pause(retry_policy.retry_after(response))
+            break
+        if deadline is not None and time.time() + backoff >= deadline:
+            if response is None:
+                raise DeadlineExceededException('Deadline exceeded after %d attempts of %s' % (attempt + 1, url))
+            break
+        if stream and response is not None:
+            response.close()
+        if rate_limiter is not None and response is not None and response.status_code == 429:
+            rate_limiter.pause(backoff)
+        time.sleep(backoff)
+
+    return response
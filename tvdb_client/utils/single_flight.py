@@ -0,0 +1,98 @@
+# coding: utf-8
+"""
+Request coalescing: concurrent callers asking for the same thing (the same method, URL and language) share a single
+in-flight call and all receive its result, instead of each sending an identical request. Results are shared between
+the callers, so they must not be modified.
+"""
+from concurrent.futures import Future
+import asyncio
+import threading
+
+__author__ = 'tsantana'
+
+
+class SingleFlight(object):
+    """
+    Coalesces calls made from different threads.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.coalesced = 0
+        self.__in_flight = dict()
+        self.__lock = threading.Lock()
+
+    def do(self, key, func):
+        """
+        Calls func, unless a call with the same key is already in flight, in which case its outcome is waited for.
+
+        :param key: The key identifying the call, i.e. built by cache.make_cache_key.
+        :param func: The function to call, with no arguments.
+        :return: the result of the call.
+        :raise: the exception raised by the call, if any.
+        """
+        with self.__lock:
+            future = self.__in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = self.__in_flight[key] = Future()
+                self.calls += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            future.set_result(func())
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self.__lock:
+                del self.__in_flight[key]
+
+        return future.result()
+
+    def stats(self):
+        """
+        :return: a python dictionary with the number of calls made and of calls coalesced into one of them.
+        """
+        with self.__lock:
+            return {'calls': self.calls, 'coalesced': self.coalesced}
+
+
+class AsyncSingleFlight(object):
+    """
+    Coalesces coroutine calls made from the same event loop.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.coalesced = 0
+        self.__in_flight = dict()
+
+    def do(self, key, coroutine_function):
+        """
+        Runs coroutine_function as a task, unless a task with the same key is already in flight, and returns an
+        awaitable of its outcome. Cancelling one of the callers doesn't cancel the task the others are waiting for.
+
+        :param key: The key identifying the call.
+        :param coroutine_function: The coroutine function to run, with no arguments.
+        :return: an awaitable of the result of the call.
+        """
+        task = self.__in_flight.get(key)
+
+        if task is None:
+            task = self.__in_flight[key] = asyncio.ensure_future(coroutine_function())
+            task.add_done_callback(lambda _: self.__in_flight.pop(key, None))
+            self.calls += 1
+        else:
+            self.coalesced += 1
+
+        return asyncio.shield(task)
+
+    def stats(self):
+        """
+        :return: a python dictionary with the number of calls made and of calls coalesced into one of them.
+        """
+        return {'calls': self.calls, 'coalesced': self.coalesced}
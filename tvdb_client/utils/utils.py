@@ -1,7 +1,13 @@
 # encoding=latin-1
 __author__ = 'tsantana'
 
-import urllib
+import re
+
+try:
+    from urllib.parse import urlencode, urlsplit
+except ImportError:
+    from urllib import urlencode
+    from urlparse import urlsplit
 
 def query_param_string_from_option_args(a2q_dict, args_dict):
     """
@@ -17,7 +23,7 @@ def query_param_string_from_option_args(a2q_dict, args_dict):
         if value != None:
             name_value_pairs[a2q_dict[ak]] = str(value)
 
-    return urllib.urlencode(name_value_pairs)
+    return urlencode(name_value_pairs)
 
 
 def make_str_content(content):
@@ -29,3 +35,28 @@ def make_str_content(content):
     if not isinstance(content, str):
         content = str(content.decode())
     return content
+
+
+def endpoint_from_url(url):
+    """
+    Finds the endpoint of TheTVDB API a request URL belongs to, by dropping its scheme, host and query string and
+    replacing its numeric path segments by {id}.
+    i.e. https://api.thetvdb.com/series/121361/actors is /series/{id}/actors.
+    :param url: the full URL of a request.
+    :return: the endpoint template of the URL.
+    """
+    return re.sub(r'/\d+(?=/|$)', '/{id}', urlsplit(url).path)
+
+
+def unique(iterable):
+    """
+    Iterates over the distinct items of an iterable, in the order they first appear.
+
+    :param iterable: an iterable of hashable items.
+    :return: a generator of the distinct items.
+    """
+    seen = set()
+    for item in iterable:
+        if item not in seen:
+            seen.add(item)
+            yield item